@@ -47,6 +47,10 @@ f.write('\n\n')
 print "\n\nGathering controls information..."
 print mainWindow.PrintControlIdentifiers()
 
+snapshotFile = os.getcwd() + r"\output.snap"
+print "Saving snapshot of the window to " + snapshotFile + "..."
+mainWindow.SaveSnapshot(snapshotFile)
+
 f.close()
 print "Killing application..."
 proc.Kill()
@@ -0,0 +1,79 @@
+"""Time attribute access of PythonicAutomationElement
+
+Uses the pure Python UI Automation stand in of fake_automation so it runs
+with CPython on any platform. For comparison the old __getattribute__
+(which asked dir() for the attributes of the class and the element and
+went through all the supported properties on every access) is timed too.
+
+Run from the root of the repository::
+
+    python benchmarks/bench_automation_element.py [accesses]
+"""
+from __future__ import print_function
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, os.path.dirname(__file__))
+
+import fake_automation
+fake_automation.install()
+
+from ironpywinauto import automation_element
+from ironpywinauto.automation_element import PythonicAutomationElement
+
+
+class OldPythonicAutomationElement(PythonicAutomationElement):
+    "PythonicAutomationElement with the old __getattribute__"
+
+    def __getattribute__(self, attr_name):
+        default_attrs = [attr for attr in dir(PythonicAutomationElement)
+            if attr != '__getattribute__']
+
+        # dir(self) as IronPython works it out (CPython would get
+        # __dict__ through this method again)
+        default_attrs.extend(dir(type(self)))
+        default_attrs.extend(object.__getattribute__(self, '__dict__'))
+        if attr_name in default_attrs:
+            return object.__getattribute__(self, attr_name)
+        for prop in self.elem.GetSupportedProperties():
+            prop_name = str(automation_element.Automation.PropertyName(prop))
+            if prop_name == attr_name:
+                return self.elem.GetCurrentPropertyValue(prop)
+        raise AttributeError(attr_name)
+
+
+# an attribute of the element, an attribute of the class and
+# a property of the automation element
+ATTRIBUTES = ['elem', 'Updated', 'AutomationId', 'ProcessId']
+
+
+def main(accesses = 2000):
+    dialog = fake_automation.make_dialog(rows = 5)
+    AutomationElement = fake_automation.AutomationElement
+
+    print("%14s %16s %16s %16s" % (
+        "attribute", "us/access", "old us/access", "old calls/access"))
+
+    for attr in ATTRIBUTES:
+        results = []
+        for element_class in (
+            PythonicAutomationElement, OldPythonicAutomationElement):
+
+            element = element_class(dialog)
+            AutomationElement.calls = 0
+            start = time.time()
+            for i in range(accesses):
+                getattr(element, attr)
+            results.append((
+                (time.time() - start) / accesses * 1e6,
+                AutomationElement.calls / float(accesses)))
+
+        print("%14s %16.2f %16.2f %16.2f" % (
+            attr, results[0][0], results[1][0], results[1][1]))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
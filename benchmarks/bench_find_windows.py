@@ -0,0 +1,156 @@
+"""Count the window properties that findwindows.find_windows fetches
+
+Each property of a window that find_windows checks is a call to Windows -
+and the text is a message to the process of the window (see handleprops).
+find_windows plans its filters so that the cheap ones (control ID,
+process, class, ...) rule out windows before the text is fetched and
+fetches each property of a window once.
+
+This counts the fetches for some searches of a simulated desktop (see
+fake_windows) and compares them with applying each criterion to all the
+windows in turn - the way that find_windows used to work.
+
+Run from the root of the repository::
+
+    python benchmarks/bench_find_windows.py [dialogs] [controls] [repeat]
+"""
+from __future__ import print_function
+
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import fake_windows
+desktop = fake_windows.install(replace_find_windows = False)
+
+from pywinauto import findwindows, handleprops, findbestmatch, controls
+
+
+def make_desktop(dialogs, ctrls):
+    """Add dialogs of 4 processes with rows of a label, an edit and a button
+
+    Like a real desktop most of the top level windows are hidden (tool
+    tips, IME windows, ...) and so are some rows of the dialogs."""
+    for i in range(dialogs):
+        process = i % 4
+        for hidden in ('tooltips_class32', 'IME', 'MSCTFIME UI'):
+            desktop.add('', hidden, process).visible = False
+        dialog = desktop.add('Dialog %d' % i, process = process)
+        for row in range(ctrls // 3):
+            row_ctrls = [
+                desktop.add('Field %d' % row, 'Static', process, dialog,
+                    control_id = 1000 + row * 3),
+                desktop.add('', 'Edit', process, dialog,
+                    control_id = 1001 + row * 3),
+                desktop.add('Apply %d' % row, 'Button', process, dialog,
+                    control_id = 1002 + row * 3),
+            ]
+            for ctrl in row_ctrls:
+                ctrl.visible = row % 2 == 0
+
+
+def find_windows_unplanned(
+    class_name = None,
+    class_name_re = None,
+    parent = None,
+    process = None,
+    title = None,
+    title_re = None,
+    top_level_only = True,
+    visible_only = True,
+    enabled_only = False,
+    best_match = None,
+    predicate_func = None,
+    control_id = None):
+    "find_windows() as it was - each criterion checked for all the windows"
+    if top_level_only:
+        windows = findwindows.enum_windows()
+        if parent:
+            windows = [win for win in windows
+                if handleprops.parent(win) == parent]
+    else:
+        windows = handleprops.children(parent)
+
+    if control_id is not None and windows:
+        windows = [win for win in windows if
+            handleprops.controlid(win) == control_id]
+    if class_name is not None and windows:
+        windows = [win for win in windows
+            if class_name == handleprops.classname(win)]
+    if class_name_re is not None and windows:
+        class_name_regex = re.compile(class_name_re)
+        windows = [win for win in windows
+            if class_name_regex.match(handleprops.classname(win))]
+    if process is not None and windows:
+        windows = [win for win in windows
+            if handleprops.processid(win) == process]
+    if title is not None and windows:
+        windows = [win for win in windows
+            if title == handleprops.text(win)]
+    elif title_re is not None and windows:
+        title_regex = re.compile(title_re)
+        windows = [win for win in windows
+            if title_regex.match(handleprops.text(win))]
+    if visible_only and windows:
+        windows = [win for win in windows if handleprops.isvisible(win)]
+    if enabled_only and windows:
+        windows = [win for win in windows if handleprops.isenabled(win)]
+    if best_match is not None and windows:
+        windows = [win.handle for win in
+            findbestmatch.find_best_control_matches(
+                best_match, [controls.WrapHandle(win) for win in windows])]
+    if predicate_func is not None and windows:
+        windows = [win for win in windows if predicate_func(win)]
+    return windows
+
+
+def searches(dialog):
+    "Return the searches to time as (name, criteria)"
+    return [
+        ("dialog by process and title",
+            dict(process = 2, title = 'Dialog 6')),
+        ("buttons by title_re",
+            dict(parent = dialog, top_level_only = False,
+                class_name = 'Button', title_re = 'Apply 1.*')),
+        ("control by ID and class_name_re",
+            dict(parent = dialog, top_level_only = False,
+                control_id = 1004, class_name_re = 'Edit|Button')),
+        ("best_match of the buttons",
+            dict(parent = dialog, top_level_only = False,
+                best_match = 'Apply 3',
+                predicate_func = lambda win:
+                    handleprops.classname(win) == 'Button')),
+    ]
+
+
+def main(dialogs = 40, ctrls = 30, repeat = 20):
+    make_desktop(dialogs, ctrls)
+    dialog = findwindows.find_windows(title = 'Dialog 6')[0]
+    print("%d windows" % len(desktop.windows))
+    print("%34s %16s %16s %8s" % (
+        "", "fetches (text)", "before (text)", "seconds"))
+
+    for name, criteria in searches(dialog):
+        desktop.fetches = {}
+        start = time.time()
+        for i in range(repeat):
+            found = findwindows.find_windows(**criteria)
+        seconds = time.time() - start
+        fetches = dict(desktop.fetches)
+
+        desktop.fetches = {}
+        before = find_windows_unplanned(**criteria)
+        assert before == found, (name, before, found)
+
+        print("%34s %9d (%4d) %9d (%4d) %8.4f" % (
+            name,
+            sum(fetches.values()) // repeat, fetches.get('text', 0) // repeat,
+            sum(desktop.fetches.values()), desktop.fetches.get('text', 0),
+            seconds / repeat))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
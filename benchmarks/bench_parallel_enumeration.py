@@ -0,0 +1,44 @@
+"""Time enumerating the descendants of a big tree on many threads
+
+Uses the pure Python UI Automation stand in of fake_automation with a
+delay for each call to the provider (like the cross-process calls of UI
+Automation) and times automation_element._enumerate_parallel with more
+and more threads.
+
+Run from the root of the repository::
+
+    python benchmarks/bench_parallel_enumeration.py [depth] [children] [latency ms]
+"""
+from __future__ import print_function
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, os.path.dirname(__file__))
+
+import fake_automation
+fake_automation.install()
+
+from ironpywinauto import automation_element
+
+
+def main(depth = 4, children = 5, latency = 2):
+    tree = fake_automation.make_tree(depth, children)
+    AutomationElement = fake_automation.AutomationElement
+    AutomationElement.latency = latency / 1000.0
+
+    print("%d elements, %d ms a call" % (
+        len(tree._elements(fake_automation.TreeScope.Descendants)), latency))
+    print("%8s %10s %8s" % ("threads", "seconds", "calls"))
+    for workers in (1, 2, 4, 8, 16, 32):
+        AutomationElement.calls = 0
+        start = time.time()
+        automation_element._enumerate_parallel(tree, workers)
+        print("%8d %10.3f %8d" % (
+            workers, time.time() - start, AutomationElement.calls))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,104 @@
+"""Compare resolving many controls one at a time with resolve_many
+
+Each attribute access of a WindowSpecification (dlg.OK, dlg.NameEdit, ...)
+finds the controls of the dialog, works out all their names and scores one
+search text - find_best_control_matches(). WindowSpecification.resolve_many
+does that once for all the names - find_best_control_matches_many().
+
+This times both for a dialog of stand in controls that have the properties
+that are used to name them (so no real windows are needed).
+
+Run from the root of the repository::
+
+    python benchmarks/bench_resolve_many.py [controls] [lookups]
+"""
+from __future__ import print_function
+
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from ironpywinauto import findbestmatch
+
+
+WORDS = ['Save', 'Open', 'Cancel', 'Apply', 'Name', 'Address', 'City',
+    'Total', 'Value', 'Row', 'Item', 'Options', 'Help', 'File', 'Print']
+
+
+class Rect(object):
+    "Stand in for the rectangle of a control"
+    def __init__(self, left, top, right, bottom):
+        self.left, self.top, self.right, self.bottom = left, top, right, bottom
+
+
+class FakeControl(object):
+    "Stand in for a control with the properties used to name it"
+    def __init__(self, class_name, text, rect):
+        self.class_name = class_name
+        self.text = text
+        self.rect = rect
+        self.can_be_label = class_name in ('Static', 'Button')
+        self.has_title = class_name in ('Static', 'Button')
+
+    def FriendlyClassName(self):
+        return self.class_name
+
+    def WindowText(self):
+        return self.text
+
+    def IsVisible(self):
+        return True
+
+    def Rectangle(self):
+        return self.rect
+
+    def Texts(self):
+        return [self.text]
+
+
+def dialog_controls(count, seed = 0):
+    "Return count controls laid out as rows of label, edit and button"
+    rand = random.Random(seed)
+    ctrls = []
+    row = 0
+    while len(ctrls) < count:
+        top = row * 25
+        text = " ".join(rand.sample(WORDS, 2))
+        ctrls.append(FakeControl('Static', text, Rect(10, top, 100, top + 20)))
+        ctrls.append(FakeControl('Edit', '', Rect(110, top, 300, top + 20)))
+        ctrls.append(FakeControl(
+            'Button', "%s %d" % (rand.choice(WORDS), row),
+            Rect(310, top, 380, top + 20)))
+        row += 1
+    return ctrls[:count]
+
+
+def main(count = 300, lookups = 50):
+    ctrls = dialog_controls(count)
+    names = sorted(findbestmatch.build_unique_dict(ctrls).keys())
+    names = random.Random(1).sample(names, min(lookups, len(names)))
+
+    def one_at_a_time():
+        for name in names:
+            findbestmatch.find_best_control_matches(name, ctrls)
+
+    def all_at_once():
+        findbestmatch.find_best_control_matches_many(names, ctrls)
+
+    print("%d controls, %d names" % (len(ctrls), len(names)))
+    for title, func in (
+        ("one at a time", one_at_a_time),
+        ("resolve_many", all_at_once)):
+
+        # start with an empty ratio cache each time
+        findbestmatch._cache.clear()
+        start = time.time()
+        func()
+        print("%16s %8.3f s" % (title, time.time() - start))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,101 @@
+"""Compare the throughput of the string similarity scorers
+
+Scores a few search texts against synthetic control names (100 to 100k
+names) with each scorer in the similarity module - both directly with
+scorer.ratios() and through UniqueDict.FindBestMatches().
+
+Run from the root of the repository::
+
+    python benchmarks/bench_similarity.py [max_names]
+
+The levenshtein scorer is skipped if numpy is not installed.
+"""
+from __future__ import print_function
+
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from ironpywinauto import findbestmatch
+from ironpywinauto import similarity
+
+
+WORDS = ['Save', 'Open', 'Cancel', 'Apply', 'Name', 'Address', 'City',
+    'Total', 'Value', 'Row', 'Item', 'Options', 'Help', 'File', 'Print']
+CLASSES = ['Button', 'Edit', 'Static', 'ComboBox', 'ListBox', 'CheckBox']
+
+SEARCHES = ['SaveButton', 'nameedit', 'Total Value Static', 'OptionsCheck']
+
+
+def control_names(count, seed = 0):
+    "Return count synthetic control names like 'Total Value23Edit'"
+    rand = random.Random(seed)
+    names = []
+    for i in range(count):
+        text = " ".join(rand.sample(WORDS, rand.randint(1, 3)))
+        names.append("%s%d%s" % (text, i, rand.choice(CLASSES)))
+    return names
+
+
+def time_it(func, repeat = 1):
+    "Return the best time of calling func repeat times"
+    best = None
+    for i in range(repeat):
+        start = time.time()
+        func()
+        taken = time.time() - start
+        if best is None or taken < best:
+            best = taken
+    return best
+
+
+def main(max_names = 100000):
+    scorer_names = ['difflib', 'levenshtein', 'jarowinkler']
+    if similarity.numpy is None:
+        print("numpy is not installed - skipping the levenshtein scorer")
+        scorer_names.remove('levenshtein')
+
+    print("%8s %12s %16s %16s" % (
+        "names", "scorer", "ratios() n/s", "FindBest n/s"))
+
+    count = 100
+    while count <= max_names:
+        names = control_names(count)
+
+        unique_dict = findbestmatch.UniqueDict()
+        for name in names:
+            unique_dict[name] = name
+
+        for name in scorer_names:
+            scorer = similarity.get_scorer(name)
+
+            def score_all():
+                for search_text in SEARCHES:
+                    scorer.ratios(search_text, names)
+
+            def find_best():
+                # start with an empty cache each time
+                findbestmatch.set_scorer(scorer)
+                for search_text in SEARCHES:
+                    unique_dict.FindBestMatches(search_text)
+
+            scored = count * len(SEARCHES)
+            print("%8d %12s %16.0f %16.0f" % (
+                count,
+                name,
+                scored / time_it(score_all),
+                scored / time_it(find_best)))
+
+        count *= 10
+
+    findbestmatch.set_scorer('difflib')
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        main(int(sys.argv[1]))
+    else:
+        main()
@@ -0,0 +1,84 @@
+"""Time loading a recorded tree and resolving names against it
+
+Writes a snapshot of a dialog with rows of a label, an edit and a button
+(see ironpywinauto.tree_snapshot), loads it and looks up controls by
+name - with CPython on any platform, no live process is needed.
+
+Run from the root of the repository::
+
+    python benchmarks/bench_tree_snapshot.py [rows] [lookups]
+"""
+from __future__ import print_function
+
+import os
+import sys
+import time
+import random
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from ironpywinauto import tree_snapshot
+from ironpywinauto.tree_snapshot import SnapshotControlType, SnapshotRect
+from ironpywinauto.automation_element import PythonicAutomationElement
+
+
+def dialog_elements(rows):
+    "Return the elements of a dialog with rows of a label, an edit and a button"
+    def element(control_type, name, automation_id, top, left, width):
+        return {
+            'AutomationId' : automation_id,
+            'Name' : name,
+            'ClassName' : control_type,
+            'ControlType' : SnapshotControlType('ControlType.' + control_type),
+            'BoundingRectangle' : SnapshotRect(left, top, width, 20),
+            'IsEnabled' : True,
+            'RuntimeId' : (42, top, left),
+            }
+
+    elements = [(-1, element('Window', 'Dialog', 'dialog', 0, 0, 400))]
+    for row in range(rows):
+        top = row * 25
+        elements.append((0, element(
+            'Text', 'Field %d' % row, 'label%d' % row, top, 10, 90)))
+        elements.append((0, element('Edit', '', 'edit%d' % row, top, 110, 190)))
+        elements.append((0, element(
+            'Button', 'Apply %d' % row, 'button%d' % row, top, 310, 70)))
+    return elements
+
+
+def main(rows = 300, lookups = 20):
+    directory = tempfile.mkdtemp()
+    try:
+        filename = os.path.join(directory, 'dialog.snap')
+        snapshot_file = open(filename, 'wb')
+        tree_snapshot.write_snapshot(snapshot_file, dialog_elements(rows))
+        snapshot_file.close()
+        print("%d elements, %d bytes" % (
+            rows * 3 + 1, os.path.getsize(filename)))
+
+        start = time.time()
+        snapshot = tree_snapshot.load_snapshot(filename)
+        print("%24s %8.3f s" % ("load", time.time() - start))
+
+        dialog = PythonicAutomationElement(snapshot.root)
+        start = time.time()
+        dialog.UpdateElementsAndCombinations()
+        print("%24s %8.3f s" % ("work out the names", time.time() - start))
+
+        names = random.Random(0).sample(
+            ['label%d' % row for row in range(rows)], min(lookups, rows))
+        start = time.time()
+        for name in names:
+            getattr(dialog, name)
+        print("%24s %8.3f s" % (
+            "%d lookups" % len(names), time.time() - start))
+
+        snapshot.close()
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,69 @@
+"""Time adding heavily duplicated texts to a UniqueDict
+
+A dialog with thousands of controls of the same class gives thousands of
+names like "Edit" that UniqueDict numbers "Edit", "Edit0", "Edit1",
+"Edit2", ... The time per text should stay the same however many of
+them there are. For comparison the old way of looking for a free number
+from 2 for each text is timed too.
+
+Run from the root of the repository::
+
+    python benchmarks/bench_unique_dict.py [max_texts]
+"""
+from __future__ import print_function
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from ironpywinauto import findbestmatch
+
+
+class ProbingUniqueDict(findbestmatch.UniqueDict):
+    "UniqueDict that looks for a free number from 2 for each duplicate"
+
+    def __setitem__(self, text, item):
+        if text in self:
+            unique_text = text
+            counter = 2
+            while unique_text in self:
+                unique_text = text + str(counter)
+                counter += 1
+
+            if text + '0' not in self:
+                self._set_item(text + '0', self[text])
+                self._set_item(text + '1', self[text])
+
+            text = unique_text
+
+        self._set_item(text, item)
+
+
+def add_texts(dict_class, count):
+    "Return how long it takes to add count duplicated texts"
+    # a few classes of controls - most of them Edit
+    texts = ['Edit', 'Edit', 'Edit', 'Static', 'Button'] * (count // 5 + 1)
+
+    unique_dict = dict_class()
+    start = time.time()
+    for item, text in enumerate(texts[:count]):
+        unique_dict[text] = item
+    return time.time() - start
+
+
+def main(max_texts = 16000):
+    print("%8s %14s %14s" % ("texts", "us/text", "probing us/text"))
+
+    count = 500
+    while count <= max_texts:
+        print("%8d %14.2f %14.2f" % (
+            count,
+            add_texts(findbestmatch.UniqueDict, count) / count * 1e6,
+            add_texts(ProbingUniqueDict, count) / count * 1e6))
+        count *= 2
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
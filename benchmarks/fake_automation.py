@@ -0,0 +1,395 @@
+"""Pure Python stand in for the .NET UI Automation types
+
+ironpywinauto.automation_element needs IronPython and the
+System.Windows.Automation assemblies. install() puts modules with the
+few types it uses into sys.modules so that it can be imported and timed
+with CPython on any platform::
+
+    import fake_automation
+    fake_automation.install()
+
+    from ironpywinauto.automation_element import PythonicAutomationElement
+    dialog = fake_automation.make_dialog(rows = 50)
+    element = PythonicAutomationElement(dialog)
+
+Every call that would be a cross-process call to the UI Automation
+provider (reading a property, finding or walking elements) is counted in
+AutomationElement.calls and can be slowed down by setting
+AutomationElement.latency (in seconds).
+"""
+from __future__ import print_function
+
+import sys
+import time
+import types
+
+
+class AutomationProperty(object):
+    "An automation property like AutomationElement.NameProperty"
+    def __init__(self, name):
+        self.Name = name
+        self.ProgrammaticName = 'AutomationElementIdentifiers.%sProperty' % name
+
+    def __repr__(self):
+        return self.ProgrammaticName
+
+
+class ControlTypeValue(object):
+    "A control type like ControlType.Edit"
+    def __init__(self, name):
+        self.ProgrammaticName = 'ControlType.' + name
+
+
+class ControlType(object):
+    "The control types used by make_dialog()"
+    Window = ControlTypeValue('Window')
+    Text = ControlTypeValue('Text')
+    Edit = ControlTypeValue('Edit')
+    Button = ControlTypeValue('Button')
+    ComboBox = ControlTypeValue('ComboBox')
+
+
+class Rect(object):
+    "A bounding rectangle"
+    def __init__(self, left, top, width, height):
+        self.Left, self.Top = left, top
+        self.Width, self.Height = width, height
+
+    def __str__(self):
+        return "(%d, %d, %d, %d)" % (
+            self.Left, self.Top, self.Width, self.Height)
+
+
+class TreeScope(object):
+    "Which elements FindAll and FindFirst look at"
+    Element = 1
+    Children = 2
+    Descendants = 4
+    Subtree = 7
+
+
+class Condition(object):
+    "A condition that every element matches"
+    def Matches(self, element):
+        return True
+
+Condition.TrueCondition = Condition()
+
+
+class _FalseCondition(Condition):
+    "A condition that no element matches"
+    def Matches(self, element):
+        return False
+
+Condition.FalseCondition = _FalseCondition()
+
+
+class PropertyCondition(Condition):
+    "A condition that the value of a property is value"
+    def __init__(self, prop, value):
+        self.prop = prop
+        self.value = value
+
+    def Matches(self, element):
+        return element.properties.get(self.prop) == self.value
+
+
+class AutomationElement(object):
+    "An element of the automation tree with fixed property values"
+
+    # number of calls to the automation provider
+    calls = 0
+
+    # how long each call to the automation provider takes
+    latency = 0
+
+    def __init__(self, properties, children = ()):
+        "properties is a dictionary of name (like 'Name') -> value"
+        self.properties = {}
+        for name, value in properties.items():
+            self.properties[_property(name)] = value
+
+        self.parent = None
+        self.children = list(children)
+        for child in self.children:
+            child.parent = self
+
+        # property -> value and the elements of a GetUpdatedCache() copy
+        self.cached_values = {}
+        self.CachedChildren = []
+
+        # the element this is a cached copy of
+        self.original = self
+
+    @classmethod
+    def _call(cls):
+        "Count a call to the automation provider"
+        cls.calls += 1
+        if cls.latency:
+            time.sleep(cls.latency)
+
+    def GetSupportedProperties(self):
+        self._call()
+        return list(self.properties)
+
+    def GetCurrentPropertyValue(self, prop):
+        self._call()
+        return self.properties.get(prop)
+
+    def _elements(self, scope):
+        "Return the elements in scope (in tree order)"
+        elements = []
+        if scope & TreeScope.Element:
+            elements.append(self)
+
+        for child in self.children:
+            if scope & (TreeScope.Children | TreeScope.Descendants):
+                elements.append(child)
+            if scope & TreeScope.Descendants:
+                elements.extend(child._elements(TreeScope.Descendants))
+        return elements
+
+    def FindAll(self, scope, condition):
+        self._call()
+        return [element for element in self._elements(scope)
+            if condition.Matches(element)]
+
+    def FindFirst(self, scope, condition):
+        self._call()
+        for element in self._elements(scope):
+            if condition.Matches(element):
+                return element
+        return None
+
+    def GetUpdatedCache(self, request):
+        self._call()
+        return self._cached_copy(request, request.TreeScope)
+
+    def _cached_copy(self, request, scope):
+        "Return a copy of the element with the properties of request cached"
+        copy = AutomationElement({})
+        copy.properties = self.properties
+        copy.parent = self.parent
+        copy.children = self.children
+        copy.original = self
+
+        if scope & TreeScope.Element:
+            for prop in request.properties:
+                copy.cached_values[prop] = self.properties.get(prop)
+
+        child_scope = 0
+        if scope & TreeScope.Children:
+            child_scope |= TreeScope.Element
+        if scope & TreeScope.Descendants:
+            child_scope |= TreeScope.Element | TreeScope.Descendants
+
+        if child_scope:
+            copy.CachedChildren = [
+                child._cached_copy(request, child_scope)
+                for child in self.children
+                if request.TreeFilter.Matches(child)]
+
+        return copy
+
+    def GetCachedPropertyValue(self, prop):
+        # reading a cached property is not a call to the provider
+        if prop not in self.cached_values:
+            raise ValueError("%r is not cached" % (prop, ))
+        return self.cached_values[prop]
+
+
+class CacheRequest(object):
+    "The properties and elements for GetUpdatedCache() to fetch"
+    def __init__(self):
+        self.properties = []
+        self.TreeScope = TreeScope.Element
+        self.TreeFilter = Condition.TrueCondition
+
+    def Add(self, prop):
+        self.properties.append(prop)
+
+
+_properties = {}
+
+def _property(name):
+    "Return the AutomationProperty called name"
+    if name not in _properties:
+        _properties[name] = AutomationProperty(name)
+        setattr(AutomationElement, name + 'Property', _properties[name])
+    return _properties[name]
+
+# the properties of make_element() that GetImportantProperties() leaves out
+_unimportant_properties = {
+    'IsPassword' : False,
+    'Orientation' : 0,
+    'IsRequiredForForm' : False,
+    'LabeledBy' : None,
+    'IsContentElement' : True,
+    'LocalizedControlType' : '',
+    'ItemStatus' : '',
+    'HasKeyboardFocus' : False,
+    'IsControlElement' : True,
+    'ItemType' : '',
+    'AcceleratorKey' : '',
+    'AccessKey' : '',
+    }
+
+for _name in ['AutomationId', 'Name', 'ClassName', 'ControlType',
+    'BoundingRectangle', 'IsEnabled', 'ProcessId', 'RuntimeId', 'HelpText',
+    'IsOffscreen', 'IsKeyboardFocusable', 'FrameworkId'] + \
+    sorted(_unimportant_properties):
+    _property(_name)
+
+
+class Automation(object):
+    "Static helpers of UI Automation"
+    @staticmethod
+    def PropertyName(prop):
+        return prop.Name
+
+
+class TreeWalker(object):
+    "Walks the elements that match condition"
+    def __init__(self, condition):
+        self.condition = condition
+
+    def _siblings(self, element):
+        AutomationElement._call()
+        if element.parent is None:
+            return [element]
+        return [child for child in element.parent.children
+            if child is element or self.condition.Matches(child)]
+
+    def GetPreviousSibling(self, element):
+        element = element.original
+        siblings = self._siblings(element)
+        pos = siblings.index(element)
+        if pos == 0:
+            return None
+        return siblings[pos - 1]
+
+    def GetNextSibling(self, element):
+        element = element.original
+        siblings = self._siblings(element)
+        pos = siblings.index(element)
+        if pos + 1 == len(siblings):
+            return None
+        return siblings[pos + 1]
+
+    def GetParent(self, element):
+        AutomationElement._call()
+        return element.parent
+
+
+class InvokePattern(object):
+    "Not used by the fake elements"
+
+
+class TextPattern(object):
+    "Not used by the fake elements"
+
+
+class SendKeys(object):
+    "Not used by the fake elements"
+    @staticmethod
+    def SendWait(keys):
+        pass
+
+
+_next_runtime_id = [0]
+
+def make_element(control_type, name, automation_id, rect, children = ()):
+    "Return an element with the usual properties"
+    _next_runtime_id[0] += 1
+    properties = dict(_unimportant_properties)
+    properties.update({
+        'AutomationId' : automation_id,
+        'Name' : name,
+        'ClassName' : control_type.ProgrammaticName[len('ControlType.'):],
+        'ControlType' : control_type,
+        'BoundingRectangle' : rect,
+        'IsEnabled' : True,
+        'ProcessId' : 1234,
+        'RuntimeId' : (42, _next_runtime_id[0]),
+        'HelpText' : '',
+        'IsOffscreen' : False,
+        'IsKeyboardFocusable' : control_type is not ControlType.Text,
+        'FrameworkId' : 'WinForm',
+        })
+    return AutomationElement(properties, children)
+
+
+def make_dialog(rows = 20, name = 'Dialog'):
+    """Return a window element with rows of a label, an edit and a
+    button"""
+    children = []
+    for row in range(rows):
+        top = row * 25
+        children.append(make_element(
+            ControlType.Text, 'Field %d' % row, 'label%d' % row,
+            Rect(10, top, 90, 20)))
+        children.append(make_element(
+            ControlType.Edit, '', 'edit%d' % row,
+            Rect(110, top, 190, 20)))
+        children.append(make_element(
+            ControlType.Button, 'Apply %d' % row, 'button%d' % row,
+            Rect(310, top, 70, 20)))
+
+    return make_element(
+        ControlType.Window, name, name.lower(), Rect(0, 0, 400, rows * 25),
+        children)
+
+
+def make_tree(depth = 3, children = 4, name = 'Tree'):
+    """Return a window element with children groups, each with children
+    groups, ... down to depth levels (the last level are edits)"""
+    def make_children(level, prefix):
+        if level == depth:
+            return []
+        control_type = ControlType.Window
+        if level == depth - 1:
+            control_type = ControlType.Edit
+        return [
+            make_element(control_type, '%s %d' % (prefix, i),
+                '%s_%d' % (prefix, i), Rect(0, 0, 10, 10),
+                make_children(level + 1, '%s_%d' % (prefix, i)))
+            for i in range(children)]
+
+    return make_element(
+        ControlType.Window, name, name.lower(), Rect(0, 0, 400, 400),
+        make_children(0, name.lower()))
+
+
+def install():
+    """Put the fake clr and System modules into sys.modules
+
+    automation_element imports findbestmatch as a sibling module (an
+    implicit relative import in IronPython) so that is made to be
+    ironpywinauto.findbestmatch too."""
+    clr = types.ModuleType('clr')
+    clr.AddReference = lambda name: None
+    clr.AddReferenceToFile = lambda name: None
+
+    system = types.ModuleType('System')
+    windows = types.ModuleType('System.Windows')
+    automation = types.ModuleType('System.Windows.Automation')
+    forms = types.ModuleType('System.Windows.Forms')
+
+    for value in (AutomationElement, PropertyCondition, TreeScope, Condition,
+        Automation, InvokePattern, TextPattern, TreeWalker, ControlType,
+        CacheRequest):
+        setattr(automation, value.__name__, value)
+    forms.SendKeys = SendKeys
+
+    system.Windows = windows
+    windows.Automation = automation
+    windows.Forms = forms
+
+    sys.modules['clr'] = clr
+    sys.modules['System'] = system
+    sys.modules['System.Windows'] = windows
+    sys.modules['System.Windows.Automation'] = automation
+    sys.modules['System.Windows.Forms'] = forms
+
+    from ironpywinauto import findbestmatch
+    sys.modules.setdefault('findbestmatch', findbestmatch)
@@ -0,0 +1,303 @@
+"""Simulated windows for pywinauto.application
+
+pywinauto needs Windows - win32functions, handleprops and controls call
+user32 through ctypes. install() puts stand ins for those modules into
+sys.modules so that pywinauto.application can be imported with CPython
+on any platform, and makes findwindows.find_windows() and
+controls.WrapHandle() use the windows of a Desktop::
+
+    import fake_windows
+    desktop = fake_windows.install()
+
+    from pywinauto import application
+    dialog = desktop.add('Dialog', process = 42)
+    application.WindowSpecification({'title' : 'Dialog'}).Wait('ready')
+
+The windows can be shown, hidden, enabled, disabled and closed while a
+wait is going on (e.g. from asyncio.get_event_loop().call_later()).
+
+The stand ins are only installed once - each test module that calls
+install() gets the same Desktop (pywinauto.application keeps using the
+modules that it was imported with). Tests start from Desktop.reset().
+
+With install(replace_find_windows = False) (or after
+use_fake_find_windows(False)) the real find_windows() runs and fetches
+the properties of the windows through the stand in handleprops. Each
+fetch of a property (which would be a call to Windows and for the text
+a message to the process of the window) is counted in Desktop.fetches.
+"""
+from __future__ import print_function
+
+import os
+import sys
+import types
+
+
+class InvalidWindowHandle(RuntimeError):
+    "Raised when a window has been closed"
+
+
+class Rect(object):
+    "The rectangle of a window like win32structures.RECT"
+
+    def __init__(self, left, top, right, bottom):
+        self.left, self.top = left, top
+        self.right, self.bottom = right, bottom
+
+
+class Window(object):
+    "A top level window or a control of the Desktop"
+
+    def __init__(self, desktop, handle, title, class_name, process, parent,
+            control_id = 0, rect = (0, 0, 100, 20)):
+        self.desktop = desktop
+        self.handle = handle
+        self.title = title
+        self.class_name = class_name
+        self.process = process
+        self.parent = parent
+        self.control_id = control_id
+        self.rect = rect
+        self.visible = True
+        self.enabled = True
+
+    # the window is a control that can be used as the label of another
+    # (see findbestmatch)
+    has_title = True
+    can_be_label = True
+
+    def _check(self, fetch):
+        "Count the fetch of a property of the window"
+        if self.handle not in self.desktop.windows:
+            raise InvalidWindowHandle(self.handle)
+        fetches = self.desktop.fetches
+        fetches[fetch] = fetches.get(fetch, 0) + 1
+
+    def WindowText(self):
+        self._check('text')
+        return self.title
+
+    def Texts(self):
+        return [self.WindowText()]
+
+    def Class(self):
+        self._check('classname')
+        return self.class_name
+
+    def FriendlyClassName(self):
+        return self.Class()
+
+    def ProcessID(self):
+        self._check('processid')
+        return self.process
+
+    def IsVisible(self):
+        self._check('isvisible')
+        return self.visible
+
+    def IsEnabled(self):
+        self._check('isenabled')
+        return self.enabled
+
+    def ControlID(self):
+        self._check('controlid')
+        return self.control_id
+
+    def Parent(self):
+        self._check('parent')
+        return self.parent
+
+    def Rectangle(self):
+        self._check('rectangle')
+        return Rect(*self.rect)
+
+    def Children(self):
+        self._check('children')
+        return [window for window in self.desktop.sorted_windows()
+            if window.parent is self]
+
+    def ControlCount(self):
+        return len(self.Children())
+
+    def close(self):
+        "Destroy the window and its controls"
+        for window in list(self.desktop.windows.values()):
+            if window.parent is self:
+                window.close()
+        self.desktop.windows.pop(self.handle, None)
+
+    def __repr__(self):
+        return '<Window %d %r>' % (self.handle, self.title)
+
+
+class Desktop(object):
+    """The simulated windows
+
+    Each call of find_windows() is counted in calls (a real one enumerates
+    the windows of the desktop). active is the window that find_windows()
+    finds with active_only."""
+
+    def __init__(self):
+        self.windows = {}
+        self.next_handle = 0x100
+        self.calls = 0
+        self.fetches = {}
+        self.active = None
+
+    def reset(self):
+        "Remove all the windows and the counts"
+        self.windows.clear()
+        self.calls = 0
+        self.fetches = {}
+        self.active = None
+
+    def add(self, title, class_name = '#32770', process = 1, parent = None,
+            **kwargs):
+        """Add a window (or a control of parent) and return it
+
+        kwargs can be control_id and rect (left, top, right, bottom)."""
+        window = Window(self, self.next_handle, title, class_name,
+            process, parent, **kwargs)
+        self.windows[window.handle] = window
+        self.next_handle += 1
+        return window
+
+    def sorted_windows(self):
+        "Return the windows in the order they were made"
+        return sorted(self.windows.values(), key = lambda w: w.handle)
+
+    def find_windows(self,
+        class_name = None,
+        parent = None,
+        process = None,
+        title = None,
+        top_level_only = True,
+        visible_only = True,
+        enabled_only = False,
+        best_match = None,
+        handle = None,
+        active_only = False,
+        **kwargs):
+        "Return the handles of the windows that match like findwindows does"
+        self.calls += 1
+
+        if handle is not None:
+            return [handle]
+
+        windows = []
+        for window in self.sorted_windows():
+            if parent is not None:
+                if window.parent is None or window.parent.handle != parent:
+                    continue
+            elif top_level_only and window.parent is not None:
+                continue
+            if class_name is not None and window.class_name != class_name:
+                continue
+            if process is not None and window.process != process:
+                continue
+            if title is not None and window.title != title:
+                continue
+            if best_match is not None and \
+                    window.title.replace(' ', '') != best_match.replace(' ', ''):
+                continue
+            if visible_only and not window.visible:
+                continue
+            if enabled_only and not window.enabled:
+                continue
+            if active_only and window is not self.active:
+                continue
+            windows.append(window.handle)
+
+        return windows
+
+    def top_level(self):
+        "Return the handles of the top level windows - like enum_windows()"
+        return [window.handle for window in self.sorted_windows()
+            if window.parent is None]
+
+    def children(self, handle):
+        """Return the handles of the children of a window (or all the
+        windows for the desktop - handle None)"""
+        if handle is None:
+            return [window.handle for window in self.sorted_windows()]
+        return [window.handle for window in self.wrap(handle).Children()]
+
+    def wrap(self, handle):
+        "Return the window of a handle - like controls.WrapHandle()"
+        if handle not in self.windows:
+            raise InvalidWindowHandle(handle)
+        return self.windows[handle]
+
+
+# the Desktop of the installed stand ins and the find_windows() of
+# pywinauto (see install)
+_desktop = None
+_real_find_windows = None
+
+
+def install(replace_find_windows = True):
+    """Put the stand in Windows modules of pywinauto into sys.modules and
+    return the Desktop that pywinauto will find windows in
+
+    The modules are only put in the first time - later calls return the
+    same Desktop. If replace_find_windows is False findwindows.find_windows()
+    is not replaced - only the functions that it calls to get the windows
+    (see use_fake_find_windows)."""
+    global _desktop, _real_find_windows
+    if _desktop is not None:
+        use_fake_find_windows(replace_find_windows)
+        return _desktop
+
+    sys.path.insert(0, os.path.join(
+        os.path.dirname(__file__), os.pardir, 'pywinauto_source'))
+
+    desktop = Desktop()
+
+    modules = {}
+    for name in ('win32structures', 'win32functions', 'win32defines',
+        'handleprops', 'controls', 'controls.win32_controls'):
+        modules[name] = types.ModuleType('pywinauto.' + name)
+        sys.modules['pywinauto.' + name] = modules[name]
+
+    controls = modules['controls']
+    controls.__path__ = []
+    controls.win32_controls = modules['controls.win32_controls']
+    controls.win32_controls.DialogWrapper = Window
+    controls.InvalidWindowHandle = InvalidWindowHandle
+    controls.WrapHandle = desktop.wrap
+
+    handleprops = modules['handleprops']
+    handleprops.iswindow = lambda handle: handle in desktop.windows
+    handleprops.classname = lambda handle: desktop.wrap(handle).Class()
+    handleprops.processid = lambda handle: desktop.wrap(handle).ProcessID()
+    handleprops.isvisible = lambda handle: desktop.wrap(handle).IsVisible()
+    handleprops.isenabled = lambda handle: desktop.wrap(handle).IsEnabled()
+    handleprops.controlid = lambda handle: desktop.wrap(handle).ControlID()
+    handleprops.text = lambda handle: desktop.wrap(handle).WindowText()
+    handleprops.parent = lambda handle: getattr(
+        desktop.wrap(handle).Parent(), 'handle', 0)
+    handleprops.children = desktop.children
+    modules['win32functions'].GetDesktopWindow = lambda: None
+
+    import pywinauto
+    for name in ('win32structures', 'win32functions', 'win32defines',
+        'handleprops', 'controls'):
+        setattr(pywinauto, name, modules[name])
+
+    from pywinauto import findwindows
+    findwindows.enum_windows = desktop.top_level
+    _real_find_windows = findwindows.find_windows
+    _desktop = desktop
+    use_fake_find_windows(replace_find_windows)
+
+    return desktop
+
+
+def use_fake_find_windows(fake = True):
+    """Make findwindows.find_windows() the one of the Desktop (or the real
+    one of pywinauto if fake is False)"""
+    from pywinauto import findwindows
+    if fake:
+        findwindows.find_windows = _desktop.find_windows
+    else:
+        findwindows.find_windows = _real_find_windows
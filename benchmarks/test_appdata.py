@@ -0,0 +1,245 @@
+"""Tests of the application data of pywinauto (pywinauto.appdata)
+
+The store is tested on its own and recording and replaying the controls
+of a script with simulated windows (see fake_windows). The tests are
+skipped on Python 2 (pywinauto can only be imported without Windows
+through fake_windows, which needs Python 3).
+
+Run from the root of the repository::
+
+    python benchmarks/test_appdata.py
+"""
+from __future__ import print_function
+
+import os
+import sys
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+if sys.version_info[0] >= 3:
+    import fake_windows
+    desktop = fake_windows.install()
+
+    from pywinauto import application, appdata, findwindows
+    from pywinauto.timings import Timings
+
+
+def options_dialog(desktop, title, ok, cancel):
+    "Add a dialog with an OK and a Cancel button and return it"
+    dialog = desktop.add(title, '#32770', rect = (100, 100, 400, 300))
+    desktop.add(ok, 'Button', parent = dialog, control_id = 1,
+        rect = (110, 250, 190, 270))
+    desktop.add(cancel, 'Button', parent = dialog, control_id = 2,
+        rect = (200, 250, 280, 270))
+    desktop.add('', 'Edit', parent = dialog, control_id = 1001)
+    return dialog
+
+
+# the steps of a script - each resolves its control in its own place
+def ok_button(app):
+    "Return the OK button of the Options dialog"
+    return app.Options.OK.WrapperObject()
+
+
+def cancel_button(app):
+    "Return the Cancel button of the Options dialog"
+    return app.Options.Cancel.WrapperObject()
+
+
+@unittest.skipIf(sys.version_info[0] < 3, "fake_windows needs Python 3")
+class AppDataStoreTestCase(unittest.TestCase):
+    "Unit tests for writing and reading application data"
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'app.data')
+
+        desktop.reset()
+        self.dialog = options_dialog(desktop, 'Options', 'OK', 'Cancel')
+        self.ok, self.cancel = self.dialog.Children()[:2]
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def testRecord(self):
+        "Make sure a record has the properties of the windows"
+        store = appdata.AppDataStore()
+        criteria = [{'best_match' : 'Options'}, {'best_match' : 'OK'}]
+        store.append(criteria, (self.dialog, self.ok))
+
+        record = store.lookup(criteria)
+        self.assertEqual(record['dialog']['class'], '#32770')
+        self.assertEqual(record['dialog']['control_count'], 3)
+        self.assertEqual(record['dialog']['rect'], [100, 100, 400, 300])
+        self.assertEqual(record['control']['control_id'], 1)
+        self.assertEqual(record['control']['text_hash'],
+            appdata.text_hash('OK'))
+        self.assertEqual(store.lookup(criteria, 1), None)
+        self.assertEqual(store.lookup(criteria[:1]), None)
+
+    def testSignature(self):
+        "Make sure the texts and process do not change the signature"
+        self.assertEqual(
+            appdata.criteria_signature(
+                [{'best_match' : 'Options', 'process' : 12}, {'title' : 'OK'}]),
+            appdata.criteria_signature(
+                [{'best_match' : 'Optionen', 'process' : 34}, {'title' : 'Ja'}]))
+        self.assertNotEqual(
+            appdata.criteria_signature([{'class_name' : 'Edit'}]),
+            appdata.criteria_signature([{'class_name' : 'Button'}]))
+
+        # the names of the criteria are kept
+        self.assertNotEqual(
+            appdata.criteria_signature([{'best_match' : 'Options'}]),
+            appdata.criteria_signature([{'title' : 'Options'}]))
+
+        # and the place in the script
+        self.assertNotEqual(
+            appdata.criteria_signature([{'title' : 'OK'}], 'script.py:10'),
+            appdata.criteria_signature([{'title' : 'OK'}], 'script.py:11'))
+        position, line = appdata.script_position(), sys._getframe().f_lineno
+        self.assertEqual(position, 'test_appdata.py:%d' % line)
+
+    def testAppend(self):
+        "Make sure records are appended to the file and read back in order"
+        store = appdata.AppDataStore(self.filename)
+        self.assertEqual(store.exists(), False)
+        criteria = [{'best_match' : 'Options'}, {'best_match' : 'OK'}]
+        store.append(criteria, (self.dialog, self.ok))
+        size = os.path.getsize(self.filename)
+        store.append(criteria, (self.dialog, self.cancel))
+        store.append(criteria[:1], (self.dialog, ))
+
+        datafile = open(self.filename, 'rb')
+        data = datafile.read()
+        datafile.close()
+        self.assertTrue(data.startswith(b'pywinauto-appdata\t1\n'))
+        self.assertEqual(data.count(b'\n'), 4)
+        self.assertTrue(len(data) < size * 3)
+
+        replay = appdata.AppDataStore(self.filename)
+        self.assertEqual(replay._index, None)
+        self.assertEqual(len(replay), 3)
+        self.assertEqual(
+            [replay.next_record(criteria)['control']['control_id']
+                for i in range(2)],
+            [1, 2])
+        self.assertEqual(replay.next_record(criteria), None)
+        self.assertEqual(replay.next_record(criteria[:1])['control'], None)
+
+        replay.rewind()
+        self.assertEqual(replay.next_record(criteria)['control']['control_id'], 1)
+
+        copy = os.path.join(self.directory, 'copy.data')
+        replay.save(copy)
+        self.assertEqual(len(appdata.AppDataStore(copy)), 3)
+
+    def testBadFile(self):
+        "Make sure files that are not application data raise AppDataError"
+        datafile = open(self.filename, 'wb')
+        datafile.write(b'\x80\x02]q\x00.')
+        datafile.close()
+        self.assertRaises(appdata.AppDataError,
+            len, appdata.AppDataStore(self.filename))
+
+        datafile = open(self.filename, 'wb')
+        datafile.write(b'pywinauto-appdata\t99\n')
+        datafile.close()
+        self.assertRaises(appdata.AppDataError,
+            len, appdata.AppDataStore(self.filename))
+
+
+@unittest.skipIf(sys.version_info[0] < 3, "fake_windows needs Python 3")
+class ReplayTestCase(unittest.TestCase):
+    "Unit tests for finding controls from recorded application data"
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'app.data')
+        desktop.reset()
+
+        self.find_timeout = Timings.window_find_timeout
+        Timings.window_find_timeout = .5
+
+    def tearDown(self):
+        Timings.window_find_timeout = self.find_timeout
+        shutil.rmtree(self.directory)
+
+    def app(self, record = True):
+        app = application.Application(self.filename, record)
+        app.process = 1
+        return app
+
+    def testNoRecord(self):
+        "Make sure nothing is recorded unless it is asked for"
+        options_dialog(desktop, 'Options', 'OK', 'Cancel')
+        app = self.app(record = False)
+        self.assertEqual(ok_button(app).ControlID(), 1)
+        self.assertEqual(app.record, False)
+        self.assertEqual(os.path.exists(self.filename), False)
+
+    def testReplay(self):
+        "Make sure the recorded controls are found in another language"
+        options_dialog(desktop, 'Options', 'OK', 'Cancel')
+        app = self.app()
+        self.assertEqual(app.use_history, False)
+        self.assertEqual(cancel_button(app).ControlID(), 2)
+        self.assertEqual(ok_button(app).ControlID(), 1)
+        self.assertEqual(len(app.app_data), 2)
+
+        desktop.reset()
+        options_dialog(desktop, 'Optionen', 'Ja', 'Abbrechen')
+        app = self.app()
+        self.assertEqual(app.use_history, True)
+        self.assertEqual(cancel_button(app).WindowText(), 'Abbrechen')
+        self.assertEqual(ok_button(app).WindowText(), 'Ja')
+        self.assertRaises(findwindows.WindowNotFoundError, ok_button, app)
+
+    def testReplayOtherOrder(self):
+        "Make sure controls are found when the script uses them in another order"
+        options_dialog(desktop, 'Options', 'OK', 'Cancel')
+        app = self.app()
+        cancel_button(app)
+        ok_button(app)
+
+        desktop.reset()
+        options_dialog(desktop, 'Optionen', 'Ja', 'Abbrechen')
+        app = self.app()
+        self.assertEqual(ok_button(app).WindowText(), 'Ja')
+        self.assertEqual(cancel_button(app).WindowText(), 'Abbrechen')
+
+    def testControlGone(self):
+        "Make sure a recorded control that is not there is not found"
+        options_dialog(desktop, 'Options', 'OK', 'Cancel')
+        cancel_button(self.app())
+
+        desktop.reset()
+        dialog = desktop.add('Optionen', '#32770')
+        desktop.add('Abbrechen', 'Static', parent = dialog, control_id = 2)
+        self.assertRaises(
+            findwindows.WindowNotFoundError, cancel_button, self.app())
+
+    def testReplayWaits(self):
+        "Make sure a replayed dialog is waited for until it appears"
+        options_dialog(desktop, 'Options', 'OK', 'Cancel')
+        ok_button(self.app())
+
+        desktop.reset()
+        timer = threading.Timer(
+            .2, options_dialog, (desktop, 'Optionen', 'Ja', 'Abbrechen'))
+        timer.start()
+        try:
+            start = time.time()
+            self.assertEqual(ok_button(self.app()).WindowText(), 'Ja')
+            self.assertTrue(time.time() - start >= .2)
+        finally:
+            timer.join()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+"""Tests of the asyncio waits of pywinauto (pywinauto.asyncwaits)
+
+The windows are simulated (see fake_windows) and are shown, enabled and
+closed by callbacks of the event loop while the waits are going on.
+The tests are skipped on Pythons without asyncio.
+
+Run from the root of the repository::
+
+    python benchmarks/test_asyncwaits.py
+"""
+from __future__ import print_function
+
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+try:
+    import asyncio
+except ImportError:
+    asyncio = None
+
+if asyncio:
+    import fake_windows
+    desktop = fake_windows.install()
+
+    from pywinauto import application, findwindows, asyncwaits
+
+
+@unittest.skipIf(asyncio is None, "asyncio is not available")
+class AsyncWaitsTestCase(unittest.TestCase):
+    "Unit tests for waiting for simulated windows on an event loop"
+
+    def setUp(self):
+        desktop.reset()
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def run_loop(self, awaitable):
+        return self.loop.run_until_complete(awaitable)
+
+    def spec(self, title):
+        return application.WindowSpecification({'title' : title})
+
+    def testWaitReady(self):
+        "Make sure wait_async returns when the window becomes ready"
+        dialog = desktop.add('Dialog')
+        dialog.enabled = False
+        self.loop.call_later(.05, setattr, dialog, 'enabled', True)
+
+        start = time.time()
+        self.assertEqual(
+            self.run_loop(self.spec('Dialog').wait_async(
+                'ready', timeout = 2, retry_interval = .01)),
+            dialog)
+        self.assertTrue(time.time() - start < 1)
+
+    def testWaitTimeout(self):
+        "Make sure wait_async raises the error of the last try"
+        self.assertRaises(findwindows.WindowNotFoundError,
+            self.run_loop,
+            self.spec('Nothing').wait_async('exists', timeout = .05))
+
+    def testExists(self):
+        "Make sure exists_async finds windows that appear"
+        self.loop.call_later(.05, desktop.add, 'Later')
+        self.assertEqual(
+            self.run_loop(self.spec('Later').exists_async(1, .01)), True)
+        self.assertEqual(
+            self.run_loop(self.spec('Never').exists_async(.05, .01)), False)
+
+    def testWaitNot(self):
+        "Make sure wait_not_async returns when the window is closed"
+        dialog = desktop.add('Progress')
+        self.loop.call_later(.05, dialog.close)
+        self.run_loop(self.spec('Progress').wait_not_async(
+            'exists', timeout = 2, retry_interval = .01))
+        self.assertEqual(desktop.windows, {})
+
+        desktop.add('Stays')
+        self.assertRaises(RuntimeError, self.run_loop,
+            self.spec('Stays').wait_not_async('visible', timeout = .05))
+
+    def testResolve(self):
+        "Make sure resolve_async finds a control of a dialog"
+        dialog = desktop.add('Dialog')
+        self.loop.call_later(.03, desktop.add, 'OK', 'Button', 1, dialog)
+
+        ctrls = self.run_loop(asyncwaits.resolve_async(
+            [{'title' : 'Dialog'}, {'best_match' : 'OK'}], 1, .01))
+        self.assertEqual([ctrl.WindowText() for ctrl in ctrls],
+            ['Dialog', 'OK'])
+
+    def testCancel(self):
+        "Make sure a wait can be given a shorter timeout and be cancelled"
+        start = time.time()
+        self.assertRaises(asyncio.TimeoutError, self.run_loop,
+            asyncio.wait_for(
+                self.spec('Nothing').wait_async('exists', timeout = 10), .1))
+        self.assertTrue(time.time() - start < 1)
+
+    def testSameSpec(self):
+        "Make sure waits on the same window specification do not mix"
+        dialog = desktop.add('Dialog')
+        dialog.enabled = False
+        self.loop.call_later(.1, setattr, dialog, 'enabled', True)
+
+        spec = self.spec('Dialog')
+        ready = self.loop.create_task(
+            spec.wait_async('ready', timeout = 2, retry_interval = .01))
+        exists = self.loop.create_task(spec.exists_async(1, .01))
+
+        # exists returns at once - the ready wait only once it is enabled
+        self.assertEqual(self.run_loop(exists), True)
+        self.assertEqual(dialog.enabled, False)
+        self.assertEqual(self.run_loop(ready).enabled, True)
+        self.assertEqual(spec.criteria, [{'title' : 'Dialog'}])
+
+    def testMany(self):
+        "Make sure many waits run at the same time on one loop"
+        for i in range(20):
+            self.loop.call_later(.01 * i, desktop.add, 'Dialog %d' % i)
+
+        waits = [self.loop.create_task(self.spec('Dialog %d' % i).wait_async(
+            'ready', timeout = 2, retry_interval = .01)) for i in range(20)]
+
+        start = time.time()
+        dialogs = self.run_loop(asyncio.gather(*waits))
+        self.assertEqual([dialog.title for dialog in dialogs],
+            ['Dialog %d' % i for i in range(20)])
+        # one after the other they would take at least .01 * (0 + 1 + .. 19)
+        self.assertTrue(time.time() - start < 1.9)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,565 @@
+"""Tests of PythonicAutomationElement with the fake_automation stand in
+
+Run from the root of the repository::
+
+    python benchmarks/test_automation_element.py
+"""
+from __future__ import print_function
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, os.path.dirname(__file__))
+
+import fake_automation
+fake_automation.install()
+
+from ironpywinauto import automation_element
+from ironpywinauto import tree_snapshot
+from ironpywinauto.automation_element import PythonicAutomationElement
+
+AutomationElement = fake_automation.AutomationElement
+
+
+class SnapshotTestCase(unittest.TestCase):
+    "Unit tests for building the names from a snapshot"
+
+    def setUp(self):
+        self.dialog = fake_automation.make_dialog(rows = 10)
+        automation_element.use_snapshots = False
+
+    def tearDown(self):
+        automation_element.use_snapshots = False
+
+    def updated(self, use_snapshots):
+        "Return the updated element of the dialog and the calls it took"
+        automation_element.use_snapshots = use_snapshots
+        element = PythonicAutomationElement(self.dialog)
+        AutomationElement.calls = 0
+        element.UpdateElementsAndCombinations()
+        return element, AutomationElement.calls
+
+    def testSameNames(self):
+        "Make sure a snapshot gives the same names for the same elements"
+        element, calls = self.updated(False)
+        snapshot_element, snapshot_calls = self.updated(True)
+
+        self.assertEqual(
+            snapshot_element.ElementNamesCombinations,
+            element.ElementNamesCombinations)
+        self.assertEqual(
+            [el.elem.original for el in snapshot_element.ElementsExtended],
+            [el.elem.original for el in element.ElementsExtended])
+
+    def testRoundTrips(self):
+        "Make sure a snapshot takes one call to the provider"
+        element, calls = self.updated(False)
+        snapshot_element, snapshot_calls = self.updated(True)
+
+        print("calls: %d, with a snapshot: %d" % (calls, snapshot_calls))
+        self.assertEqual(snapshot_calls, 1)
+        self.assertTrue(calls > len(element.Elements) * 4)
+
+    def testRuntimeIdsWithTree(self):
+        "Make sure the RuntimeIds come with the tree without a snapshot"
+        fetched = []
+        get_value = AutomationElement.GetCurrentPropertyValue
+        def record(elem, prop):
+            fetched.append(prop)
+            return get_value(elem, prop)
+
+        AutomationElement.GetCurrentPropertyValue = record
+        try:
+            element, calls = self.updated(False)
+        finally:
+            AutomationElement.GetCurrentPropertyValue = get_value
+
+        self.assertTrue(fetched)
+        self.assertTrue(AutomationElement.RuntimeIdProperty not in fetched)
+        self.assertEqual(
+            element.Elements[0].GetRuntimeId(),
+            tuple(self.dialog.children[0].properties[
+                AutomationElement.RuntimeIdProperty]))
+
+    def testEmpty(self):
+        "Make sure an element without descendants gives no names"
+        self.dialog = fake_automation.make_dialog(rows = 0)
+        snapshot_element, snapshot_calls = self.updated(True)
+
+        self.assertEqual(snapshot_element.Elements, [])
+        self.assertEqual(snapshot_element.ElementNamesCombinations, [])
+
+
+class RelativeNamesTestCase(unittest.TestCase):
+    "Unit tests for naming elements after their previous sibling"
+
+    def setUp(self):
+        automation_element.use_snapshots = False
+
+    def tearDown(self):
+        automation_element.use_snapshots = False
+
+    def nested_dialog(self):
+        "Return a dialog with an edit after a group with an edit in it"
+        make_element = fake_automation.make_element
+        ControlType = fake_automation.ControlType
+        Rect = fake_automation.Rect
+        return make_element(ControlType.Window, 'Dialog', 'dialog',
+            Rect(0, 0, 400, 100), [
+                make_element(ControlType.Text, 'Outer', 'outer_label',
+                    Rect(10, 10, 90, 20)),
+                make_element(ControlType.Window, 'Group', 'group',
+                    Rect(10, 30, 380, 40), [
+                        make_element(ControlType.Text, 'Inner', 'inner_label',
+                            Rect(20, 40, 90, 20)),
+                        make_element(ControlType.Edit, '', 'inner_edit',
+                            Rect(120, 40, 190, 20)),
+                        ]),
+                make_element(ControlType.ComboBox, '', 'outer_combo',
+                    Rect(10, 80, 190, 20)),
+                make_element(ControlType.Edit, '', 'first_edit',
+                    Rect(10, 80, 190, 20), [
+                        make_element(ControlType.Edit, '', 'nested_edit',
+                            Rect(10, 80, 190, 20)),
+                        ]),
+                ])
+
+    def relative_names(self, use_snapshots):
+        "Return the relative names and the calls it took to find them"
+        automation_element.use_snapshots = use_snapshots
+        element = PythonicAutomationElement(self.nested_dialog())
+        AutomationElement.calls = 0
+        element.UpdateElementsAndCombinations()
+        relative = len(element.Elements) * 6
+        return dict(zip(
+            element.ElementNamesCombinations[relative:],
+            [el.AutomationId for el in element.ElementsExtended[relative:]]))
+
+    def testRelativeNames(self):
+        "Make sure the previous sibling comes from the parent of an element"
+        expected = {
+            'inner_labelEdit' : 'inner_edit',
+            'InnerEdit' : 'inner_edit',
+            'groupComboBox' : 'outer_combo',
+            'GroupComboBox' : 'outer_combo',
+            'outer_comboEdit' : 'first_edit',
+            'Edit' : 'first_edit',
+            }
+        self.assertEqual(self.relative_names(False), expected)
+        self.assertEqual(self.relative_names(True), expected)
+
+    def testNoTreeWalker(self):
+        "Make sure no calls are made for the previous siblings"
+        automation_element.use_snapshots = True
+        element = PythonicAutomationElement(self.nested_dialog())
+        AutomationElement.calls = 0
+        element.UpdateElementsAndCombinations()
+        self.assertEqual(AutomationElement.calls, 1)
+
+
+class RefreshTestCase(unittest.TestCase):
+    "Unit tests for patching the names when the descendants change"
+
+    def setUp(self):
+        self.dialog = fake_automation.make_dialog(rows = 10)
+        automation_element.use_snapshots = False
+
+    def tearDown(self):
+        automation_element.use_snapshots = False
+
+    def names(self, element):
+        """Return a dictionary of name -> automation id of the names of
+        element that are not duplicated"""
+        names = {}
+        duplicated = set()
+        for name, el in zip(
+            element.ElementNamesCombinations, element.ElementsExtended):
+
+            if name in names:
+                duplicated.add(name)
+            names[name] = el.AutomationId
+
+        for name in duplicated:
+            del names[name]
+        return names
+
+    def change_dialog(self):
+        """Remove the second row of the dialog and the label of the third
+        row and put a new label and edit in their place"""
+        for child in self.dialog.children[3:7]:
+            child.parent = None
+        new_row = [
+            fake_automation.make_element(
+                fake_automation.ControlType.Text, 'Field 1', 'new_label',
+                fake_automation.Rect(10, 25, 90, 20)),
+            fake_automation.make_element(
+                fake_automation.ControlType.Edit, '', 'new_edit',
+                fake_automation.Rect(110, 25, 190, 20)),
+            ]
+        for child in new_row:
+            child.parent = self.dialog
+        self.dialog.children[3:7] = new_row
+
+    def check_refresh(self):
+        element = PythonicAutomationElement(self.dialog)
+        element.UpdateElementsAndCombinations()
+        names = self.names(element)
+        combinations = element.ElementNamesCombinations
+
+        self.change_dialog()
+        element.Invalidate()
+        AutomationElement.calls = 0
+        element.UpdateElementsAndCombinations()
+        refresh_calls = AutomationElement.calls
+
+        # the lists are patched rather than replaced
+        self.assertTrue(element.ElementNamesCombinations is combinations)
+
+        refreshed = self.names(element)
+        for name, automation_id in names.items():
+            if automation_id in ('label1', 'edit1', 'button1', 'label2'):
+                self.assertNotEqual(refreshed.get(name), automation_id)
+            elif automation_id == 'edit2' and name.endswith('2Edit'):
+                # named after the new edit rather than the old label
+                self.assertTrue(name not in refreshed)
+            else:
+                # (unless a new name duplicates it)
+                self.assertEqual(refreshed.get(name, automation_id), automation_id)
+                self.assertTrue(name in element.ElementNamesCombinations)
+
+        self.assertEqual(refreshed['new_label'], 'new_label')
+        self.assertEqual(refreshed['Field 1'], 'new_label')
+        self.assertEqual(refreshed['new_labelEdit'], 'new_edit')
+        self.assertEqual(refreshed['new_editEdit'], 'edit2')
+        self.assertEqual(
+            [el.AutomationId for el in element.Elements],
+            [child.properties[AutomationElement.AutomationIdProperty]
+                for child in self.dialog.children])
+
+        # the names look the same as the names of a new element (apart
+        # from the numbers of duplicated names)
+        new_element = PythonicAutomationElement(self.dialog)
+        new_element.UpdateElementsAndCombinations()
+        self.assertEqual(
+            sorted(set(element.ElementsExtended), key = id),
+            sorted(set(element.Elements), key = id))
+        self.assertEqual(
+            len(element.ElementNamesCombinations),
+            len(new_element.ElementNamesCombinations))
+        return refresh_calls, AutomationElement.calls - refresh_calls
+
+    def testRefresh(self):
+        "Make sure only the new elements are looked at when refreshing"
+        refresh_calls, new_calls = self.check_refresh()
+        self.assertTrue(refresh_calls * 2 < new_calls)
+
+    def testRefreshSnapshot(self):
+        "Make sure refreshing works with snapshots"
+        automation_element.use_snapshots = True
+        refresh_calls, new_calls = self.check_refresh()
+        self.assertEqual(refresh_calls, 1)
+
+    def testNotChanged(self):
+        "Make sure refreshing without changes leaves the names alone"
+        element = PythonicAutomationElement(self.dialog)
+        element.UpdateElementsAndCombinations()
+        combinations = list(element.ElementNamesCombinations)
+        extended = list(element.ElementsExtended)
+
+        element.Invalidate()
+        element.UpdateElementsAndCombinations()
+        self.assertEqual(element.ElementNamesCombinations, combinations)
+        self.assertEqual(element.ElementsExtended, extended)
+
+    def testMaxAge(self):
+        "Make sure the descendants are only checked again after MaxAge"
+        element = PythonicAutomationElement(self.dialog)
+        element.UpdateElementsAndCombinations()
+
+        self.change_dialog()
+        element.UpdateElementsAndCombinations()
+        self.assertTrue('new_label' not in element.ElementNamesCombinations)
+
+        element.MaxAge = 60
+        element.UpdateElementsAndCombinations()
+        self.assertTrue('new_label' not in element.ElementNamesCombinations)
+
+        element.MaxAge = 0
+        element.UpdateElementsAndCombinations()
+        self.assertTrue('new_label' in element.ElementNamesCombinations)
+
+
+class ControlIdentifiersTestCase(unittest.TestCase):
+    "Unit tests for GetQueriesFor and writing the control identifiers"
+
+    def setUp(self):
+        self.dialog = fake_automation.make_dialog(rows = 10)
+        automation_element.use_snapshots = False
+
+    def testGetQueriesFor(self):
+        "Make sure GetQueriesFor gives the names of the control"
+        element = PythonicAutomationElement(self.dialog)
+        element.UpdateElementsAndCombinations()
+
+        expected = {}
+        for name, el in zip(
+            element.ElementNamesCombinations, element.ElementsExtended):
+
+            if name != '':
+                expected.setdefault(el.AutomationId, []).append(name)
+
+        children = element.FindAll(
+            fake_automation.TreeScope.Children,
+            fake_automation.Condition.TrueCondition)
+        AutomationElement.calls = 0
+        for ctrl in children:
+            self.assertEqual(
+                sorted(element.GetQueriesFor(ctrl)),
+                sorted(element.FilterQueries(expected[ctrl.AutomationId])))
+
+        # one call for each element to make the index and one for the
+        # AutomationId of ctrl
+        self.assertEqual(AutomationElement.calls, len(children) * 3)
+
+    def testWriteText(self):
+        "Make sure the text has four lines and a blank line for a control"
+        out = StringIO()
+        PythonicAutomationElement(self.dialog).WriteControlIdentifiers(out)
+        lines = out.getvalue().split('\n')
+        self.assertEqual(len(lines), 30 * 5 + 1)
+        self.assertEqual(lines[0], "Text - 'Field 0'   (10, 0, 90, 20)")
+        self.assertEqual(lines[2], "\tAutomationId: 'label0'")
+        self.assertTrue(lines[3].startswith("\tQueries:["))
+        self.assertTrue("'Field_0'" in lines[3])
+        self.assertEqual(lines[4], "")
+
+    def testWriteJson(self):
+        "Make sure a JSON object is written for each control in tree order"
+        dialog = RelativeNamesTestCase('testRelativeNames').nested_dialog()
+        out = StringIO()
+        PythonicAutomationElement(dialog).WriteControlIdentifiers(
+            out, format = 'json')
+
+        ctrls = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(
+            [(ctrl['depth'], ctrl['automation_id']) for ctrl in ctrls], [
+                (0, 'outer_label'), (0, 'group'), (1, 'inner_label'),
+                (1, 'inner_edit'), (0, 'outer_combo'), (0, 'first_edit'),
+                (1, 'nested_edit')])
+        self.assertEqual(
+            sorted(ctrls[3]['queries']),
+            ['Edit', 'Edit_inner_edit', 'InnerEdit', 'inner_edit',
+                'inner_labelEdit'])
+
+    def testStreaming(self):
+        "Make sure controls are yielded before the rest are looked at"
+        element = PythonicAutomationElement(self.dialog)
+        identifiers = element.IterControlIdentifiers()
+        next(identifiers)
+        calls = AutomationElement.calls
+        next(identifiers)
+        self.assertTrue(AutomationElement.calls - calls < 50)
+
+    def testBadFormat(self):
+        "Make sure an unknown format raises ValueError"
+        element = PythonicAutomationElement(self.dialog)
+        self.assertRaises(
+            ValueError, element.WriteControlIdentifiers, StringIO(), 'xml')
+
+
+class ParallelEnumerationTestCase(unittest.TestCase):
+    "Unit tests for enumerating the descendants on many threads"
+
+    def setUp(self):
+        self.tree = fake_automation.make_tree(depth = 3, children = 4)
+        automation_element.use_snapshots = False
+
+    def tearDown(self):
+        automation_element.use_snapshots = False
+        automation_element.parallel_workers = 0
+        automation_element.parallel_max_depth = None
+        automation_element.parallel_max_elements = None
+        AutomationElement.latency = 0
+
+    def enumerate(self, workers = 4, max_depth = None, max_elements = None):
+        return automation_element._enumerate_parallel(
+            self.tree, workers, max_depth, max_elements)
+
+    def descendants(self, element):
+        return element._elements(fake_automation.TreeScope.Descendants)
+
+    def testOrder(self):
+        "Make sure the elements are in the same order as FindAll gives"
+        expected = self.descendants(self.tree)
+        self.assertEqual(len(expected), 4 + 16 + 64)
+        for workers in (1, 3, 8):
+            self.assertEqual(
+                [el.elem for el in self.enumerate(workers)], expected)
+
+    def testPreviousSibling(self):
+        "Make sure each element has its previous sibling"
+        for el in self.enumerate():
+            siblings = el.elem.parent.children
+            index = siblings.index(el.elem)
+            if index == 0:
+                self.assertEqual(el.PreviousSibling, None)
+            else:
+                self.assertTrue(el.PreviousSibling.elem is siblings[index - 1])
+
+    def testMaxDepth(self):
+        "Make sure only max_depth levels are fetched"
+        AutomationElement.calls = 0
+        self.assertEqual(
+            [el.elem for el in self.enumerate(max_depth = 1)],
+            self.tree.children)
+        self.assertEqual(AutomationElement.calls, 1)
+
+        self.assertEqual(len(self.enumerate(max_depth = 2)), 4 + 16)
+
+    def testMaxElements(self):
+        "Make sure only the first max_elements of the levels are fetched"
+        elements = [el.elem for el in self.enumerate(max_elements = 10)]
+
+        # the 4 children and the first 6 grandchildren (in tree order)
+        grandchildren = self.tree.children[0].children + \
+            self.tree.children[1].children[:2]
+        expected = [el for el in self.descendants(self.tree)
+            if el in self.tree.children or el in grandchildren]
+        self.assertEqual(elements, expected)
+
+        # the same elements each time
+        for i in range(5):
+            self.assertEqual(
+                [el.elem for el in self.enumerate(8, max_elements = 10)],
+                expected)
+
+    def testFaster(self):
+        "Make sure the children are fetched at the same time"
+        AutomationElement.latency = 0.005
+
+        start = time.time()
+        self.enumerate(workers = 1)
+        serial = time.time() - start
+
+        start = time.time()
+        self.enumerate(workers = 16)
+        parallel = time.time() - start
+
+        print("one thread: %.3f s, 16 threads: %.3f s" % (serial, parallel))
+        self.assertTrue(parallel * 2 < serial)
+
+    def testError(self):
+        "Make sure an error fetching children is raised by the caller"
+        def find_all(scope, condition):
+            raise ValueError("element not available")
+        self.tree.children[2].FindAll = find_all
+
+        threads = threading.active_count()
+        self.assertRaises(ValueError, self.enumerate)
+        self.assertEqual(threading.active_count(), threads)
+
+    def testSameNames(self):
+        "Make sure the names are the same as without threads"
+        element = PythonicAutomationElement(self.tree)
+        element.UpdateElementsAndCombinations()
+
+        automation_element.parallel_workers = 4
+        parallel_element = PythonicAutomationElement(self.tree)
+        parallel_element.UpdateElementsAndCombinations()
+        self.assertEqual(
+            parallel_element.ElementNamesCombinations,
+            element.ElementNamesCombinations)
+
+        self.assertEqual(
+            [el.elem for el in parallel_element.FindAll(
+                fake_automation.TreeScope.Descendants,
+                fake_automation.Condition.TrueCondition)],
+            self.descendants(self.tree))
+
+
+class SaveSnapshotTestCase(unittest.TestCase):
+    "Unit tests for saving an element and its descendants to a file"
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'dialog.snap')
+        automation_element.use_snapshots = False
+
+    def tearDown(self):
+        automation_element.use_snapshots = False
+        shutil.rmtree(self.directory)
+
+    def load(self, dialog):
+        "Save dialog and return the root element of the snapshot"
+        PythonicAutomationElement(dialog).SaveSnapshot(self.filename)
+        self.snapshot = tree_snapshot.load_snapshot(self.filename)
+        self.addCleanup(self.snapshot.close)
+        return self.snapshot.root
+
+    def testSameNames(self):
+        "Make sure the saved tree gives the same names without any calls"
+        dialog = RelativeNamesTestCase('testRelativeNames').nested_dialog()
+        root = self.load(dialog)
+
+        for use_snapshots in (False, True):
+            automation_element.use_snapshots = use_snapshots
+            element = PythonicAutomationElement(dialog)
+            element.UpdateElementsAndCombinations()
+            automation_ids = [
+                el.AutomationId for el in element.ElementsExtended]
+
+            AutomationElement.calls = 0
+            saved = PythonicAutomationElement(root)
+            saved.UpdateElementsAndCombinations()
+            self.assertEqual(
+                saved.ElementNamesCombinations,
+                element.ElementNamesCombinations)
+            self.assertEqual(
+                [el.AutomationId for el in saved.ElementsExtended],
+                automation_ids)
+            self.assertEqual(saved.inner_labelEdit.AutomationId, 'inner_edit')
+            self.assertEqual(AutomationElement.calls, 0)
+
+    def testProperties(self):
+        "Make sure all the properties and the hierarchy are saved"
+        dialog = fake_automation.make_dialog(rows = 2)
+        root = self.load(dialog)
+
+        saved = [root] + root.FindAll(
+            fake_automation.TreeScope.Descendants,
+            fake_automation.Condition.TrueCondition)
+        live = [dialog] + dialog.children
+        self.assertEqual(len(saved), len(live))
+        for saved_element, live_element in zip(saved, live):
+            for prop, value in live_element.properties.items():
+                saved_value = saved_element.GetCurrentPropertyValue(prop)
+                if isinstance(value, fake_automation.Rect):
+                    self.assertEqual(
+                        (saved_value.Left, saved_value.Top,
+                            saved_value.Width, saved_value.Height),
+                        (value.Left, value.Top, value.Width, value.Height))
+                elif isinstance(value, fake_automation.ControlTypeValue):
+                    self.assertEqual(
+                        saved_value.ProgrammaticName, value.ProgrammaticName)
+                else:
+                    self.assertEqual(saved_value, value)
+
+        self.assertEqual(root.children[1].parent, root)
+        self.assertEqual(
+            PythonicAutomationElement(root).GetImportantProperties(),
+            PythonicAutomationElement(dialog).GetImportantProperties())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+"""Tests of the filters of findwindows.find_windows
+
+The windows are simulated (see fake_windows) and the real find_windows
+runs on them (the other test modules use the fake one), so the properties that it fetches can be counted. The
+tests are skipped on Python 2 (fake_windows needs Python 3).
+
+Run from the root of the repository::
+
+    python benchmarks/test_findwindows.py
+"""
+from __future__ import print_function
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+if sys.version_info[0] >= 3:
+    import fake_windows
+    desktop = fake_windows.install()
+
+    from pywinauto import findwindows, findbestmatch, handleprops
+
+
+@unittest.skipIf(sys.version_info[0] < 3, "fake_windows needs Python 3")
+class FindWindowsTestCase(unittest.TestCase):
+    "Unit tests for the planned filters of find_windows"
+
+    def setUp(self):
+        fake_windows.use_fake_find_windows(False)
+        desktop.reset()
+        desktop.add('', 'IME', 1).visible = False
+        self.dialog = desktop.add('Dialog', process = 1)
+        self.other = desktop.add('Dialog', process = 2)
+        self.ok = desktop.add('OK', 'Button', 1, self.dialog, control_id = 1)
+        self.edit = desktop.add('', 'Edit', 1, self.dialog, control_id = 2)
+        self.cancel = desktop.add(
+            'Cancel', 'Button', 1, self.dialog, control_id = 3)
+        desktop.fetches = {}
+
+    def tearDown(self):
+        fake_windows.use_fake_find_windows()
+
+    def find(self, **criteria):
+        return findwindows.find_windows(**criteria)
+
+    def testResults(self):
+        "Make sure the windows found are the same as before"
+        self.assertEqual(self.find(title = 'Dialog'),
+            [self.dialog.handle, self.other.handle])
+        self.assertEqual(self.find(title = 'Dialog', process = 2),
+            [self.other.handle])
+        self.assertEqual(self.find(visible_only = False, class_name = 'IME'),
+            [self.dialog.handle - 1])
+        self.assertEqual(
+            self.find(parent = self.dialog.handle, top_level_only = False,
+                class_name_re = 'B.*', title_re = 'C'),
+            [self.cancel.handle])
+        self.assertEqual(
+            self.find(parent = self.dialog.handle, top_level_only = False,
+                control_id = 2),
+            [self.edit.handle])
+        self.assertEqual(
+            self.find(parent = self.dialog.handle, top_level_only = False,
+                class_name = 'Edit', class_name_re = 'Button'),
+            [])
+
+    def testCheapFirst(self):
+        "Make sure the text is only fetched for windows that pass the rest"
+        self.find(title = 'Dialog', process = 2)
+        self.assertEqual(desktop.fetches['text'], 1)
+
+        desktop.fetches = {}
+        self.find(title_re = '.*')
+        # not for the hidden IME window
+        self.assertEqual(desktop.fetches['text'], 2)
+
+    def testFetchOnce(self):
+        "Make sure a property that two filters check is fetched once"
+        self.find(parent = self.dialog.handle, top_level_only = False,
+            class_name = 'Button', class_name_re = 'But')
+        self.assertEqual(desktop.fetches['classname'], 3)
+
+    def testRegexCache(self):
+        "Make sure a regular expression is compiled once"
+        self.find(title_re = 'Dia.*')
+        regex = findwindows._regex_cache['Dia.*']
+        self.find(title_re = 'Dia.*')
+        self.assertTrue(findwindows._regex_cache['Dia.*'] is regex)
+
+    def testPredicateFirst(self):
+        "Make sure the predicate is checked before the best match"
+        is_button = lambda handle: handleprops.classname(handle) == 'Button'
+        self.assertEqual(
+            self.find(parent = self.dialog.handle, top_level_only = False,
+                best_match = 'Cancel', predicate_func = is_button),
+            [self.cancel.handle])
+
+        # only the edit is named - not the OK button that matches best
+        is_edit = lambda handle: handleprops.classname(handle) == 'Edit'
+        self.assertRaises(findbestmatch.MatchError,
+            self.find, parent = self.dialog.handle, top_level_only = False,
+                best_match = 'OK', predicate_func = is_edit)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+"""Tests of the resolution memo of pywinauto (application.ResolutionMemo)
+
+The windows are simulated (see fake_windows) so that they can be closed,
+replaced by another window with the same handle, hidden and disabled
+between the uses of a memoized window specification. The tests are
+skipped on Python 2 (fake_windows needs Python 3).
+
+Run from the root of the repository::
+
+    python benchmarks/test_memo.py
+"""
+from __future__ import print_function
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+if sys.version_info[0] >= 3:
+    # the Desktop shared by the test modules (see fake_windows.install)
+    import fake_windows
+    desktop = fake_windows.install()
+
+    from pywinauto import application
+
+
+@unittest.skipIf(sys.version_info[0] < 3, "fake_windows needs Python 3")
+class ResolutionMemoTestCase(unittest.TestCase):
+    "Unit tests for using the windows that a memo remembers"
+
+    def setUp(self):
+        desktop.reset()
+        self.dialog = desktop.add('Dialog', process = 1)
+        self.ok = desktop.add('OK', 'Button', 1, self.dialog, control_id = 1)
+
+    def spec(self, **criteria):
+        criteria.setdefault('title', 'Dialog')
+        return application.WindowSpecification(criteria).memoize()
+
+    def replace(self, window, class_name = None, process = None):
+        "Put another window with the handle of window in its place"
+        window.close()
+        other = fake_windows.Window(desktop, window.handle, window.title,
+            class_name or window.class_name, process or window.process,
+            window.parent)
+        desktop.windows[other.handle] = other
+        return other
+
+    def testHit(self):
+        "Make sure a remembered window is used without finding it again"
+        dlg = self.spec()
+        self.assertEqual(dlg.WrapperObject(), self.dialog)
+        self.assertEqual(dlg.OK.WrapperObject(), self.ok)
+        calls = desktop.calls
+
+        self.assertEqual(dlg.OK.WrapperObject(), self.ok)
+        self.assertEqual(dlg.WrapperObject(), self.dialog)
+        self.assertEqual(desktop.calls, calls)
+        self.assertEqual(dlg.memo.stats(),
+            {'hits' : 2, 'misses' : 2, 'stale' : 0, 'size' : 2})
+
+        # the child specifications share the memo
+        self.assertTrue(dlg.OK.memo is dlg.memo)
+
+    def testClosed(self):
+        "Make sure a window that was closed is found again"
+        dlg = self.spec()
+        dlg.WrapperObject()
+        self.dialog.close()
+        dialog = desktop.add('Dialog', process = 1)
+
+        self.assertEqual(dlg.WrapperObject(), dialog)
+        self.assertEqual(dlg.memo.stale, 1)
+
+    def testReusedHandle(self):
+        "Make sure a handle that is now another window is not used"
+        dlg = self.spec()
+        dlg.WrapperObject()
+
+        # another class
+        other = self.replace(self.dialog, class_name = 'Notepad')
+        self.assertEqual(dlg.memo.get(dlg.criteria), None)
+        self.assertEqual(dlg.memo.stale, 1)
+
+        # another process
+        dlg.memo.set(dlg.criteria, (other, ))
+        self.replace(other, process = 2)
+        self.assertEqual(dlg.memo.get(dlg.criteria), None)
+        self.assertEqual(dlg.memo.stale, 2)
+
+        # the same class and process - it cannot be told apart
+        other = self.replace(self.dialog)
+        dlg.memo.set(dlg.criteria, (self.dialog, ))
+        self.replace(other)
+        self.assertEqual(dlg.memo.get(dlg.criteria), (self.dialog, ))
+
+    def testHidden(self):
+        "Make sure a hidden window is only used if the criteria allow it"
+        dlg = self.spec()
+        dlg.WrapperObject()
+        self.dialog.visible = False
+        self.assertEqual(dlg.memo.get(dlg.criteria), None)
+
+        dlg = self.spec(visible_only = False)
+        dlg.WrapperObject()
+        self.assertEqual(dlg.memo.get(dlg.criteria), (self.dialog, ))
+
+    def testDisabled(self):
+        "Make sure a disabled window is only used if the criteria allow it"
+        dlg = self.spec()
+        dlg.WrapperObject()
+        self.dialog.enabled = False
+        self.assertEqual(dlg.memo.get(dlg.criteria), (self.dialog, ))
+
+        self.dialog.enabled = True
+        dlg = self.spec(enabled_only = True)
+        dlg.WrapperObject()
+        self.dialog.enabled = False
+        self.assertEqual(dlg.memo.get(dlg.criteria), None)
+        self.assertEqual(dlg.memo.stale, 1)
+
+    def testClear(self):
+        "Make sure the windows are found again after clear()"
+        dlg = self.spec()
+        dlg.WrapperObject()
+        dlg.memo.clear()
+        calls = desktop.calls
+        dlg.WrapperObject()
+        self.assertEqual(desktop.calls, calls + 1)
+        self.assertEqual(dlg.memo.misses, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+"""Tests of resolving many controls at once (WindowSpecification.resolve_many)
+
+The windows are simulated (see fake_windows) and the real find_windows
+runs on them so that the controls are named by findbestmatch like they
+are for the attributes of a window specification. The tests are skipped
+on Python 2 (fake_windows needs Python 3).
+
+Run from the root of the repository::
+
+    python benchmarks/test_resolve_many.py
+"""
+from __future__ import print_function
+
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+if sys.version_info[0] >= 3:
+    import fake_windows
+    desktop = fake_windows.install()
+
+    from pywinauto import application, findbestmatch, findwindows
+    from pywinauto.timings import Timings
+
+
+@unittest.skipIf(sys.version_info[0] < 3, "fake_windows needs Python 3")
+class ResolveManyTestCase(unittest.TestCase):
+    "Unit tests for finding the controls of many names at once"
+
+    def setUp(self):
+        fake_windows.use_fake_find_windows(False)
+        desktop.reset()
+
+        self.find_timeout = Timings.window_find_timeout
+        Timings.window_find_timeout = .5
+
+        self.dialog = desktop.add('Dialog', rect = (0, 0, 400, 300))
+        self.name = desktop.add('Name:', 'Static', parent = self.dialog,
+            control_id = 1, rect = (10, 10, 60, 30))
+        self.edit = desktop.add('', 'Edit', parent = self.dialog,
+            control_id = 2, rect = (70, 10, 200, 30))
+        self.ok = desktop.add('OK', 'Button', parent = self.dialog,
+            control_id = 3, rect = (10, 250, 90, 270))
+        self.cancel = desktop.add('Cancel', 'Button', parent = self.dialog,
+            control_id = 4, rect = (100, 250, 180, 270))
+
+    def tearDown(self):
+        Timings.window_find_timeout = self.find_timeout
+        fake_windows.use_fake_find_windows()
+
+    def spec(self):
+        return application.WindowSpecification({'title' : 'Dialog'})
+
+    def one_by_one(self, names):
+        "Resolve each of names as an attribute of the window specification"
+        return dict((name, self.spec()[name].WrapperObject())
+            for name in names)
+
+    def testControls(self):
+        "Make sure each name gets the control that best matches it"
+        ctrls = self.spec().resolve_many(
+            ['OK', 'Cancel', 'NameEdit', 'Name:Static', 'Canc'])
+        self.assertEqual(ctrls, {
+            'OK' : self.ok,
+            'Cancel' : self.cancel,
+            'NameEdit' : self.edit,
+            'Name:Static' : self.name,
+            'Canc' : self.cancel})
+
+        self.assertEqual(self.spec().resolve_many([]), {})
+
+    def testSameAsOneByOne(self):
+        "Make sure the controls are the ones each name resolves to alone"
+        names = ['OK', 'Cancel', 'Edit', 'NameEdit', 'Static', 'Button',
+            'Button2', 'Name', 'Ok button', 'cancl']
+        ctrls = self.spec().resolve_many(names)
+        self.assertEqual(ctrls, self.one_by_one(names))
+
+        # the dialog is found and its controls are named once
+        desktop.fetches = {}
+        self.spec().resolve_many(names)
+        fetches = desktop.fetches
+        desktop.fetches = {}
+        self.one_by_one(names)
+        self.assertTrue(desktop.fetches['text'] > fetches['text'])
+
+    def testAmbiguous(self):
+        "Make sure a name that matches two controls as well fails"
+        desktop.add('Save', 'Button', parent = self.dialog, control_id = 5)
+        desktop.add('Have', 'Button', parent = self.dialog, control_id = 6)
+
+        self.assertRaises(findwindows.WindowAmbiguousError,
+            self.spec().resolve_many, ['OK', 'ave'], .2, .05)
+
+        # find_window() would find both of them too
+        self.assertEqual(
+            findbestmatch.find_best_control_matches(
+                'ave', self.dialog.Children()),
+            self.dialog.Children()[-2:])
+
+    def testMissing(self):
+        "Make sure names that do not match are retried until the timeout"
+        start = time.time()
+        self.assertRaises(findbestmatch.MatchError,
+            self.spec().resolve_many, ['OK', 'Apply'], .3, .05)
+        self.assertTrue(time.time() - start >= .3)
+
+        # the dialog is not there
+        self.dialog.close()
+        self.assertRaises(findwindows.WindowNotFoundError,
+            self.spec().resolve_many, ['OK'], .1, .05)
+
+    def testRetry(self):
+        "Make sure a control that appears while waiting is found"
+        def add_apply():
+            desktop.add('Apply', 'Button', parent = self.dialog,
+                control_id = 5, rect = (190, 250, 270, 270))
+
+        timer = threading.Timer(.2, add_apply)
+        timer.start()
+        try:
+            ctrls = self.spec().resolve_many(['OK', 'Apply'], 2, .05)
+        finally:
+            timer.join()
+
+        self.assertEqual(ctrls['OK'], self.ok)
+        self.assertEqual(ctrls['Apply'].WindowText(), 'Apply')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,207 @@
+"""Tests of the wait scheduling of pywinauto.timings
+
+The clock and sleep of the waits are replaced by a fake clock that only
+moves when it is slept on, so the timing is checked without waiting (and
+without Windows - timings does not need the rest of pywinauto).
+
+Run from the root of the repository::
+
+    python benchmarks/test_timings.py
+"""
+from __future__ import print_function
+
+import os
+import sys
+import random
+import operator
+import unittest
+
+sys.path.insert(0, os.path.join(
+    os.path.dirname(__file__), os.pardir, 'pywinauto_source', 'pywinauto'))
+
+import timings
+from timings import Backoff, WaitScheduler, WaitUntil, WaitUntilPasses, \
+    WaitUntilStable
+
+
+class FakeClock(object):
+    "A clock that only moves forward when it is slept on"
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def clock(self):
+        # whole microseconds so that the sums of the sleeps are exact
+        return round(self.now, 6)
+
+    def sleep(self, seconds):
+        self.sleeps.append(round(seconds, 6))
+        self.now += seconds
+
+
+class BackoffTestCase(unittest.TestCase):
+    "Unit tests for the retry intervals of Backoff"
+
+    def intervals(self, backoff, count):
+        intervals = backoff.intervals()
+        return [round(next(intervals), 6) for i in range(count)]
+
+    def testFastProbes(self):
+        "Make sure the first retries are quick and then back off"
+        self.assertEqual(
+            self.intervals(Backoff(.01, .1, jitter = 0), 8),
+            [.01, .01, .02, .04, .08, .1, .1, .1])
+        self.assertEqual(
+            self.intervals(Backoff(.01, .1, jitter = 0, fast_probes = 0), 3),
+            [.02, .04, .08])
+
+    def testJitter(self):
+        "Make sure the jitter stays within the fraction and the limits"
+        backoff = Backoff(.01, 1, jitter = .25, rand = random.Random(0))
+        intervals = self.intervals(backoff, 20)
+
+        self.assertEqual(intervals[:2], [.01, .01])
+        expected = .01
+        for interval in intervals[2:]:
+            expected = min(expected * 2, 1)
+            self.assertTrue(expected * .75 <= interval <= min(expected * 1.25, 1))
+        self.assertTrue(len(set(intervals[-5:])) > 1)
+
+    def testSameSeed(self):
+        "Make sure the same random numbers give the same intervals"
+        self.assertEqual(
+            self.intervals(Backoff(.01, 1, rand = random.Random(7)), 10),
+            self.intervals(Backoff(.01, 1, rand = random.Random(7)), 10))
+
+
+class WaitSchedulerTestCase(unittest.TestCase):
+    "Unit tests for waiting with a fake clock"
+
+    def setUp(self):
+        self.fake = FakeClock()
+        self.clock, self.sleep = timings.default_clock, timings.default_sleep
+        timings.default_clock = self.fake.clock
+        timings.default_sleep = self.fake.sleep
+
+    def tearDown(self):
+        timings.default_clock, timings.default_sleep = self.clock, self.sleep
+
+    def testFixedInterval(self):
+        "Make sure a number is slept every retry, up to the timeout"
+        scheduler = WaitScheduler(1, .3)
+        while scheduler.wait():
+            pass
+        self.assertEqual(self.fake.sleeps, [.3, .3, .3, .1])
+
+    def testInjected(self):
+        "Make sure the clock and sleep passed in are used"
+        fake = FakeClock()
+        scheduler = WaitScheduler(.05, .02, fake.clock, fake.sleep)
+        while scheduler.wait():
+            pass
+        self.assertEqual(fake.sleeps, [.02, .02, .01])
+        self.assertEqual(self.fake.sleeps, [])
+
+    def testWaitsInjected(self):
+        "Make sure the waits use the clock and sleep passed to them"
+        fake = FakeClock()
+        values = iter([1, 2, 3])
+        self.assertEqual(
+            WaitUntil(1, .1, lambda: next(values), 3,
+                clock = fake.clock, sleep = fake.sleep),
+            3)
+        self.assertEqual(fake.sleeps, [.1, .1])
+
+        def FindIt():
+            if fake.now < .3:
+                raise LookupError("not yet")
+            return 'found'
+        self.assertEqual(
+            WaitUntilPasses(1, .2, FindIt, LookupError,
+                clock = fake.clock, sleep = fake.sleep),
+            'found')
+        self.assertEqual(fake.sleeps, [.1, .1, .2])
+
+        fake.now = 0.0
+        self.assertEqual(
+            WaitUntilStable(1, .1, lambda: 'main', .2,
+                clock = fake.clock, sleep = fake.sleep),
+            'main')
+        self.assertEqual(fake.clock(), .2)
+
+        self.assertEqual(self.fake.sleeps, [])
+        self.assertRaises(TypeError,
+            WaitUntil, 1, .1, lambda: True, True, operator.eq, timer = None)
+
+    def testWaitUntil(self):
+        "Make sure WaitUntil backs off and returns the value"
+        values = iter([1, 2, 3, 4, 5, 6])
+        self.assertEqual(
+            WaitUntil(10, Backoff(.01, .05, jitter = 0),
+                lambda: next(values), 6),
+            6)
+        self.assertEqual(self.fake.sleeps, [.01, .01, .02, .04, .05])
+
+    def testWaitUntilTimeout(self):
+        "Make sure WaitUntil times out with the last value of the function"
+        try:
+            WaitUntil(1, Backoff(.1, .4, jitter = 0), lambda: 'busy', 'idle')
+        except timings.TimeoutError as e:
+            self.assertEqual(e.function_value, 'busy')
+        else:
+            self.fail("WaitUntil did not time out")
+        self.assertEqual(self.fake.sleeps, [.1, .1, .2, .4, .2])
+
+    def testWaitUntilPasses(self):
+        "Make sure WaitUntilPasses retries until there is no exception"
+        calls = []
+        def FindIt():
+            calls.append(self.fake.now)
+            if len(calls) < 4:
+                raise LookupError("not yet")
+            return 'found'
+
+        self.assertEqual(
+            WaitUntilPasses(5, Backoff(.5, 2, jitter = 0), FindIt, LookupError),
+            'found')
+        self.assertEqual(self.fake.sleeps, [.5, .5, 1])
+
+    def testWaitUntilPassesTimeout(self):
+        "Make sure the original exception is kept when it times out"
+        def FindIt():
+            raise LookupError("never")
+
+        try:
+            WaitUntilPasses(.5, .2, FindIt, LookupError)
+        except timings.TimeoutError as e:
+            self.assertTrue(isinstance(e.original_exception, LookupError))
+        else:
+            self.fail("WaitUntilPasses did not time out")
+        self.assertEqual(self.fake.sleeps, [.2, .2, .1])
+
+    def testWaitUntilStable(self):
+        "Make sure a value is only returned once it has not changed"
+        # a splash screen (1) for .3 of a second and then the main window (2)
+        windows = lambda: self.fake.clock() < .3 and 1 or 2
+
+        self.assertEqual(WaitUntilStable(5, .1, windows), 1)
+        self.assertEqual(self.fake.sleeps, [])
+
+        self.fake.now = 0.0
+        self.assertEqual(WaitUntilStable(5, .1, windows, .5), 2)
+        self.assertEqual(self.fake.clock(), .8)
+
+    def testWaitUntilStableTimeout(self):
+        "Make sure the last value is kept when it is never stable"
+        values = iter([None, None, 1, 2, 3, 4])
+        try:
+            WaitUntilStable(.5, .1, lambda: next(values), .2)
+        except timings.TimeoutError as e:
+            self.assertEqual(e.function_value, 4)
+        else:
+            self.fail("WaitUntilStable did not time out")
+
+
+if __name__ == '__main__':
+    unittest.main()
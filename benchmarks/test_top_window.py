@@ -0,0 +1,121 @@
+"""Tests of waiting for the top and the active window of an application
+(Application.top_window_ and Application.active_)
+
+The windows are simulated (see fake_windows) so that they can be added
+and closed while the application waits for them. The tests are skipped
+on Python 2 (fake_windows needs Python 3).
+
+Run from the root of the repository::
+
+    python benchmarks/test_top_window.py
+"""
+from __future__ import print_function
+
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+if sys.version_info[0] >= 3:
+    import fake_windows
+    desktop = fake_windows.install()
+
+    from pywinauto import application
+
+
+@unittest.skipIf(sys.version_info[0] < 3, "fake_windows needs Python 3")
+class TopWindowTestCase(unittest.TestCase):
+    "Unit tests for waiting for the windows of an application"
+
+    def setUp(self):
+        desktop.reset()
+        self.app = application.Application()
+        self.app.process = 1
+
+        # a window of another process
+        desktop.add('Other', process = 2)
+
+    def later(self, delay, func):
+        "Call func after delay seconds while the test waits"
+        timer = threading.Timer(delay, func)
+        timer.start()
+        self.addCleanup(timer.join)
+
+    def handle(self, spec):
+        return spec.criteria[0]['handle']
+
+    def testImmediate(self):
+        "Make sure a window that is already there is returned at once"
+        main = desktop.add('Main', process = 1)
+        desktop.active = main
+
+        start = time.time()
+        self.assertEqual(self.handle(self.app.top_window_(2, .05)), main.handle)
+        self.assertEqual(self.handle(self.app.active_(2, .05)), main.handle)
+        self.assertTrue(time.time() - start < .5)
+        self.assertEqual(desktop.calls, 2)
+
+    def testWaits(self):
+        "Make sure a window that is opened while waiting is returned"
+        def open_main():
+            desktop.active = desktop.add('Main', process = 1)
+        self.later(.2, open_main)
+
+        start = time.time()
+        top = self.app.top_window_(2, .05)
+        self.assertEqual(desktop.wrap(self.handle(top)).title, 'Main')
+        self.assertTrue(.2 <= time.time() - start < 1)
+
+        active = self.app.active_(2, .05)
+        self.assertEqual(self.handle(active), self.handle(top))
+
+    def testTimeout(self):
+        "Make sure RuntimeError is raised if no window is found in time"
+        start = time.time()
+        self.assertRaises(RuntimeError, self.app.top_window_, .3, .05)
+        self.assertTrue(time.time() - start >= .3)
+
+        # a window that is not active
+        desktop.add('Main', process = 1)
+        self.assertRaises(RuntimeError, self.app.active_, .2, .05)
+
+        self.app.process = None
+        self.assertRaises(application.AppNotConnected, self.app.top_window_)
+        self.assertRaises(application.AppNotConnected, self.app.active_)
+
+    def testStableFor(self):
+        "Make sure the top window must stay the top window for stable_for"
+        splash = desktop.add('Splash', process = 1)
+        main = desktop.add('Main', process = 1)
+
+        # without stable_for the splash screen is returned
+        self.assertEqual(self.handle(self.app.top_window_(2, .05)),
+            splash.handle)
+
+        # it is closed partway through the wait
+        self.later(.2, splash.close)
+        start = time.time()
+        top = self.app.top_window_(2, .05, stable_for = .3)
+        self.assertEqual(self.handle(top), main.handle)
+        self.assertTrue(time.time() - start >= .5)
+
+        # the active window changes too
+        desktop.active = desktop.add('Splash', process = 1)
+        self.later(.2, lambda: setattr(desktop, 'active', main))
+        active = self.app.active_(2, .05, stable_for = .3)
+        self.assertEqual(self.handle(active), main.handle)
+
+    def testNotStable(self):
+        "Make sure the top window is returned at the timeout if it is there"
+        main = desktop.add('Main', process = 1)
+        start = time.time()
+        top = self.app.top_window_(.3, .05, stable_for = 1)
+        self.assertEqual(self.handle(top), main.handle)
+        self.assertTrue(.3 <= time.time() - start < 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,241 @@
+"""Tests of recorded UI Automation trees
+
+These use ironpywinauto without IronPython (or the fake_automation stand
+in) - only the elements of snapshots.
+
+Run from the root of the repository::
+
+    python benchmarks/test_tree_snapshot.py
+"""
+from __future__ import print_function
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from io import BytesIO
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from ironpywinauto import tree_snapshot
+from ironpywinauto.tree_snapshot import (
+    TreeScope, Condition, PropertyCondition, AndCondition, OrCondition,
+    NotCondition, SnapshotControlType, SnapshotRect)
+from ironpywinauto.automation_element import PythonicAutomationElement
+
+
+def element(control_type, name, automation_id, rect, runtime_id):
+    "Return the properties of a recorded element"
+    return {
+        'AutomationId' : automation_id,
+        'Name' : name,
+        'ClassName' : control_type,
+        'ControlType' : SnapshotControlType('ControlType.' + control_type),
+        'BoundingRectangle' : SnapshotRect(*rect),
+        'IsEnabled' : True,
+        'ProcessId' : 1234,
+        'RuntimeId' : (42, runtime_id),
+        'LabeledBy' : None,
+        }
+
+
+def dialog_elements(rows = 3):
+    "Return the elements of a dialog with rows of a label, an edit and a button"
+    elements = [(-1, element('Window', 'Dialog', 'dialog',
+        (0, 0, 400, rows * 25), 0))]
+    for row in range(rows):
+        top = row * 25
+        elements.append((0, element('Text', 'Field %d' % row,
+            'label%d' % row, (10, top, 90, 20), len(elements))))
+        elements.append((0, element('Edit', '',
+            'edit%d' % row, (110, top, 190, 20), len(elements))))
+        elements.append((0, element('Button', 'Apply %d' % row,
+            'button%d' % row, (310, top, 70, 20), len(elements))))
+    return elements
+
+
+def snapshot_data(elements):
+    "Return the snapshot of elements"
+    out = BytesIO()
+    tree_snapshot.write_snapshot(out, elements)
+    return out.getvalue()
+
+
+class SnapshotFormatTestCase(unittest.TestCase):
+    "Unit tests for writing and reading snapshots"
+
+    def testValues(self):
+        "Make sure each kind of value is read back as it was written"
+        properties = {
+            'None' : None,
+            'True' : True,
+            'False' : False,
+            'Int' : -12345678901,
+            'Float' : 1.5,
+            'Text' : 'Some text',
+            'Unicode' : u'\u0420\u0443\u0441',
+            'Empty' : '',
+            'Ints' : (42, -1, 7),
+            'Rect' : SnapshotRect(1.0, 2.0, 3.5, 4.0),
+            'ControlType' : SnapshotControlType('ControlType.Edit'),
+            'Other' : object,
+            }
+        snapshot = tree_snapshot.Snapshot(snapshot_data([(-1, properties)]))
+
+        root = snapshot.root
+        for name, value in properties.items():
+            if name == 'Other':
+                value = str(value)
+            if name == 'Unicode' and str is bytes:
+                value = value.encode('utf-8')
+            self.assertEqual(root.GetCurrentPropertyValue(name), value)
+
+        self.assertEqual(str(root.GetCurrentPropertyValue('Rect')),
+            "1.0,2.0,3.5,4.0")
+        self.assertEqual(
+            root.GetCurrentPropertyValue(tree_snapshot.SnapshotElement.NameProperty),
+            None)
+
+    def testHierarchy(self):
+        "Make sure the parents and children are read back"
+        snapshot = tree_snapshot.Snapshot(snapshot_data([
+            (-1, {'Name' : 'root'}),
+            (0, {'Name' : 'a'}),
+            (1, {'Name' : 'a1'}),
+            (1, {'Name' : 'a2'}),
+            (0, {'Name' : 'b'}),
+            ]))
+
+        names = lambda elements: [
+            element.GetCurrentPropertyValue('Name') for element in elements]
+
+        root, a, a1, a2, b = snapshot.elements
+        self.assertEqual(names(root.children), ['a', 'b'])
+        self.assertEqual(names(a.children), ['a1', 'a2'])
+        self.assertEqual(a2.parent, a)
+        self.assertEqual(root.parent, None)
+
+        all_elements = Condition.TrueCondition
+        self.assertEqual(
+            names(root.FindAll(TreeScope.Descendants, all_elements)),
+            ['a', 'a1', 'a2', 'b'])
+        self.assertEqual(
+            names(a.FindAll(TreeScope.Subtree, all_elements)),
+            ['a', 'a1', 'a2'])
+        self.assertEqual(
+            names(root.FindAll(TreeScope.Children, all_elements)),
+            ['a', 'b'])
+        self.assertEqual(
+            names(root.FindAll(TreeScope.Descendants,
+                PropertyCondition('Name', 'a2'))),
+            ['a2'])
+        self.assertEqual(
+            root.FindFirst(TreeScope.Children,
+                PropertyCondition('Name', 'nothing')),
+            None)
+
+    def testConditions(self):
+        "Make sure And, Or and Not conditions are matched"
+        snapshot = tree_snapshot.Snapshot(snapshot_data([
+            (-1, {'Name' : 'root', 'ClassName' : 'Dialog'}),
+            (0, {'Name' : 'a', 'ClassName' : 'Edit'}),
+            (0, {'Name' : 'b', 'ClassName' : 'Button'}),
+            (0, {'Name' : 'c', 'ClassName' : 'Edit'}),
+            ]))
+        root = snapshot.elements[0]
+        names = lambda condition: [
+            element.GetCurrentPropertyValue('Name') for element in
+                root.FindAll(TreeScope.Descendants, condition)]
+        edit = PropertyCondition('ClassName', 'Edit')
+
+        self.assertEqual(
+            names(AndCondition(edit, PropertyCondition('Name', 'c'))), ['c'])
+        self.assertEqual(
+            names(OrCondition(PropertyCondition('Name', 'b'),
+                PropertyCondition('Name', 'c'))),
+            ['b', 'c'])
+        self.assertEqual(names(NotCondition(edit)), ['b'])
+        self.assertEqual(
+            names(NotCondition(OrCondition(edit, Condition.FalseCondition))),
+            ['b'])
+        self.assertEqual(names(Condition.FalseCondition), [])
+
+        self.assertRaises(ValueError,
+            root.FindAll, TreeScope.Descendants, object())
+
+    def testLazy(self):
+        "Make sure properties are only decoded when they are asked for"
+        snapshot = tree_snapshot.Snapshot(snapshot_data(dialog_elements()))
+        self.assertEqual(
+            [element._properties for element in snapshot.elements],
+            [None] * len(snapshot.elements))
+
+        snapshot.elements[2].GetCurrentPropertyValue('Name')
+        self.assertEqual(
+            [element._properties is not None
+                for element in snapshot.elements],
+            [i == 2 for i in range(len(snapshot.elements))])
+
+    def testBadData(self):
+        "Make sure data that is not a snapshot raises SnapshotError"
+        data = snapshot_data(dialog_elements())
+        self.assertRaises(tree_snapshot.SnapshotError,
+            tree_snapshot.Snapshot, b'')
+        self.assertRaises(tree_snapshot.SnapshotError,
+            tree_snapshot.Snapshot, b'NOTATREE' + data[8:])
+        self.assertRaises(tree_snapshot.SnapshotError,
+            tree_snapshot.Snapshot, data[:8] + b'\x02\x00' + data[10:])
+        self.assertRaises(tree_snapshot.SnapshotError,
+            tree_snapshot.Snapshot, data + b'\x00')
+
+    def testLoadFile(self):
+        "Make sure a snapshot is loaded from a file"
+        directory = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(directory, 'dialog.snap')
+            snapshot_file = open(filename, 'wb')
+            snapshot_file.write(snapshot_data(dialog_elements()))
+            snapshot_file.close()
+
+            snapshot = tree_snapshot.load_snapshot(filename)
+            self.assertEqual(snapshot.version, tree_snapshot.FORMAT_VERSION)
+            self.assertEqual(len(snapshot.elements), 10)
+            self.assertEqual(
+                snapshot.elements[4].GetCurrentPropertyValue('AutomationId'),
+                'label1')
+            snapshot.close()
+        finally:
+            shutil.rmtree(directory)
+
+
+class SnapshotElementTestCase(unittest.TestCase):
+    "Unit tests for naming the elements of snapshots"
+
+    def setUp(self):
+        snapshot = tree_snapshot.Snapshot(snapshot_data(dialog_elements()))
+        self.dialog = PythonicAutomationElement(snapshot.root)
+
+    def testAttributes(self):
+        "Make sure the controls are found by their names"
+        self.assertEqual(self.dialog.label1.AutomationId, 'label1')
+        self.assertEqual(self.dialog.Apply2.AutomationId, 'button2')
+        self.assertEqual(self.dialog.Field1Edit.AutomationId, 'edit1')
+        self.assertEqual(self.dialog.label0Edit.AutomationId, 'edit0')
+        self.assertEqual(self.dialog.ControlType, 'Window')
+        self.assertEqual(self.dialog.ProcessId, 1234)
+        self.assertEqual(self.dialog.GetRuntimeId(), (42, 0))
+
+    def testQueries(self):
+        "Make sure the control identifiers can be written"
+        ctrls = list(self.dialog.IterControlIdentifiers())
+        self.assertEqual(
+            [ctrl['automation_id'] for ctrl in ctrls],
+            ['label0', 'edit0', 'button0', 'label1', 'edit1', 'button1',
+                'label2', 'edit2', 'button2'])
+        self.assertEqual(ctrls[0]['rectangle'], '10.0,0.0,90.0,20.0')
+        self.assertTrue('Field_1Edit' in ctrls[4]['queries'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,46 +1,309 @@
 
 import inspect
 
-import clr
+import json
 import re
-clr.AddReference('UIAutomationClient')
-clr.AddReference('UIAutomationTypes')
-clr.AddReference('System.Windows.Forms')
-from System.Windows.Automation import AutomationElement, PropertyCondition, TreeScope, Condition, Automation, InvokePattern, TextPattern, TreeWalker
-
-'''
-from System.Windows.Automation import AutomationPattern, BasePattern, DockPattern, ExpandCollapsePattern, GridItemPattern, GridPattern
-from System.Windows.Automation import ItemContainerPattern, MultipleViewPattern, RangeValuePattern, ScrollItemPattern, ScrollPattern
-from System.Windows.Automation import SelectionItemPattern, SelectionPattern, SynchronizedInputPattern, TableItemPattern, TablePattern
-from System.Windows.Automation import TextPattern, TogglePattern, TransformPattern, ValuePattern, VirtualizedItemPattern, WindowPattern
-'''
-from System.Windows.Forms import SendKeys
-
-import findbestmatch
+import sys
+import threading
+import time
+try:
+    import Queue as queue
+except ImportError:
+    # Python 3
+    import queue
+
+try:
+    import findbestmatch
+    import tree_snapshot
+except ImportError:
+    # Python 3 has no implicit relative imports
+    from . import findbestmatch
+    from . import tree_snapshot
+
+try:
+    import clr
+except ImportError:
+    # not IronPython - only the elements of recorded trees can be used
+    clr = None
+
+if clr is not None:
+    clr.AddReference('UIAutomationClient')
+    clr.AddReference('UIAutomationTypes')
+    clr.AddReference('System.Windows.Forms')
+    from System.Windows.Automation import AutomationElement, PropertyCondition, TreeScope, Condition, Automation, InvokePattern, TextPattern, TreeWalker
+    from System.Windows.Automation import CacheRequest
+
+    # so that the elements of recorded trees can be searched with them
+    tree_snapshot.constant_conditions.extend([
+        (Condition.TrueCondition, True),
+        (Condition.FalseCondition, False),
+        ])
+
+    '''
+    from System.Windows.Automation import AutomationPattern, BasePattern, DockPattern, ExpandCollapsePattern, GridItemPattern, GridPattern
+    from System.Windows.Automation import ItemContainerPattern, MultipleViewPattern, RangeValuePattern, ScrollItemPattern, ScrollPattern
+    from System.Windows.Automation import SelectionItemPattern, SelectionPattern, SynchronizedInputPattern, TableItemPattern, TablePattern
+    from System.Windows.Automation import TextPattern, TogglePattern, TransformPattern, ValuePattern, VirtualizedItemPattern, WindowPattern
+    '''
+    from System.Windows.Forms import SendKeys
+else:
+    AutomationElement = tree_snapshot.SnapshotElement
+    PropertyCondition = tree_snapshot.PropertyCondition
+    TreeScope = tree_snapshot.TreeScope
+    Condition = tree_snapshot.Condition
+    Automation = tree_snapshot.Automation
+    CacheRequest = tree_snapshot.CacheRequest
+
+# fetch the properties used for the names of all the descendants of an
+# element in one request (see _snapshot) rather than one request for each
+# property of each element
+use_snapshots = False
+
+# enumerate descendants with this many threads fetching the children of
+# the elements of each level of the tree at the same time (0 for one
+# request for all of them), down to parallel_max_depth levels and up to
+# parallel_max_elements elements (None for no limit) - see
+# _enumerate_parallel
+parallel_workers = 0
+parallel_max_depth = None
+parallel_max_elements = None
+
+# class -> names of its attributes (so that __getattribute__ does not
+# have to ask dir() for them on every call)
+_class_attributes = {}
+
+def _attribute_names(cls):
+    try:
+        return _class_attributes[cls]
+    except KeyError:
+        _class_attributes[cls] = frozenset(dir(cls))
+        return _class_attributes[cls]
+
+def _text_value(value):
+    return str(value.strip("'"))
+
+def _name_value(value):
+    name = repr(value).encode('utf-8')
+    if not isinstance(name, str):
+        # Python 3
+        name = name.decode('utf-8')
+    return name.strip("'")
+
+def _control_type_value(value):
+    return str(value.ProgrammaticName)[len('ControlType.'):].strip("'")
+
+def _runtime_id_value(value):
+    return tuple(value)
+
+# (attribute, property, function to get the attribute from the property value)
+# of the properties that are fetched for snapshots
+_snapshot_properties = (
+    ('AutomationId', AutomationElement.AutomationIdProperty, _text_value),
+    ('Name', AutomationElement.NameProperty, _name_value),
+    ('ClassName', AutomationElement.ClassNameProperty, _text_value),
+    ('ControlType', AutomationElement.ControlTypeProperty, _control_type_value),
+    ('RuntimeId', AutomationElement.RuntimeIdProperty, _runtime_id_value),
+    )
+
+# the properties that are fetched with the tree when there are no
+# snapshots (the RuntimeIds that the names are kept by)
+_tree_properties = _snapshot_properties[4:]
+
+# control types of the elements that are also named after their previous
+# sibling (usually the label in front of them)
+_relative_control_types = ["edit", "listbox", "combobox", "updown", "list"]
+
+def _snapshot(auto_elem, properties = _snapshot_properties):
+    """Return a PythonicAutomationElement for each descendant of auto_elem
+    (in the same order as FindAll) with the values of properties and its
+    previous sibling - all fetched in one request
+
+    The elements read the other properties when they are asked for
+    them."""
+    request = CacheRequest()
+    for attr, prop, get_value in properties:
+        request.Add(prop)
+    request.TreeScope = TreeScope.Subtree
+    request.TreeFilter = Condition.TrueCondition
+
+    elements = []
+    def add_children(cached_elem):
+        previous = None
+        for child in cached_elem.CachedChildren:
+            values = None
+            if properties:
+                values = {}
+                for attr, prop, get_value in properties:
+                    values[attr] = get_value(child.GetCachedPropertyValue(prop))
+
+            element = PythonicAutomationElement(child, values)
+            element.PreviousSibling = previous
+            elements.append(element)
+            previous = element
+
+            add_children(child)
+
+    add_children(auto_elem.GetUpdatedCache(request))
+    return elements
+
+class _WorkerPool(object):
+    "A fixed number of threads that call functions for items of a queue"
+
+    def __init__(self, workers):
+        self.tasks = queue.Queue()
+        self.threads = []
+        for i in range(workers):
+            thread = threading.Thread(target = self._work)
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+
+    def _work(self):
+        while True:
+            task = self.tasks.get()
+            if task is None:
+                return
+
+            func, item, results, index, done = task
+            try:
+                results[index] = (True, func(item))
+            except Exception:
+                results[index] = (False, sys.exc_info()[1])
+            done.put(index)
+
+    def map(self, func, items):
+        """Return [func(item) for item in items] with the calls made on the
+        threads (the first exception is raised again here)"""
+        results = [None] * len(items)
+        done = queue.Queue()
+        for index, item in enumerate(items):
+            self.tasks.put((func, item, results, index, done))
+        for item in items:
+            done.get()
+
+        for ok, result in results:
+            if not ok:
+                raise result
+        return [result for ok, result in results]
+
+    def close(self):
+        "Stop the threads"
+        for thread in self.threads:
+            self.tasks.put(None)
+        for thread in self.threads:
+            thread.join()
+
+def _enumerate_parallel(auto_elem, workers, max_depth = None, max_elements = None):
+    """Return a PythonicAutomationElement for each descendant of auto_elem
+    (in the same order as FindAll) with its previous sibling
+
+    The tree is fetched a level at a time: the children of all the
+    elements of a level are fetched at the same time by workers threads.
+    Only max_depth levels (None for all) and the first max_elements
+    elements of the levels (None for all) are fetched, so the elements
+    are always the same for the same tree."""
+    def find_children(element):
+        return list(element.elem.FindAll(TreeScope.Children, Condition.TrueCondition))
+
+    root = PythonicAutomationElement(auto_elem)
+    children = {}
+    count = 0
+    level = [root]
+    depth = 0
+
+    pool = _WorkerPool(workers)
+    try:
+        while level and (max_depth is None or depth < max_depth) and \
+            (max_elements is None or count < max_elements):
+
+            next_level = []
+            for element, found in zip(level, pool.map(find_children, level)):
+                if max_elements is not None:
+                    found = found[:max_elements - count]
+                count += len(found)
+
+                children[id(element)] = []
+                previous = None
+                for child in found:
+                    child = PythonicAutomationElement(child)
+                    child.PreviousSibling = previous
+                    previous = child
+                    children[id(element)].append(child)
+                next_level.extend(children[id(element)])
+
+            level = next_level
+            depth += 1
+    finally:
+        pool.close()
+
+    # put the levels together in tree order
+    elements = []
+    stack = list(reversed(children.get(id(root), [])))
+    while stack:
+        element = stack.pop()
+        elements.append(element)
+        stack.extend(reversed(children.get(id(element), [])))
+    return elements
 
 class PythonicAutomationElement(object):
     __AutomationAttribute = re.compile('[^_A-Za-z0-9]')
 
-    def __init__(self, auto_elem):
-        if not isinstance(auto_elem, AutomationElement):
+    def __init__(self, auto_elem, snapshot_values = None):
+        if not isinstance(auto_elem, (AutomationElement, tree_snapshot.SnapshotElement)):
             raise TypeError('PythonicAutomationElement can be initialized with AutomationElement instance only!')
         self.elem = auto_elem
 
+        # property name -> property of the properties the element supports
+        self.PropertyIds = None
+
+        # attribute -> value of the _snapshot_properties if the element
+        # comes from a snapshot, and the previous sibling in the snapshot
+        self.SnapshotValues = snapshot_values
+        self.PreviousSibling = None
+        self.RuntimeIdValue = None
+
+        # seconds after which UpdateElementsAndCombinations checks the
+        # descendants for changes again (None never to check them again)
+        self.MaxAge = None
+        self.UpdateTime = None
+
         self.Updated = False
         self.ElementNamesCombinations = []
         self.Elements = []
         self.ElementsExtended = []
 
-    AutomationId = property(lambda self: str(self.elem.GetCurrentPropertyValue(AutomationElement.AutomationIdProperty).strip("'")),
+        # what RefreshElementsAndCombinations needs to patch the names:
+        # runtime id -> element, runtime id -> runtime id of the element
+        # before it, runtime id -> its AutomationId, ClassName and Name
+        # names, runtime id -> its names from its previous sibling
+        self.ElementsById = {}
+        self.Predecessors = {}
+        self.UniqueNames = {}
+        self.RelativeNames = {}
+
+        # MakeUnique counters and the names in use of the AutomationId,
+        # ClassName and Name names
+        self.NameCounts = [{}, {}, {}]
+        self.NamesInUse = [set(), set(), set()]
+
+        # AutomationId -> names (see GetQueriesFor)
+        self.QueryIndex = None
+
+    def _snapshot_value(self, attr, prop, get_value):
+        if self.SnapshotValues is not None and attr in self.SnapshotValues:
+            return self.SnapshotValues[attr]
+        return get_value(self.elem.GetCurrentPropertyValue(prop))
+
+    AutomationId = property(lambda self: self._snapshot_value(*_snapshot_properties[0]),
             doc="AutomationId property")
 
-    Name = property(lambda self: repr(self.elem.GetCurrentPropertyValue(AutomationElement.NameProperty)).encode('utf-8').strip("'"),
+    Name = property(lambda self: self._snapshot_value(*_snapshot_properties[1]),
             doc="Name property")
 
-    ClassName = property(lambda self: str(self.elem.GetCurrentPropertyValue(AutomationElement.ClassNameProperty).strip("'")),
+    ClassName = property(lambda self: self._snapshot_value(*_snapshot_properties[2]),
             doc="ClassName property")
 
-    ControlType = property(lambda self: str(self.elem.GetCurrentPropertyValue(AutomationElement.ControlTypeProperty).ProgrammaticName)[len('ControlType.'):].strip("'"),
+    ControlType = property(lambda self: self._snapshot_value(*_snapshot_properties[3]),
             doc="ControlType property")
 
     BoundingRectangle = property(lambda self: self.elem.GetCurrentPropertyValue(AutomationElement.BoundingRectangleProperty),
@@ -51,36 +314,179 @@ class PythonicAutomationElement(object):
             doc="IsEnabled property")
 
     def UpdateElementsAndCombinations(self):
+        if self.Updated and self.MaxAge is not None and \
+            time.time() - self.UpdateTime >= self.MaxAge:
+            self.Updated = False
+
         if not self.Updated:
-            self.Elements = self.FindAll(TreeScope.Descendants, Condition.TrueCondition)
-            self.ElementNamesCombinations = self.MakeUnique(map(str, [el.AutomationId for el in self.Elements]))
-            self.ElementNamesCombinations.extend(self.MakeUnique(map(str, [el.ClassName for el in self.Elements])))
-            self.ElementNamesCombinations.extend(self.MakeUnique(map(str, [el.Name for el in self.Elements])))
-            self.ElementNamesCombinations.extend(["_".join([el.ClassName, el.Name]) for el in self.Elements])
-            self.ElementNamesCombinations.extend(["_".join([el.AutomationId, el.Name]) for el in self.Elements])
-            self.ElementNamesCombinations.extend(["_".join([el.ClassName, el.AutomationId]) for el in self.Elements])
-            self.ElementsExtended = self.Elements * 6
-            self.ElementNamesCombinations.extend(self.GetRelativeCombinations(self.Elements))
+            if self.UpdateTime is None:
+                self.BuildElementsAndCombinations()
+            else:
+                self.RefreshElementsAndCombinations()
+            self.UpdateTime = time.time()
             self.Updated = True
+            self.QueryIndex = None
+
+    def Invalidate(self):
+        """Make the next lookup check the descendants for changes (see
+        RefreshElementsAndCombinations)"""
+        self.Updated = False
+
+    def FindDescendants(self):
+        if use_snapshots:
+            return _snapshot(self.elem)
+        if parallel_workers:
+            return _enumerate_parallel(self.elem, parallel_workers, parallel_max_depth, parallel_max_elements)
+        # just the tree (for the previous siblings) and the RuntimeIds
+        return _snapshot(self.elem, _tree_properties)
+
+    def BuildElementsAndCombinations(self):
+        self.Elements = self.FindDescendants()
+        self.NameCounts = [{}, {}, {}]
+        unique_names = [
+            self.MakeUnique(map(str, [el.AutomationId for el in self.Elements]), self.NameCounts[0]),
+            self.MakeUnique(map(str, [el.ClassName for el in self.Elements]), self.NameCounts[1]),
+            self.MakeUnique(map(str, [el.Name for el in self.Elements]), self.NameCounts[2]),
+            ]
+        self.ElementNamesCombinations = []
+        for names in unique_names:
+            self.ElementNamesCombinations.extend(names)
+        self.ElementNamesCombinations.extend(["_".join([el.ClassName, el.Name]) for el in self.Elements])
+        self.ElementNamesCombinations.extend(["_".join([el.AutomationId, el.Name]) for el in self.Elements])
+        self.ElementNamesCombinations.extend(["_".join([el.ClassName, el.AutomationId]) for el in self.Elements])
+        self.ElementsExtended = self.Elements * 6
+        self.RelativeNames = {}
+        self.ElementNamesCombinations.extend(self.GetRelativeCombinations(self.Elements))
+
+        self.NamesInUse = [set(names) for names in unique_names]
+        self.ElementsById = {}
+        self.Predecessors = {}
+        self.UniqueNames = {}
+        previous = None
+        for el, names in zip(self.Elements, zip(*unique_names)):
+            runtime_id = el.GetRuntimeId()
+            self.ElementsById[runtime_id] = el
+            self.Predecessors[runtime_id] = previous
+            self.UniqueNames[runtime_id] = names
+            previous = runtime_id
+
+    def RefreshElementsAndCombinations(self):
+        """Patch the names for the descendants that have come or gone
+        since the names were worked out
+
+        Descendants are matched by RuntimeId. Only the names of new
+        descendants are worked out, and the names from the previous sibling
+        of the ones that have something new or gone in front of them. The
+        names of the others are left where they are."""
+        elements = []
+        added = []
+        moved = []
+        elements_by_id = {}
+        predecessors = {}
+        previous = None
+        for found in self.FindDescendants():
+            runtime_id = found.GetRuntimeId()
+            el = self.ElementsById.get(runtime_id)
+            if el is None:
+                el = found
+                added.append(el)
+            elif previous != self.Predecessors[runtime_id] and self.IsRelative(el):
+                moved.append(el)
+
+            # the previous sibling from the new tree
+            sibling = found.PreviousSibling
+            if sibling is not None:
+                sibling = elements_by_id[sibling.GetRuntimeId()]
+            el.PreviousSibling = sibling
+
+            elements.append(el)
+            elements_by_id[runtime_id] = el
+            predecessors[runtime_id] = previous
+            previous = runtime_id
+
+        gone = set(self.ElementsById) - set(elements_by_id)
+        for runtime_id in gone:
+            for in_use, name in zip(self.NamesInUse, self.UniqueNames.pop(runtime_id)):
+                in_use.discard(name)
+            self.RelativeNames.pop(runtime_id, None)
+
+        stale = {}
+        for el in moved:
+            stale[el.GetRuntimeId()] = self.RelativeNames.pop(el.GetRuntimeId(), [])
+
+        if gone or [names for names in stale.values() if names]:
+            # relative names are after the other names of an element
+            kept = []
+            for name, el in reversed(list(zip(self.ElementNamesCombinations, self.ElementsExtended))):
+                runtime_id = el.GetRuntimeId()
+                if runtime_id in gone:
+                    continue
+                if name in stale.get(runtime_id, ()):
+                    stale[runtime_id].remove(name)
+                    continue
+                kept.append((name, el))
+            kept.reverse()
+            self.ElementNamesCombinations[:] = [name for name, el in kept]
+            self.ElementsExtended[:] = [el for name, el in kept]
+
+        for el in added:
+            names = (
+                self.AddUniqueName(str(el.AutomationId), 0),
+                self.AddUniqueName(str(el.ClassName), 1),
+                self.AddUniqueName(str(el.Name), 2),
+                )
+            self.UniqueNames[el.GetRuntimeId()] = names
+            self.ElementNamesCombinations.extend(names)
+            self.ElementNamesCombinations.append("_".join([el.ClassName, el.Name]))
+            self.ElementNamesCombinations.append("_".join([el.AutomationId, el.Name]))
+            self.ElementNamesCombinations.append("_".join([el.ClassName, el.AutomationId]))
+            self.ElementsExtended.extend([el] * 6)
+
+        self.ElementNamesCombinations.extend(self.GetRelativeCombinations(
+            [el for el in added if self.IsRelative(el)] + moved))
+
+        self.Elements = elements
+        self.ElementsById = elements_by_id
+        self.Predecessors = predecessors
+
+    def AddUniqueName(self, name, kind):
+        """Return name made unique among the AutomationId (kind 0),
+        ClassName (1) or Name (2) names in use"""
+        counts = self.NameCounts[kind]
+        in_use = self.NamesInUse[kind]
+        unique_name = name
+        if name != '':
+            counts.setdefault(name, 0)
+            while unique_name in in_use:
+                counts[name] += 1
+                unique_name = name + str(counts[name])
+            in_use.add(unique_name)
+        return unique_name
+
+    def IsRelative(self, el):
+        "Return whether el is also named after its previous sibling"
+        return el.ControlType.lower() in _relative_control_types
 
     def GetRelativeCombinations(self, elements):
-        dynamic_elements = [l for l in elements if l.ControlType.lower() in ["edit", "listbox", "combobox", "updown", "list"]]
+        """Return the names of the elements after their previous sibling
+        (elements come from FindDescendants, which has the siblings)"""
+        dynamic_elements = [l for l in elements if self.IsRelative(l)]
         
         result =[]
         for el in dynamic_elements:
-            tw = TreeWalker(Condition.TrueCondition)
-            siblingElement = tw.GetPreviousSibling(el.elem)
-            currentElement = PythonicAutomationElement(el.elem)
-            if siblingElement is not None:
-                pySiblingElement = PythonicAutomationElement(siblingElement)
-                result.append(pySiblingElement.AutomationId + currentElement.ControlType)
-                result.append(pySiblingElement.Name + currentElement.ControlType)
-                self.ElementsExtended.append(currentElement)
-                self.ElementsExtended.append(currentElement)        
+            pySiblingElement = el.PreviousSibling
+            if pySiblingElement is not None:
+                names = [pySiblingElement.AutomationId + el.ControlType,
+                    pySiblingElement.Name + el.ControlType]
+                self.RelativeNames[el.GetRuntimeId()] = names
+                result.extend(names)
+                self.ElementsExtended.append(el)
+                self.ElementsExtended.append(el)
         return result
 
-    def MakeUnique(self, names):
-        uDict = {}
+    def MakeUnique(self, names, uDict = None):
+        if uDict is None:
+            uDict = {}
         result = []
 
         for  name in names:
@@ -95,16 +501,35 @@ class PythonicAutomationElement(object):
 
         return result
 
+    def GetRuntimeId(self):
+        """Return the RuntimeId of the element as a tuple (only asked for
+        the first time)"""
+        if self.RuntimeIdValue is None:
+            self.RuntimeIdValue = self._snapshot_value(*_snapshot_properties[4])
+        return self.RuntimeIdValue
+
+
+    def GetPropertyIds(self):
+        """Return a dictionary of property name -> property of the properties
+        the element supports (only asked for the first time)"""
+        if self.PropertyIds is None:
+            self.PropertyIds = {}
+            for prop in self.elem.GetSupportedProperties():
+                if isinstance(prop, tree_snapshot.SnapshotProperty):
+                    self.PropertyIds[prop.Name] = prop
+                else:
+                    self.PropertyIds[str(Automation.PropertyName(prop))] = prop
+        return self.PropertyIds
 
     def __getattribute__(self, attr_name):
-        default_attrs = [attr for attr in dir(PythonicAutomationElement) if attr != '__getattribute__']
-        default_attrs.extend(dir(self))
-        if attr_name in default_attrs:
+        # attributes of the class and of this object are looked up as usual
+        if attr_name in _attribute_names(type(self)) or \
+            attr_name in object.__getattribute__(self, '__dict__'):
             return object.__getattribute__(self, attr_name)
-        for prop in self.elem.GetSupportedProperties():
-            prop_name = str(Automation.PropertyName(prop))
-            if prop_name == attr_name:
-                return self.elem.GetCurrentPropertyValue(prop)
+
+        prop = self.GetPropertyIds().get(attr_name)
+        if prop is not None:
+            return self.elem.GetCurrentPropertyValue(prop)
 
         self.UpdateElementsAndCombinations()
 
@@ -117,6 +542,8 @@ class PythonicAutomationElement(object):
         raise AttributeError()
 
     def FindAll(self, scope, condition):
+        if parallel_workers and scope == TreeScope.Descendants and condition == Condition.TrueCondition:
+            return _enumerate_parallel(self.elem, parallel_workers, parallel_max_depth, parallel_max_elements)
         return [PythonicAutomationElement(elem) for elem in self.elem.FindAll(scope, condition)]
 
     def FindFirst(self, scope, condition):
@@ -124,60 +551,127 @@ class PythonicAutomationElement(object):
    
     def GetSupportedProperties(self):
         properties = {}
-        for prop in self.elem.GetSupportedProperties():
-            name = str(Automation.PropertyName(prop))
-            if not (name in dir(PythonicAutomationElement)):
+        for name, prop in self.GetPropertyIds().items():
+            if not (name in _attribute_names(PythonicAutomationElement)):
                 properties[name] = self.elem.GetCurrentPropertyValue(prop)
         return properties
 
     def GetImportantProperties(self):
         properties = self.GetSupportedProperties()
-        del properties['HelpText']
-        del properties['IsKeyboardFocusable']
-        del properties['IsPassword']
-        del properties['Orientation']
-        del properties['IsRequiredForForm']
-        del properties['IsOffscreen']
-        del properties['RuntimeId']
-        del properties['LabeledBy']
-        del properties['IsContentElement']
-        del properties['LocalizedControlType']
-        del properties['ItemStatus']
-        del properties['ProcessId']
-        del properties['HasKeyboardFocus']
-        del properties['FrameworkId']
-        del properties['IsControlElement']
-        del properties['ItemType']
-        del properties['AcceleratorKey']
-        del properties['AccessKey']
+        properties.pop('HelpText', None)
+        properties.pop('IsKeyboardFocusable', None)
+        properties.pop('IsPassword', None)
+        properties.pop('Orientation', None)
+        properties.pop('IsRequiredForForm', None)
+        properties.pop('IsOffscreen', None)
+        properties.pop('RuntimeId', None)
+        properties.pop('LabeledBy', None)
+        properties.pop('IsContentElement', None)
+        properties.pop('LocalizedControlType', None)
+        properties.pop('ItemStatus', None)
+        properties.pop('ProcessId', None)
+        properties.pop('HasKeyboardFocus', None)
+        properties.pop('FrameworkId', None)
+        properties.pop('IsControlElement', None)
+        properties.pop('ItemType', None)
+        properties.pop('AcceleratorKey', None)
+        properties.pop('AccessKey', None)
         return properties
 
-    def __print_immediate_controls(self, indent=0):
-        children = self.FindAll(TreeScope.Children, Condition.TrueCondition)
+    def IterControlIdentifiers(self):
+        """Yield a dictionary of the identifiers of each descendant as it is
+        found (a control before its children)
 
-        indent_str = ""
-        for i in xrange(indent):
-            indent_str += "        "
+        The keys are depth, control_type, name, rectangle, properties,
+        automation_id and queries (the names the parent knows it by)."""
+        self.UpdateElementsAndCombinations()
+        stack = [(self, iter(self.FindAll(TreeScope.Children, Condition.TrueCondition)))]
+        while stack:
+            parent, children = stack[-1]
+            ctrl = next(children, None)
+            if ctrl is None:
+                stack.pop()
+                continue
+
+            yield {
+                'depth' : len(stack) - 1,
+                'control_type' : ctrl.ControlType,
+                'name' : ctrl.Name,
+                'rectangle' : str(ctrl.Rectangle),
+                'properties' : ctrl.GetImportantProperties(),
+                'automation_id' : str(ctrl.AutomationId),
+                'queries' : parent.GetQueriesFor(ctrl),
+                }
 
-        for ctrl in children:
-            print("%s%s - '%s'   %s"% (indent_str, ctrl.ControlType, ctrl.Name, str(ctrl.Rectangle))) # ctrl.WindowText()
-            print(indent_str + "\tProperties: " + str(ctrl.GetImportantProperties())) #.keys()
-            print(indent_str + "\tAutomationId: '" + str(ctrl.AutomationId) + "'")
-            children_queries = self.GetQueriesFor(ctrl)
-            print(indent_str + "\tQueries:" + str(children_queries) + '\n')
             ctrl.UpdateElementsAndCombinations()
-            ctrl.__print_immediate_controls(indent + 1)
+            stack.append((ctrl, iter(ctrl.FindAll(TreeScope.Children, Condition.TrueCondition))))
+
+    def WriteControlIdentifiers(self, out = None, format = 'text'):
+        """Write the identifiers of the descendants to out (sys.stdout by
+        default) as they are found
+
+        format is 'text' or 'json' (a JSON object on each line)."""
+        if out is None:
+            out = sys.stdout
+        if format not in ('text', 'json'):
+            raise ValueError("format should be 'text' or 'json' not %r" % (format, ))
+
+        for ctrl in self.IterControlIdentifiers():
+            if format == 'json':
+                out.write(json.dumps(ctrl, default = str) + '\n')
+                continue
+
+            indent_str = "        " * ctrl['depth']
+            out.write("%s%s - '%s'   %s\n" % (indent_str, ctrl['control_type'], ctrl['name'], ctrl['rectangle']))
+            out.write(indent_str + "\tProperties: " + str(ctrl['properties']) + '\n')
+            out.write(indent_str + "\tAutomationId: '" + ctrl['automation_id'] + "'\n")
+            out.write(indent_str + "\tQueries:" + str(ctrl['queries']) + '\n\n')
 
     def FilterQueries(self, queries):
         return list(set(map(lambda x: x.lstrip("_").rstrip("_"), map(lambda x: re.sub(self.__AutomationAttribute, "_", x), queries))))
 
     def GetQueriesFor(self, ctrl):
-        queries = [x for x, y in zip(self.ElementNamesCombinations, self.ElementsExtended)
-                     if (y.AutomationId == ctrl.AutomationId and x != "" and ctrl.AutomationId != "")]
-        return self.FilterQueries(queries)
-
-    def PrintControlIdentifiers(self):
-        self.__print_immediate_controls(0)
+        automation_id = ctrl.AutomationId
+        if automation_id == "":
+            return self.FilterQueries([])
+
+        if self.QueryIndex is None:
+            # each element is in ElementsExtended many times, only ask
+            # for its AutomationId once
+            automation_ids = {}
+            self.QueryIndex = {}
+            for x, y in zip(self.ElementNamesCombinations, self.ElementsExtended):
+                if id(y) not in automation_ids:
+                    automation_ids[id(y)] = y.AutomationId
+                if x != "":
+                    self.QueryIndex.setdefault(automation_ids[id(y)], []).append(x)
+
+        return self.FilterQueries(self.QueryIndex.get(automation_id, []))
+
+    def PrintControlIdentifiers(self, format = 'text'):
+        self.WriteControlIdentifiers(sys.stdout, format)
+
+    def SaveSnapshot(self, filename):
+        """Save the properties and the hierarchy of the element and all its
+        descendants to filename (see tree_snapshot.load_snapshot)"""
+        elements = []
+        stack = [(self.elem, -1)]
+        while stack:
+            elem, parent = stack.pop()
+            properties = {}
+            for name, prop in PythonicAutomationElement(elem).GetPropertyIds().items():
+                properties[name] = elem.GetCurrentPropertyValue(prop)
+
+            index = len(elements)
+            elements.append((parent, properties))
+            children = list(elem.FindAll(TreeScope.Children, Condition.TrueCondition))
+            stack.extend([(child, index) for child in reversed(children)])
+
+        snapshot_file = open(filename, 'wb')
+        try:
+            tree_snapshot.write_snapshot(snapshot_file, elements)
+        finally:
+            snapshot_file.close()
         '''
         allSubElements = self.FindAll(TreeScope.Descendants, Condition.TrueCondition)
 
@@ -186,4 +680,4 @@ class PythonicAutomationElement(object):
 
             print("\tProperties: " + str(ctrl.GetImportantProperties())) #.keys()
             print("\tAutomationId: " + str(ctrl.tAutomationId) + "\n")
-        '''
\ No newline at end of file
+        '''
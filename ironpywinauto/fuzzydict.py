@@ -3,9 +3,11 @@
 Implemented for pywinauto.
 
 This class uses difflib to match strings.
-This class uses a linear search to find the items as it HAS to iterate over
-every item in the dictionary (otherwise it would not be possible to know which
-is the 'best' match).
+The ratio of difflib can never be more than 2 * (characters in common) /
+(total length of both strings) - so the dictionary keeps an index of the
+characters of its string keys (grouped by key length) and only compares
+the keys that could reach the cutoff. The 'best' match is the same as
+comparing every key.
 
 If the exact item is in the dictionary (no fuzzy matching needed - then it
 doesn't do the linear search and speed should be similar to standard Python
@@ -38,22 +40,39 @@ from __future__ import unicode_literals
 __revision__ = "$Rev$"
 
 import difflib
+import collections
+
+try:
+    _string_types = basestring
+except NameError:
+    _string_types = str
+
+def _char_counts(text):
+    "Return a dictionary of how many times each character is in text"
+    counts = {}
+    for char in text:
+        counts[char] = counts.get(char, 0) + 1
+    return counts
+
 
 class FuzzyDict(dict):
     "Provides a dictionary that performs fuzzy lookup"
-    def __init__(self, items = None, cutoff = .6):
+    def __init__(
+        self, items = None, cutoff = .6, scorer = None, cache_size = None):
         """Construct a new FuzzyDict instance
 
         items is an dictionary to copy items from (optional)
         cutoff is the match ratio below which mathes should not be considered
         cutoff needs to be a float between 0 and 1 (where zero is no match
-        and 1 is a perfect match)"""
+        and 1 is a perfect match)
+        scorer is an object with a ratios(lookfor, keys) method (like the
+        scorers in the similarity module) to use instead of difflib
+        (optional)
+        cache_size is how many fuzzy lookups (that found a match or not)
+        to remember until the dictionary is changed - the default of None
+        does not remember any (optional)"""
         super(FuzzyDict, self).__init__()
 
-        if items:
-            self.update(items)
-        self.cutoff =  cutoff
-
         # short wrapper around some super (dict) methods
         self._dict_contains = lambda key: \
             super(FuzzyDict,self).__contains__(key)
@@ -61,27 +80,210 @@ class FuzzyDict(dict):
         self._dict_getitem = lambda key: \
             super(FuzzyDict,self).__getitem__(key)
 
-    def _search(self, lookfor, stop_on_first = False):
+        # key length -> character -> {key : times the character is in key}
+        # for all the string keys
+        self._index = {}
+
+        # keys that are not strings (they are always compared)
+        self._other_keys = set()
+
+        # the number of changes made to the dictionary
+        self.version = 0
+
+        # (lookfor, stop_on_first, use_index, cutoff, scorer) -> result
+        # of _search() for the version the results were found at
+        self.cache_size = cache_size
+        self._results = collections.OrderedDict()
+        self._results_version = 0
+        self._cache_counts = {
+            'hits' : 0, 'misses' : 0, 'evictions' : 0, 'invalidations' : 0}
+
+        if items:
+            self.update(items)
+        self.cutoff =  cutoff
+        self.scorer = scorer
+
+    def __setitem__(self, key, value):
+        "Set the item and add its key to the index"
+        if not self._dict_contains(key):
+            self._index_key(key)
+        super(FuzzyDict, self).__setitem__(key, value)
+        self.version += 1
+
+    def __delitem__(self, key):
+        "Delete the item and remove its key from the index"
+        super(FuzzyDict, self).__delitem__(key)
+        self._unindex_key(key)
+        self.version += 1
+
+    def update(self, *args, **kwargs):
+        "Update the dictionary (through __setitem__ so the index is kept)"
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def setdefault(self, key, default = None):
+        "Return the item for key (exactly) - setting it to default if needed"
+        if not self._dict_contains(key):
+            self[key] = default
+        return self._dict_getitem(key)
+
+    def pop(self, key, *default):
+        "Remove the item for key (exactly) and return it"
+        had_key = self._dict_contains(key)
+        value = super(FuzzyDict, self).pop(key, *default)
+        if had_key:
+            self._unindex_key(key)
+            self.version += 1
+        return value
+
+    def popitem(self):
+        "Remove and return an item"
+        key, value = super(FuzzyDict, self).popitem()
+        self._unindex_key(key)
+        self.version += 1
+        return key, value
+
+    def clear(self):
+        "Remove all the items"
+        super(FuzzyDict, self).clear()
+        self._index = {}
+        self._other_keys = set()
+        self.version += 1
+
+    def _index_key(self, key):
+        "Add a new key to the index"
+        if not isinstance(key, _string_types):
+            self._other_keys.add(key)
+            return
+
+        chars = self._index.setdefault(len(key), {})
+        for char, count in _char_counts(key).items():
+            chars.setdefault(char, {})[key] = count
+
+    def _unindex_key(self, key):
+        "Remove a deleted key from the index"
+        if not isinstance(key, _string_types):
+            self._other_keys.discard(key)
+            return
+
+        chars = self._index[len(key)]
+        for char in _char_counts(key):
+            del chars[char][key]
+            if not chars[char]:
+                del chars[char]
+
+        if not chars:
+            del self._index[len(key)]
+
+    def _candidates(self, lookfor):
+        """Return the set of keys that could match lookfor at least as
+        well as the cutoff - or None if all the keys have to be compared"""
+        if not isinstance(lookfor, _string_types) or self.cutoff <= 0:
+            return None
+
+        candidates = set(self._other_keys)
+
+        lookfor_counts = _char_counts(lookfor)
+        for length, chars in self._index.items():
+            total_length = float(len(lookfor) + length)
+
+            # skip the lengths that are too different
+            if 2 * min(len(lookfor), length) / total_length < self.cutoff:
+                continue
+
+            # count the characters each key has in common with lookfor
+            common = {}
+            for char, lookfor_count in lookfor_counts.items():
+                for key, count in chars.get(char, {}).items():
+                    common[key] = common.get(key, 0) + min(count, lookfor_count)
+
+            for key, common_count in common.items():
+                if 2 * common_count / total_length >= self.cutoff:
+                    candidates.add(key)
+
+        return candidates
+
+    def cache_stats(self):
+        """Return a dictionary with the size of the lookup cache and how
+        many lookups were found in it (hits) or not (misses), how many
+        were dropped to keep it to cache_size (evictions) and how many
+        times it was emptied because the dictionary changed
+        (invalidations)"""
+        stats = dict(self._cache_counts)
+        stats['size'] = len(self._results)
+        stats['maxsize'] = self.cache_size
+        return stats
+
+    def _search(self, lookfor, stop_on_first = False, use_index = True):
         """Returns the value whose key best matches lookfor
 
         if stop_on_first is True then the method returns as soon
         as it finds the first item
+
+        With use_index only the keys that could reach the cutoff are
+        compared - so if nothing matches the closest key and ratio that
+        are returned may not be the closest of all the keys.
         """
 
         # if the item is in the dictionary then just return it
         if self._dict_contains(lookfor):
             return True, lookfor, self._dict_getitem(lookfor), 1
 
+        if not self.cache_size:
+            return self._fuzzy_search(lookfor, stop_on_first, use_index)
+
+        # any change to the dictionary can change any of the results
+        if self._results_version != self.version:
+            if self._results:
+                self._results.clear()
+                self._cache_counts['invalidations'] += 1
+            self._results_version = self.version
+
+        cache_key = (lookfor, stop_on_first, use_index, self.cutoff, self.scorer)
+        try:
+            result = self._results.pop(cache_key)
+        except KeyError:
+            self._cache_counts['misses'] += 1
+        except TypeError:
+            # lookfor cannot be a key of the cache
+            return self._fuzzy_search(lookfor, stop_on_first, use_index)
+        else:
+            # add it back so that it is now the most recently used
+            self._results[cache_key] = result
+            self._cache_counts['hits'] += 1
+            return result
+
+        result = self._fuzzy_search(lookfor, stop_on_first, use_index)
+
+        self._results[cache_key] = result
+        while len(self._results) > self.cache_size:
+            self._results.popitem(last = False)
+            self._cache_counts['evictions'] += 1
+
+        return result
+
+    def _fuzzy_search(self, lookfor, stop_on_first, use_index):
+        "Returns the result of _search for a lookfor that is not a key"
+        if self.scorer is not None:
+            return self._scorer_search(lookfor, stop_on_first)
+
         # set up the fuzzy matching tool
         ratio_calc = difflib.SequenceMatcher()
         ratio_calc.set_seq1(lookfor)
 
+        candidates = None
+        if use_index:
+            candidates = self._candidates(lookfor)
+
         # test each key in the dictionary
         best_ratio = 0
         best_match = None
         best_key = None
         for key in self:
 
+            if candidates is not None and key not in candidates:
+                continue
+
             # if the current key is not a string
             # then we just skip it
             try:
@@ -115,6 +317,39 @@ class FuzzyDict(dict):
             best_ratio)
 
 
+    def _scorer_search(self, lookfor, stop_on_first = False):
+        """Returns the value whose key best matches lookfor using the scorer
+
+        All the string keys are passed to the scorer at once - other
+        keys (or a lookfor that is not a string) cannot be fuzzy matched"""
+        keys = []
+        if isinstance(lookfor, _string_types):
+            keys = [key for key in self if isinstance(key, _string_types)]
+
+        ratios = []
+        if keys:
+            ratios = self.scorer.ratios(lookfor, keys)
+
+        best_ratio = 0
+        best_match = None
+        best_key = None
+        for key, ratio in zip(keys, ratios):
+
+            # if this is the best ratio so far - save it and the value
+            if ratio > best_ratio:
+                best_ratio = ratio
+                best_key = key
+                best_match = self._dict_getitem(key)
+
+            if stop_on_first and ratio >= self.cutoff:
+                break
+
+        return (
+            best_ratio >= self.cutoff,
+            best_key,
+            best_match,
+            best_ratio)
+
     def __contains__(self, item):
         "Overides Dictionary __contains__ to use fuzzy matching"
         if self._search(item, True)[0]:
@@ -127,6 +362,10 @@ class FuzzyDict(dict):
         matched, key, item, ratio = self._search(lookfor)
 
         if not matched:
+            # find the closest of all the keys for the message
+            matched, key, item, ratio = self._search(
+                lookfor, use_index = False)
+
             raise KeyError(
                 "'%s'. closest match: '%s' with ratio %.3f"%
                     (str(lookfor), str(key), ratio))
@@ -188,10 +427,130 @@ if __name__ == '__main__':
             self.assertEquals(self.test_dict["Hiya"], fd['hiya'])
             self.assertRaises(KeyError, fd.__getitem__, 'FuzzyWuzzy')
 
+            # the closest of all the keys is named - even if the index
+            # rules it out
+            fd3 = FuzzyDict({"hello" : "World", "Hiya" : 2, "Here you are" : 3})
+            try:
+                fd3['There']
+            except KeyError as e:
+                self.assertEquals(
+                    "'There'. closest match: 'hello' with ratio 0.400",
+                    e.args[0])
+
             fd2 = FuzzyDict(self.test_dict, cutoff = .14)
 
             self.assertEquals(1, fd2['FuzzyWuzzy'])
             self.assertEquals(324, fd2[1])
             self.assertRaises(KeyError, fd2.__getitem__, 23)
 
-    unittest.main()
\ No newline at end of file
+        def testIndexedSearch(self):
+            "Test that the index gives the same matches as comparing every key"
+            import random
+            rand = random.Random(0)
+            words = ['Hiya', 'hello', 'Save', 'Cancel', 'OK', 'x', '']
+
+            fd = FuzzyDict(self.test_dict)
+            for change in range(300):
+                key = ''.join(rand.sample(words, rand.randint(1, 3)))
+                action = rand.random()
+                if action < .5:
+                    fd[key] = change
+                elif action < .6:
+                    fd.update({key : change, (key, ) : change})
+                elif action < .7:
+                    fd.setdefault(key, change)
+                elif action < .8:
+                    fd.pop(key, None)
+                elif action < .9 and fd:
+                    fd.popitem()
+                elif key in dict(fd):
+                    del fd[key]
+
+                fd.cutoff = rand.choice([0, .4, .6, .8])
+                lookfor = ''.join(rand.sample(words, rand.randint(1, 2)))
+                for stop_on_first in (False, True):
+                    matched = fd._search(lookfor, stop_on_first)
+                    expected = fd._search(lookfor, stop_on_first, False)
+                    self.assertEquals(matched[0], expected[0])
+                    if expected[0]:
+                        self.assertEquals(matched, expected)
+
+            fd.clear()
+            fd.cutoff = .6
+            self.assertEquals(False, fd.__contains__('Hiya'))
+
+        def testScorer(self):
+            "Test looking up keys with a scorer other than difflib"
+            class PrefixScorer(object):
+                "Scores texts by how much of the start they have in common"
+                calls = []
+
+                def ratios(self, lookfor, keys):
+                    self.calls.append((lookfor, sorted(keys)))
+                    ratios = []
+                    for key in keys:
+                        prefix = 0
+                        for char, other_char in zip(lookfor, key):
+                            if char != other_char:
+                                break
+                            prefix += 1
+                        ratios.append(
+                            prefix / float(max(len(lookfor), len(key))))
+                    return ratios
+
+            scorer = PrefixScorer()
+            fd = FuzzyDict(self.test_dict, scorer = scorer)
+
+            # all the string keys are scored in one call
+            self.assertEquals(3, fd['test'])
+            self.assertEquals(
+                [('test', sorted(['Hiya', 'hiy\xe4', 'test3']))], scorer.calls)
+
+            # difflib would match 'hiya' to 'Hiya'
+            self.assertEquals(2, fd['hiya'])
+            self.assertEquals(False, fd.__contains__('Hi'))
+            self.assertEquals(324, fd[1])
+            self.assertEquals(False, fd.__contains__(23))
+
+            try:
+                fd['tex']
+            except KeyError as e:
+                self.assertEquals(
+                    "'tex'. closest match: 'test3' with ratio 0.400",
+                    e.args[0])
+            else:
+                self.fail("KeyError was not raised")
+
+            fd.cutoff = .4
+            self.assertEquals(3, fd['tex'])
+
+        def testCache(self):
+            "Test remembering the results of lookups"
+            fd = FuzzyDict(self.test_dict, cache_size = 2)
+
+            self.assertEquals(1, fd['hiya'])
+            self.assertEquals(1, fd['hiya'])
+            self.assertRaises(KeyError, fd.__getitem__, 'FuzzyWuzzy')
+            self.assertRaises(KeyError, fd.__getitem__, 'FuzzyWuzzy')
+
+            # a miss is the indexed search and the search of all the keys
+            self.assertEquals(3, fd.cache_stats()['hits'])
+
+            # a change to the dictionary empties the cache
+            fd['FuzzyWuzzy'] = 5
+            self.assertEquals(5, fd['FuzzyWuzz'])
+            self.assertEquals(1, fd.cache_stats()['invalidations'])
+
+            # so does a change of the value of a key
+            fd['FuzzyWuzzy'] = 6
+            self.assertEquals(6, fd['FuzzyWuzz'])
+
+            fd['hiy']
+            fd['tst3']
+            self.assertEquals(3, fd['tst3'])
+            stats = fd.cache_stats()
+            self.assertEquals(2, stats['size'])
+            self.assertEquals(2, stats['evictions'])
+            self.assertEquals(2, stats['invalidations'])
+
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,499 @@
+"""Recorded UI Automation trees
+
+A snapshot is a file with the properties (including the bounding
+rectangles) and the hierarchy of every element of a subtree, saved with
+PythonicAutomationElement.SaveSnapshot(). It is loaded back with
+load_snapshot()::
+
+    snapshot = tree_snapshot.load_snapshot('dialog.snap')
+    dialog = PythonicAutomationElement(snapshot.root)
+    dialog.OK
+
+The elements of a snapshot have the methods of AutomationElement that
+PythonicAutomationElement uses, so names are resolved in the same way as
+for the live elements - without the process that was recorded. Without
+IronPython automation_element takes TreeScope, Condition, ... from here so
+that recorded trees can be used with CPython on any platform.
+
+The format (all numbers little endian)::
+
+    header    'IPWATREE', version (uint16), number of elements (uint32)
+    names     number of property names (uint16), then each name as
+              length (uint16) and UTF-8 text
+    elements  in tree order (a parent before its children), each one as
+              length (uint32) and then: index of the parent (int32, -1
+              for the root) and number of properties (uint16) followed
+              by each property as name index (uint16), type (uint8) and
+              the value
+
+Each element starts with its length so the loader can find all the
+elements without decoding any properties - they are only decoded when
+they are first asked for. Files are memory mapped where mmap is
+available.
+"""
+
+import struct
+
+try:
+    import mmap
+except ImportError:
+    mmap = None
+
+MAGIC = b'IPWATREE'
+FORMAT_VERSION = 1
+
+_header = struct.Struct('<8sHI')
+_uint8 = struct.Struct('<B')
+_uint16 = struct.Struct('<H')
+_uint32 = struct.Struct('<I')
+_element_header = struct.Struct('<iH')
+_property_header = struct.Struct('<HB')
+_int64 = struct.Struct('<q')
+_double = struct.Struct('<d')
+_rect = struct.Struct('<4d')
+
+# the types of property values
+_NONE, _BOOL, _INT, _FLOAT, _TEXT, _INTS, _RECT, _CONTROL_TYPE = range(8)
+
+try:
+    _text_type = unicode
+    _integer_types = (int, long)
+except NameError:
+    # Python 3
+    _text_type = str
+    _integer_types = (int, )
+
+
+class SnapshotError(ValueError):
+    "The data is not a snapshot that can be loaded"
+
+
+def _encode(text):
+    "Return text as UTF-8"
+    if not isinstance(text, _text_type):
+        text = text.decode('utf-8')
+    return text.encode('utf-8')
+
+def _decode(data):
+    "Return UTF-8 data as a native string"
+    if str is bytes:
+        # CPython 2
+        return data
+    return data.decode('utf-8')
+
+
+def property_name(prop):
+    """Return the name of an automation property like 'Name' for
+    AutomationElement.NameProperty"""
+    if isinstance(prop, (str, _text_type)):
+        return prop
+    name = str(prop.ProgrammaticName).split('.')[-1]
+    if name.endswith('Property'):
+        name = name[:-len('Property')]
+    return name
+
+
+class SnapshotProperty(object):
+    "An automation property of the elements of snapshots"
+    def __init__(self, name):
+        self.Name = name
+        self.ProgrammaticName = 'AutomationElementIdentifiers.%sProperty' % name
+
+    def __repr__(self):
+        return self.ProgrammaticName
+
+
+class SnapshotControlType(object):
+    "The ControlType of a recorded element"
+    def __init__(self, programmatic_name):
+        self.ProgrammaticName = programmatic_name
+
+    def __eq__(self, other):
+        return self.ProgrammaticName == \
+            getattr(other, 'ProgrammaticName', None)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.ProgrammaticName)
+
+    def __str__(self):
+        return self.ProgrammaticName
+
+
+class SnapshotRect(object):
+    "The BoundingRectangle of a recorded element"
+    def __init__(self, left, top, width, height):
+        self.Left, self.Top = left, top
+        self.Width, self.Height = width, height
+
+    Right = property(lambda self: self.Left + self.Width)
+    Bottom = property(lambda self: self.Top + self.Height)
+
+    def __eq__(self, other):
+        return (self.Left, self.Top, self.Width, self.Height) == (
+            other.Left, other.Top, other.Width, other.Height)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __str__(self):
+        # like System.Windows.Rect
+        return "%s,%s,%s,%s" % (self.Left, self.Top, self.Width, self.Height)
+
+
+def _pack_value(value):
+    "Return the type and the packed bytes of a property value"
+    if value is None:
+        return _NONE, b''
+    if isinstance(value, bool):
+        return _BOOL, _uint8.pack(value)
+    if isinstance(value, _integer_types):
+        return _INT, _int64.pack(value)
+    if isinstance(value, float):
+        return _FLOAT, _double.pack(value)
+    if isinstance(value, (str, _text_type)):
+        text = _encode(value)
+        return _TEXT, _uint32.pack(len(text)) + text
+    if hasattr(value, 'ProgrammaticName'):
+        text = _encode(str(value.ProgrammaticName))
+        return _CONTROL_TYPE, _uint32.pack(len(text)) + text
+    if hasattr(value, 'Left') and hasattr(value, 'Height'):
+        return _RECT, _rect.pack(
+            value.Left, value.Top, value.Width, value.Height)
+
+    try:
+        ints = list(value)
+    except TypeError:
+        ints = None
+    if ints is not None and \
+        not [i for i in ints if not isinstance(i, _integer_types)]:
+        # like the RuntimeId
+        return _INTS, _uint16.pack(len(ints)) + \
+            struct.pack('<%di' % len(ints), *ints)
+
+    # anything else is kept as text
+    return _pack_value(str(value))
+
+
+def _unpack_value(value_type, data, offset):
+    "Return the value of value_type at offset in data and where it ends"
+    if value_type == _NONE:
+        return None, offset
+    if value_type == _BOOL:
+        return bool(_uint8.unpack_from(data, offset)[0]), offset + 1
+    if value_type == _INT:
+        return _int64.unpack_from(data, offset)[0], offset + 8
+    if value_type == _FLOAT:
+        return _double.unpack_from(data, offset)[0], offset + 8
+    if value_type in (_TEXT, _CONTROL_TYPE):
+        length = _uint32.unpack_from(data, offset)[0]
+        offset += 4
+        text = _decode(data[offset:offset + length])
+        if value_type == _CONTROL_TYPE:
+            text = SnapshotControlType(text)
+        return text, offset + length
+    if value_type == _INTS:
+        count = _uint16.unpack_from(data, offset)[0]
+        offset += 2
+        return (struct.unpack_from('<%di' % count, data, offset),
+            offset + count * 4)
+    if value_type == _RECT:
+        return (SnapshotRect(*_rect.unpack_from(data, offset)),
+            offset + _rect.size)
+    raise SnapshotError("Unknown type of property value %d" % value_type)
+
+
+def write_snapshot(out, elements):
+    """Write a snapshot of elements to the binary file out
+
+    elements is a list of (index of the parent element, dictionary of
+    property name -> value) in tree order. The index of the parent of the
+    first (root) element is -1."""
+    names = []
+    name_indexes = {}
+    records = []
+    for parent, properties in elements:
+        record = [_element_header.pack(parent, len(properties))]
+        for name in sorted(properties):
+            if name not in name_indexes:
+                name_indexes[name] = len(names)
+                names.append(name)
+            value_type, value = _pack_value(properties[name])
+            record.append(_property_header.pack(name_indexes[name], value_type))
+            record.append(value)
+        records.append(b''.join(record))
+
+    out.write(_header.pack(MAGIC, FORMAT_VERSION, len(records)))
+    out.write(_uint16.pack(len(names)))
+    for name in names:
+        name = _encode(name)
+        out.write(_uint16.pack(len(name)) + name)
+    for record in records:
+        out.write(_uint32.pack(len(record)) + record)
+
+
+class SnapshotElement(object):
+    """A recorded element with the methods of AutomationElement that
+    PythonicAutomationElement uses"""
+
+    def __init__(self, snapshot, index, offset):
+        self.snapshot = snapshot
+        self.index = index
+        self.parent = None
+        self.children = []
+
+        # where the properties start in the data of the snapshot
+        self._offset = offset
+        self._properties = None
+
+    def _get_properties(self):
+        "Return the dictionary of property name -> value (decoded once)"
+        if self._properties is None:
+            data = self.snapshot.data
+            parent, count = _element_header.unpack_from(data, self._offset)
+            offset = self._offset + _element_header.size
+
+            self._properties = {}
+            for i in range(count):
+                name, value_type = _property_header.unpack_from(data, offset)
+                value, offset = _unpack_value(
+                    value_type, data, offset + _property_header.size)
+                self._properties[self.snapshot.names[name]] = value
+        return self._properties
+
+    def GetCurrentPropertyValue(self, prop):
+        return self._get_properties().get(property_name(prop))
+
+    GetCachedPropertyValue = GetCurrentPropertyValue
+
+    def GetSupportedProperties(self):
+        return [SnapshotProperty(name) for name in self._get_properties()]
+
+    def GetUpdatedCache(self, request):
+        # all the properties and the whole tree are in memory already
+        return self
+
+    CachedChildren = property(lambda self: self.children)
+    CachedParent = property(lambda self: self.parent)
+
+    def _elements(self, scope):
+        "Return the elements in scope (in tree order)"
+        elements = []
+        if scope & TreeScope.Element:
+            elements.append(self)
+
+        if scope & TreeScope.Descendants:
+            last = self.snapshot.subtree_end(self.index)
+            elements.extend(self.snapshot.elements[self.index + 1:last])
+        elif scope & TreeScope.Children:
+            elements.extend(self.children)
+        return elements
+
+    def _matches(self, condition):
+        """Return whether the element matches a condition
+
+        Property conditions, And, Or and Not conditions of them and the
+        conditions in constant_conditions are supported (ValueError is
+        raised for others)."""
+        prop = getattr(condition, 'Property', None)
+        if prop is not None:
+            return self.GetCurrentPropertyValue(prop) == condition.Value
+
+        kind = type(condition).__name__
+        if kind == 'AndCondition':
+            for part in condition.GetConditions():
+                if not self._matches(part):
+                    return False
+            return True
+        if kind == 'OrCondition':
+            for part in condition.GetConditions():
+                if self._matches(part):
+                    return True
+            return False
+        if kind == 'NotCondition':
+            return not self._matches(condition.Condition)
+
+        for constant, matches in constant_conditions:
+            if condition is constant:
+                return matches
+
+        raise ValueError(
+            "%r is not a condition that snapshots support" % (condition, ))
+
+    def FindAll(self, scope, condition):
+        return [element for element in self._elements(scope)
+            if element._matches(condition)]
+
+    def FindFirst(self, scope, condition):
+        for element in self._elements(scope):
+            if element._matches(condition):
+                return element
+        return None
+
+    def __repr__(self):
+        return "<SnapshotElement %d %r>" % (
+            self.index, self.GetCurrentPropertyValue('Name'))
+
+
+# the automation properties as attributes of SnapshotElement like
+# AutomationElement.NameProperty
+for _name in ('AcceleratorKey', 'AccessKey', 'AutomationId',
+    'BoundingRectangle', 'ClassName', 'ClickablePoint', 'ControlType',
+    'Culture', 'FrameworkId', 'HasKeyboardFocus', 'HelpText',
+    'IsContentElement', 'IsControlElement', 'IsEnabled',
+    'IsKeyboardFocusable', 'IsOffscreen', 'IsPassword', 'IsRequiredForForm',
+    'ItemStatus', 'ItemType', 'LabeledBy', 'LocalizedControlType', 'Name',
+    'NativeWindowHandle', 'Orientation', 'ProcessId', 'RuntimeId'):
+    setattr(SnapshotElement, _name + 'Property', SnapshotProperty(_name))
+
+
+class Snapshot(object):
+    "The elements of a snapshot"
+
+    def __init__(self, data):
+        "data is the contents of a snapshot file (a string or an mmap)"
+        self.data = data
+        if len(data) < _header.size:
+            raise SnapshotError("Not a snapshot (too short)")
+
+        magic, self.version, count = _header.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise SnapshotError("Not a snapshot (%r)" % (magic, ))
+        if self.version != FORMAT_VERSION:
+            raise SnapshotError(
+                "Version %d snapshots are not supported" % self.version)
+
+        offset = _header.size
+        self.names = []
+        for i in range(_uint16.unpack_from(data, offset)[0]):
+            length = _uint16.unpack_from(data, offset + 2)[0]
+            self.names.append(_decode(data[offset + 4:offset + 4 + length]))
+            offset += 2 + length
+        offset += 2
+
+        # find the elements and their parents without decoding any
+        # properties
+        self.elements = []
+        for index in range(count):
+            length = _uint32.unpack_from(data, offset)[0]
+            element = SnapshotElement(self, index, offset + 4)
+            parent = _element_header.unpack_from(data, offset + 4)[0]
+            if parent >= 0:
+                element.parent = self.elements[parent]
+                element.parent.children.append(element)
+            self.elements.append(element)
+            offset += 4 + length
+
+        if offset != len(data):
+            raise SnapshotError("Snapshot has %d bytes after the elements" % (
+                len(data) - offset))
+
+        # index -> index after the last descendant (see subtree_end)
+        self._subtree_ends = {}
+
+    root = property(lambda self: self.elements and self.elements[0] or None)
+
+    def subtree_end(self, index):
+        "Return the index after the last descendant of element index"
+        if index not in self._subtree_ends:
+            element = self.elements[index]
+            while element.children:
+                element = element.children[-1]
+            self._subtree_ends[index] = element.index + 1
+        return self._subtree_ends[index]
+
+    def close(self):
+        "Close the memory map of the file (the elements can not be used after)"
+        if hasattr(self.data, 'close'):
+            self.data.close()
+
+
+def load_snapshot(filename):
+    "Return the Snapshot in file filename"
+    snapshot_file = open(filename, 'rb')
+    try:
+        data = None
+        if mmap is not None:
+            try:
+                data = mmap.mmap(
+                    snapshot_file.fileno(), 0, access = mmap.ACCESS_READ)
+            except (ValueError, EnvironmentError):
+                # empty files can not be mapped
+                pass
+        if data is None:
+            data = snapshot_file.read()
+    finally:
+        snapshot_file.close()
+    return Snapshot(data)
+
+
+# stand ins for the System.Windows.Automation types that are used with the
+# elements of snapshots when there is no IronPython
+
+class TreeScope(object):
+    "Which elements FindAll and FindFirst look at"
+    Element = 1
+    Children = 2
+    Descendants = 4
+    Subtree = 7
+
+
+class Condition(object):
+    "A condition that every element (or no element) matches"
+
+Condition.TrueCondition = Condition()
+Condition.FalseCondition = Condition()
+
+
+class PropertyCondition(Condition):
+    "A condition that the value of the property is value"
+    def __init__(self, prop, value):
+        self.Property = prop
+        self.Value = value
+
+
+class AndCondition(Condition):
+    "A condition that all of conditions are true"
+    def __init__(self, *conditions):
+        self._conditions = list(conditions)
+
+    def GetConditions(self):
+        return list(self._conditions)
+
+
+class OrCondition(AndCondition):
+    "A condition that any of conditions is true"
+
+
+class NotCondition(Condition):
+    "A condition that condition is not true"
+    def __init__(self, condition):
+        self.Condition = condition
+
+
+# (condition, whether every element matches it) of the conditions that
+# match every element or no element - automation_element adds the ones of
+# System.Windows.Automation
+constant_conditions = [
+    (Condition.TrueCondition, True),
+    (Condition.FalseCondition, False),
+    ]
+
+
+class CacheRequest(object):
+    "The properties and elements for GetUpdatedCache() to fetch"
+    def __init__(self):
+        self.TreeScope = TreeScope.Element
+        self.TreeFilter = Condition.TrueCondition
+
+    def Add(self, prop):
+        pass
+
+
+class Automation(object):
+    "Static helpers of UI Automation"
+    @staticmethod
+    def PropertyName(prop):
+        return property_name(prop)
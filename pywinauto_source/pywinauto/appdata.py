@@ -0,0 +1,246 @@
+# GUI Application automation and testing library
+# Copyright (C) 2006 Mark Mc Mahon
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public License
+# as published by the Free Software Foundation; either version 2.1
+# of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the
+#    Free Software Foundation, Inc.,
+#    59 Temple Place,
+#    Suite 330,
+#    Boston, MA 02111-1307 USA
+
+"""Application data - the dialogs and controls that a script found
+
+An Application that is given a data file that does not exist yet and
+record = True records each dialog (and control) that its window
+specifications resolve to. When
+the script is run again with the same file (e.g. against a localized
+version of the application) the controls are found from the recorded
+class, ID, and number of controls instead of by their text.
+
+The file is a header line and then one line for each resolved dialog or
+control::
+
+    pywinauto-appdata<TAB>1
+    <signature><TAB><record as JSON>
+    ...
+
+The signature is a hash of where in the script the window was resolved
+(the file and line) and of the search criteria without the values that
+change with the language or between runs (titles, process, handles) -
+the names of those criteria are kept. So two controls of a dialog that
+are only told apart by their text get different signatures as long as
+they are resolved in different places of the script. The records are appended as they are made (the file is never rewritten) and
+when a file is read only the signatures are looked at - the JSON of a
+record is decoded when it is looked up.
+"""
+
+from __future__ import absolute_import
+
+import os
+import json
+import hashlib
+import traceback
+
+
+FORMAT_NAME = 'pywinauto-appdata'
+FORMAT_VERSION = 1
+
+# criteria that are different in each language or each time it is run
+_unstable_criteria = (
+    'title', 'title_re', 'best_match', 'process', 'parent', 'handle')
+
+
+#=========================================================================
+class AppDataError(ValueError):
+    "Raised when a file is not application data that can be read"
+    pass
+
+
+#=========================================================================
+def text_hash(text):
+    "Return a short hash of the text of a window"
+    if not isinstance(text, bytes):
+        text = text.encode('utf-8')
+    return hashlib.md5(text).hexdigest()[:16]
+
+
+def script_position():
+    """Return the file and line of the script that is resolving a window
+
+    This is the innermost frame of the stack that is not in pywinauto
+    (None if there is no such frame)."""
+    package = os.path.dirname(os.path.abspath(__file__))
+    for filename, line, function, text in reversed(traceback.extract_stack()):
+        if os.path.dirname(os.path.abspath(filename)) != package:
+            return '%s:%d' % (os.path.basename(filename), line)
+    return None
+
+
+def criteria_signature(criteria, position = None):
+    """Return the signature of a list of criteria dictionaries resolved at
+    position in the script (see script_position)
+
+    The values of the criteria that depend on the language or on the run
+    (see _unstable_criteria) are left out - but not their names.
+    """
+    stable = [
+        sorted([(name, name not in _unstable_criteria and repr(value) or None)
+            for name, value in criterion.items()])
+        for criterion in criteria]
+    return hashlib.md5(
+        repr((position, stable)).encode('utf-8')).hexdigest()
+
+
+def window_record(wrapper):
+    "Return the recorded properties of a window (a HwndWrapper)"
+    rect = wrapper.Rectangle()
+    return {
+        'class' : wrapper.Class(),
+        'control_id' : wrapper.ControlID(),
+        'control_count' : wrapper.ControlCount(),
+        'rect' : [rect.left, rect.top, rect.right, rect.bottom],
+        'text_hash' : text_hash(wrapper.WindowText()),
+    }
+
+
+#=========================================================================
+class AppDataStore(object):
+    """The records of the dialogs and controls resolved by an application
+
+    Each lookup of a signature returns the next record that was made for
+    it, so the same window specification used many times in one place of
+    a script (e.g. in a loop) gets its records in the order that they
+    were made.
+    """
+
+    def __init__(self, filename = None):
+        """Use the data in filename
+
+        The file is only read when the first record is looked up (or
+        appended). Without a filename the records are only kept in memory.
+        """
+        self.filename = filename
+
+        # signature -> list of the JSON of the records (decoded when they
+        # are looked up)
+        self._index = None
+        self._count = 0
+        self._cursors = {}
+
+    def exists(self):
+        "Return True if there is a file of records to replay"
+        return bool(self.filename) and os.path.exists(self.filename)
+
+    def _load(self):
+        "Index the records of the file by their signature"
+        if self._index is not None:
+            return
+
+        index = {}
+        count = 0
+        if self.exists():
+            datafile = open(self.filename, 'rb')
+            try:
+                name, _, version = \
+                    datafile.readline().rstrip(b'\r\n').partition(b'\t')
+                if name != FORMAT_NAME.encode('utf-8'):
+                    raise AppDataError(
+                        "%s is not an application data file" % self.filename)
+                if version != str(FORMAT_VERSION).encode('utf-8'):
+                    raise AppDataError(
+                        "%s is application data version %s (not %d)" % (
+                            self.filename, version.decode('utf-8', 'replace'),
+                            FORMAT_VERSION))
+
+                for line in datafile:
+                    line = line.decode('utf-8').rstrip('\r\n')
+                    if not line:
+                        continue
+                    signature, _, record = line.partition('\t')
+                    index.setdefault(signature, []).append(record)
+                    count += 1
+            finally:
+                datafile.close()
+
+        self._index = index
+        self._count = count
+
+    def __len__(self):
+        self._load()
+        return self._count
+
+    def append(self, criteria, ctrls, position = None):
+        """Record the dialog (and control) that criteria resolved to at
+        position in the script
+
+        The record is appended to the file straight away.
+        """
+        self._load()
+
+        signature = criteria_signature(criteria, position)
+        record = json.dumps({
+            'dialog' : window_record(ctrls[0]),
+            'control' : len(ctrls) > 1 and window_record(ctrls[-1]) or None,
+        }, sort_keys = True)
+
+        if self.filename:
+            new_file = not os.path.exists(self.filename)
+            datafile = open(self.filename, 'ab')
+            try:
+                if new_file:
+                    datafile.write(self._header())
+                datafile.write(
+                    (signature + '\t' + record + '\n').encode('utf-8'))
+            finally:
+                datafile.close()
+
+        self._index.setdefault(signature, []).append(record)
+        self._count += 1
+
+    def lookup(self, criteria, occurrence = 0, position = None):
+        """Return the record of the occurrence'th time that criteria were
+        resolved at position (or None if there was no such time)"""
+        self._load()
+        records = self._index.get(criteria_signature(criteria, position), ())
+        if occurrence >= len(records):
+            return None
+        return json.loads(records[occurrence])
+
+    def next_record(self, criteria, position = None):
+        """Return the record after the last one that was looked up for
+        criteria at position"""
+        signature = criteria_signature(criteria, position)
+        occurrence = self._cursors.get(signature, 0)
+        self._cursors[signature] = occurrence + 1
+        return self.lookup(criteria, occurrence, position)
+
+    def rewind(self):
+        "Start looking up the records of each signature from the first"
+        self._cursors = {}
+
+    def save(self, filename):
+        "Write all the records to filename (a copy of the data)"
+        self._load()
+        datafile = open(filename, 'wb')
+        try:
+            datafile.write(self._header())
+            for signature, records in sorted(self._index.items()):
+                for record in records:
+                    datafile.write(
+                        (signature + '\t' + record + '\n').encode('utf-8'))
+        finally:
+            datafile.close()
+
+    @staticmethod
+    def _header():
+        return ('%s\t%d\n' % (FORMAT_NAME, FORMAT_VERSION)).encode('utf-8')
@@ -57,10 +57,10 @@ from __future__ import absolute_import
 __revision__ = "$Revision$"
 
 import time
+import operator
 import os.path
 ##import os
 import warnings
-import pickle
 
 import ctypes
 
@@ -71,9 +71,11 @@ from . import controls
 from . import findbestmatch
 from . import findwindows
 from . import handleprops
+from . import appdata
 
 from .actionlogger import ActionLogger
-from .timings import Timings, WaitUntil, TimeoutError, WaitUntilPasses
+from .timings import Timings, WaitUntil, TimeoutError, WaitUntilPasses, \
+    WaitUntilStable, Backoff
 
 
 class AppStartError(Exception):
@@ -110,6 +112,14 @@ class WindowSpecification(object):
         self.criteria = [search_criteria, ]
         self.actions = ActionLogger()
 
+        # the ResolutionMemo if the resolved windows are remembered
+        # (see memoize)
+        self.memo = None
+
+        # the Application that records (or replays) the windows that are
+        # resolved in its application data
+        self.app = None
+
 
     def __call__(self, *args, **kwargs):
         "No __call__ so return a usefull error"
@@ -131,10 +141,87 @@ class WindowSpecification(object):
     def WrapperObject(self):
         "Allow the calling code to get the HwndWrapper object"
 
-        ctrls = _resolve_control(self.criteria)
+        ctrls = self._resolve()
 
         return ctrls[-1]
 
+    def memoize(self, memo = None):
+        """Remember the windows that this window specification and the ones
+        made from it resolve to
+
+        Usually each use of a control finds the dialog and the control
+        again. With a memo the windows found are used again as long as
+        they pass some cheap checks (see :class:`ResolutionMemo`). ::
+
+            dlg = app.Dialog.memoize()
+            dlg.Edit.SetEditText("Fred")
+            dlg.Edit.TypeKeys("{END}")  # the same edit - not found again
+            print(dlg.memo.stats())
+
+        :param memo: the :class:`ResolutionMemo` to use. Defaults to a new
+            one (or the one already used)
+
+        Returns this window specification.
+        """
+        if memo is None:
+            memo = self.memo or ResolutionMemo()
+        self.memo = memo
+        return self
+
+    def _resolve(self):
+        "Resolve the criteria - with the memo if there is one"
+        if self.memo is not None:
+            ctrls = self.memo.get(self.criteria)
+            if ctrls is not None:
+                return ctrls
+
+        if self.app is not None and self.app.use_history:
+            ctrls = _resolve_from_appdata(self.criteria, self.app)
+        else:
+            ctrls = _resolve_control(self.criteria)
+            if self.app is not None and self.app.record:
+                self.app.RecordMatch(self.criteria, ctrls)
+
+        if self.memo is not None:
+            self.memo.set(self.criteria, ctrls)
+        return ctrls
+
+    def resolve_many(self, names, timeout = None, retry_interval = None):
+        """Resolve the controls that best match each of names at once
+
+        Returns a dictionary of name -> wrapper of the control. This is
+        the same as using each name as an attribute of this window
+        specification and resolving it, but the controls of the window
+        are only found and named once. ::
+
+            ctrls = app.Dialog.resolve_many(["OK", "Cancel", "NameEdit"])
+            ctrls["NameEdit"].SetEditText("Fred")
+
+        :param names: the names (best_match texts) of the controls
+        :param timeout: the maximum amount of time to try to find the
+            controls. Defaults to ``Timings.window_find_timeout``
+        :param retry_interval: how long to wait between each retry.
+            Defaults to ``Timings.window_find_retry``
+        """
+        if timeout is None:
+            timeout = Timings.window_find_timeout
+        if retry_interval is None:
+            retry_interval = Timings.window_find_retry
+
+        try:
+            return WaitUntilPasses(
+                timeout,
+                retry_interval,
+                _get_ctrls,
+                (findwindows.WindowNotFoundError,
+                findbestmatch.MatchError,
+                controls.InvalidWindowHandle),
+                self.criteria,
+                list(names))
+
+        except TimeoutError as e:
+            raise e.original_exception
+
     def ChildWindow(self, **criteria):
         """Add criteria for a control
 
@@ -147,6 +234,8 @@ class WindowSpecification(object):
             criteria['top_level_only'] = False
 
         new_item = WindowSpecification(self.criteria[0])
+        new_item.memo = self.memo
+        new_item.app = self.app
         new_item.criteria.append(criteria)
 
         return new_item
@@ -178,7 +267,7 @@ class WindowSpecification(object):
         # then resolve the control and do a getitem on it for the
         if len(self.criteria) == 2:
 
-            ctrls = _resolve_control(self.criteria)
+            ctrls = self._resolve()
 
             # try to return a good error message if the control does not
             # have a __getitem__() method)
@@ -194,6 +283,8 @@ class WindowSpecification(object):
         # if we get here then we must have only had one criteria so far
         # so create a new :class:`WindowSpecification` for this control
         new_item = WindowSpecification(self.criteria[0])
+        new_item.memo = self.memo
+        new_item.app = self.app
 
         # add our new criteria
         new_item.criteria.append({"best_match" : key})
@@ -229,7 +320,7 @@ class WindowSpecification(object):
         # attribute and return it
         if len(self.criteria) == 2:
 
-            ctrls = _resolve_control(self.criteria)
+            ctrls = self._resolve()
 
             return getattr(ctrls[-1], attr)
 
@@ -238,7 +329,7 @@ class WindowSpecification(object):
             # then resolve the window and return the attribute
             if len(self.criteria) == 1 and hasattr(DialogWrapper, attr):
 
-                ctrls = _resolve_control(self.criteria)
+                ctrls = self._resolve()
 
                 return getattr(ctrls[-1], attr)
 
@@ -266,10 +357,7 @@ class WindowSpecification(object):
 
         # modify the criteria as Exists should look for all
         # windows - including not visible and disabled
-        exists_criteria = self.criteria[:]
-        for criterion in exists_criteria:
-            criterion['enabled_only'] = False
-            criterion['visible_only'] = False
+        exists_criteria = _exists_criteria(self.criteria)
 
         try:
             _resolve_control(
@@ -302,7 +390,9 @@ class WindowSpecification(object):
         :param timeout: Raise an error if the window is not in the appropriate
             state after this number of seconds.
 
-        :param retry_interval: How long to sleep between each retry
+        :param retry_interval: How long to sleep between each retry. By
+            default the retries start every ``Timings.window_find_retry``
+            and back off up to ``Timings.window_find_max_retry``
 
         An example to wait until the dialog
         exists, is ready, enabled and visible::
@@ -318,39 +408,9 @@ class WindowSpecification(object):
         if timeout is None:
             timeout = Timings.exists_timeout
         if retry_interval is None:
-            retry_interval = Timings.window_find_retry
-
-        # allow for case mixups - just to make it easier to use
-        waitfor = wait_for.lower()
-
-        # make a copy of the criteria that we can modify
-        wait_criteria = self.criteria[:]
-
-        # update the criteria based on what has been requested
-        # we go from least strict to most strict in case the user
-        # has specified conflicting wait conditions
-        for criterion in wait_criteria:
-
-            # default is that it 'exists' and for exists
-            # we must not filter for enabled only or visible only (window
-            # can exist even if invisible or disabled)
-            criterion['enabled_only'] = False
-            criterion['visible_only'] = False
-            if 'exists' in waitfor:
-                pass
-
-            if 'visible' in waitfor:
-                criterion['visible_only'] = True
+            retry_interval = _find_backoff()
 
-            if 'enabled' in waitfor:
-                criterion['enabled_only'] = True
-
-            if 'ready' in waitfor:
-                criterion['visible_only'] = True
-                criterion['enabled_only'] = True
-
-            if 'active' in waitfor:
-                criterion['active_only'] = True
+        wait_criteria = _wait_criteria(self.criteria, wait_for)
 
         ctrls = _resolve_control(wait_criteria, timeout, retry_interval)
 
@@ -376,7 +436,9 @@ class WindowSpecification(object):
         :param timeout: Raise an error if the window is sill in the
             state after this number of seconds.(Optional)
 
-        :param retry_interval: How long to sleep between each retry
+        :param retry_interval: How long to sleep between each retry. By
+            default the retries start every ``Timings.window_find_retry``
+            and back off up to ``Timings.window_find_max_retry``
 
         An example to wait until the dialog is not ready, enabled or visible::
 
@@ -391,59 +453,22 @@ class WindowSpecification(object):
         if timeout is None:
             timeout = Timings.window_find_timeout
         if retry_interval is None:
-            retry_interval = Timings.window_find_retry
+            retry_interval = _find_backoff()
 
         ## remember the start time so we can do an accurate wait for the timeout
         #start = time.time()
 
-        waitnot_criteria = self.criteria[:]
-        for criterion in waitnot_criteria:
-            criterion['enabled_only'] = False
-            criterion['visible_only'] = False
-
-        wait_for_not = wait_for_not.lower()
-
-
-        def WindowIsNotXXX():
-            """Local function that returns False if the window is not
-            Visible, etc. Otherwise returns the best matching control"""
-
-            # first check if the window doesn't exist, because if it doesn't
-            # exist, it definitely can't be visible, active enabled or ready
-            try:
-                ctrls = _resolve_control(waitnot_criteria, 0, .01)
-                # if we get here - then the window exists and we need to
-                # do the other checks below
-
-            except (
-                findwindows.WindowNotFoundError,
-                findbestmatch.MatchError,
-                controls.InvalidWindowHandle):
-                # Window doesn't exist
-                return True
-
-            if 'exists' in wait_for_not:
-                # well if we got here then the control must have
-                # existed so we are not ready to stop checking
-                # because we didn't want the control to exist!
-                return ctrls
-
-            if 'ready' in wait_for_not:
-                if ctrls[-1].IsVisible() and ctrls[-1].IsEnabled():
-                    return ctrls
-
-            if 'enabled' in wait_for_not:
-                if ctrls[-1].IsEnabled():
-                    return ctrls
-
-            if 'visible' in wait_for_not:
-                if ctrls[-1].IsVisible():
-                    return ctrls
-
-            return True
+        waitnot_criteria = _exists_criteria(self.criteria)
 
         try:
-            wait_val = WaitUntil(timeout, retry_interval, WindowIsNotXXX)
+            wait_val = WaitUntil(
+                timeout,
+                retry_interval,
+                _window_is_not,
+                True,
+                operator.eq,
+                waitnot_criteria,
+                wait_for_not.lower())
 #            if self.criteria[-1].has_key('best_match'):
 #                self.actions.log('Window "' + str(self.criteria[-1]['best_match']) + '" became not ' + str(wait_for_not))
 #            elif self.criteria[-1].has_key('title'):
@@ -458,6 +483,39 @@ class WindowSpecification(object):
                 )
 
 
+    def exists_async(self, timeout = None, retry_interval = None):
+        """Return an awaitable Exists() for asyncio (Python 3.5+)
+
+        The same as Exists() but the retries are awaited instead of
+        sleeping - see pywinauto.asyncwaits ::
+
+            if await app.Dialog.exists_async():
+                ...
+        """
+        from . import asyncwaits
+        return asyncwaits.exists_async(self, timeout, retry_interval)
+
+    def wait_async(self, wait_for, timeout = None, retry_interval = None):
+        """Return an awaitable Wait() for asyncio (Python 3.5+)
+
+        The same as Wait() but the retries are awaited instead of
+        sleeping - see pywinauto.asyncwaits ::
+
+            dlg = await app.Dialog.wait_async("ready")
+        """
+        from . import asyncwaits
+        return asyncwaits.wait_async(self, wait_for, timeout, retry_interval)
+
+    def wait_not_async(self, wait_for_not, timeout = None, retry_interval = None):
+        """Return an awaitable WaitNot() for asyncio (Python 3.5+)
+
+        The same as WaitNot() but the retries are awaited instead of
+        sleeping - see pywinauto.asyncwaits
+        """
+        from . import asyncwaits
+        return asyncwaits.wait_not_async(
+            self, wait_for_not, timeout, retry_interval)
+
     def _ctrl_identifiers(self):
 
         ctrls = _resolve_control(
@@ -584,22 +642,68 @@ def _get_ctrl(criteria_):
     else:
         return (dialog, )
 
-cur_item = 0
+def _get_ctrls(criteria, names):
+    """Get the controls of the window found by criteria that best match
+    each of names"""
+    parent = _get_ctrl(criteria)[-1]
+
+    handles = findwindows.find_best_windows(
+        names, parent = parent.handle, top_level_only = False)
+
+    ctrls = {}
+    for name in names:
+        # the same check as findwindows.find_window()
+        if len(handles[name]) > 1:
+            exception = findwindows.WindowAmbiguousError(
+                "There are %d windows that match the criteria %s"% (
+                len(handles[name]),
+                {'best_match' : name},
+                )
+            )
+
+            exception.windows = handles[name]
+            raise exception
+
+        ctrls[name] = controls.WrapHandle(handles[name][0])
+
+    return ctrls
 
 def _resolve_from_appdata(
     criteria_, app, timeout = None, retry_interval = None):
-    "Should not be used at the moment!"
+    """Find the windows that criteria_ resolved to when the application
+    data of app was recorded
 
+    The windows are looked for until timeout like _resolve_control does
+    (the same defaults). WindowNotFoundError is raised straight away if
+    nothing was recorded for criteria_.
+    """
     if timeout is None:
         timeout = Timings.window_find_timeout
     if retry_interval is None:
-        retry_interval = Timings.window_find_retry
+        retry_interval = _find_backoff()
 
-    global cur_item
     # get the stored item corresponding to this request
-    matched_control = app.GetMatchHistoryItem(cur_item)
+    matched_control = app.app_data.next_record(
+        criteria_, appdata.script_position())
+    if matched_control is None:
+        raise findwindows.WindowNotFoundError()
+
+    try:
+        return WaitUntilPasses(
+            timeout,
+            retry_interval,
+            _find_recorded,
+            (findwindows.WindowNotFoundError,
+            controls.InvalidWindowHandle),
+            criteria_,
+            matched_control)
+
+    except TimeoutError as e:
+        raise e.original_exception
+
+def _find_recorded(criteria_, matched_control):
+    "Find the windows of the application data record matched_control"
 
-    cur_item += 1
     # remove parameters from the original search  that changes each time
     criteria = [crit.copy() for crit in criteria_]
 
@@ -636,7 +740,7 @@ def _resolve_from_appdata(
 
     dialog_criterion = criteria[0]
     #print list(matched_control)
-    dialog_criterion['class_name'] = matched_control[1]['Class']
+    dialog_criterion['class_name'] = matched_control['dialog']['class']
 
     # find all the windows in the process
     process_hwnds = findwindows.find_windows(**dialog_criterion)
@@ -646,14 +750,14 @@ def _resolve_from_appdata(
     if len(process_hwnds) >= 1:
 
         similar_child_count = [h for h in process_hwnds
-            if matched_control[1]['ControlCount'] -2 <=
+            if matched_control['dialog']['control_count'] -2 <=
                     len(handleprops.children(h)) and
-                matched_control[1]['ControlCount'] +2 >=
+                matched_control['dialog']['control_count'] +2 >=
                     len(handleprops.children(h))]
 
         if len(similar_child_count) == 0:
             #print "None Similar child count!!???"
-            #print matched_control[1]['ControlCount'], \
+            #print matched_control['dialog']['control_count'], \
             #    len(handleprops.children(h))
             pass
         else:
@@ -680,7 +784,7 @@ def _resolve_from_appdata(
                 #    return item[2]['ControlID'] == \
                 #    handleprops.controlid(other_ctrl)
 
-                ctrl_criterion['class_name'] = matched_control[2]['Class']
+                ctrl_criterion['class_name'] = matched_control['control']['class']
                 ctrl_criterion['parent'] = dialog.handle
                 ctrl_criterion['top_level_only'] = False
                 #ctrl_criterion['predicate_func'] = has_same_id
@@ -691,17 +795,14 @@ def _resolve_from_appdata(
                     same_ids = \
                         [hwnd for hwnd in ctrl_hwnds
                             if handleprops.controlid(hwnd) == \
-                                matched_control[2]['ControlID']]
+                                matched_control['control']['control_id']]
 
                     if len(same_ids) >= 1:
                         ctrl_hwnds = same_ids
 
-                try:
-                    ctrl = controls.WrapHandle(ctrl_hwnds[0])
-                except IndexError:
-                    print("-+-+=_" * 20)
-                    print(found_criteria)
-                    raise
+                if not ctrl_hwnds:
+                    raise findwindows.WindowNotFoundError()
+                ctrl = controls.WrapHandle(ctrl_hwnds[0])
 
                 break
 
@@ -769,6 +870,107 @@ def _resolve_from_appdata(
 
 
 
+def _exists_criteria(criteria):
+    """Return the criteria changed to find all windows - including not
+    visible and disabled ones"""
+    exists_criteria = [criterion.copy() for criterion in criteria]
+    for criterion in exists_criteria:
+        criterion['enabled_only'] = False
+        criterion['visible_only'] = False
+
+    return exists_criteria
+
+
+def _wait_criteria(criteria, wait_for):
+    """Return the criteria changed to only find windows in the states of
+    wait_for (see WindowSpecification.Wait())"""
+
+    # allow for case mixups - just to make it easier to use
+    waitfor = wait_for.lower()
+
+    # make a copy of the criteria that we can modify (not the criteria of
+    # the window specification - other waits may be using them)
+    wait_criteria = [criterion.copy() for criterion in criteria]
+
+    # update the criteria based on what has been requested
+    # we go from least strict to most strict in case the user
+    # has specified conflicting wait conditions
+    for criterion in wait_criteria:
+
+        # default is that it 'exists' and for exists
+        # we must not filter for enabled only or visible only (window
+        # can exist even if invisible or disabled)
+        criterion['enabled_only'] = False
+        criterion['visible_only'] = False
+        if 'exists' in waitfor:
+            pass
+
+        if 'visible' in waitfor:
+            criterion['visible_only'] = True
+
+        if 'enabled' in waitfor:
+            criterion['enabled_only'] = True
+
+        if 'ready' in waitfor:
+            criterion['visible_only'] = True
+            criterion['enabled_only'] = True
+
+        if 'active' in waitfor:
+            criterion['active_only'] = True
+
+    return wait_criteria
+
+
+def _window_is_not(criteria, wait_for_not):
+    """Return True if the window of criteria is not in the (lower case)
+    states of wait_for_not - Visible, etc. Otherwise returns the controls
+    that were found"""
+
+    # first check if the window doesn't exist, because if it doesn't
+    # exist, it definitely can't be visible, active enabled or ready
+    try:
+        ctrls = _resolve_control(criteria, 0, .01)
+        # if we get here - then the window exists and we need to
+        # do the other checks below
+
+    except (
+        findwindows.WindowNotFoundError,
+        findbestmatch.MatchError,
+        controls.InvalidWindowHandle):
+        # Window doesn't exist
+        return True
+
+    if 'exists' in wait_for_not:
+        # well if we got here then the control must have
+        # existed so we are not ready to stop checking
+        # because we didn't want the control to exist!
+        return ctrls
+
+    if 'ready' in wait_for_not:
+        if ctrls[-1].IsVisible() and ctrls[-1].IsEnabled():
+            return ctrls
+
+    if 'enabled' in wait_for_not:
+        if ctrls[-1].IsEnabled():
+            return ctrls
+
+    if 'visible' in wait_for_not:
+        if ctrls[-1].IsVisible():
+            return ctrls
+
+    return True
+
+
+def _find_backoff():
+    """Return the retry intervals for finding windows
+
+    The first retries are quick (most windows are found or appear at once)
+    and then they back off from Timings.window_find_retry up to
+    Timings.window_find_max_retry.
+    """
+    return Backoff(Timings.window_find_retry, Timings.window_find_max_retry)
+
+
 def _resolve_control(criteria, timeout = None, retry_interval = None):
     """Find a control using criteria
 
@@ -779,15 +981,14 @@ def _resolve_control(criteria, timeout = None, retry_interval = None):
          2nd element is the search criteria for a control of the dialog
 
     * **timeout** -  maximum length of time to try to find the controls (default 5)
-    * **retry_interval** - how long to wait between each retry (default .2)
+    * **retry_interval** - how long to wait between each retry (seconds
+      or a timings.Backoff - default _find_backoff())
     """
 
-    start = time.time()
-
     if timeout is None:
         timeout = Timings.window_find_timeout
     if retry_interval is None:
-        retry_interval = Timings.window_find_retry
+        retry_interval = _find_backoff()
 
 
     try:
@@ -806,25 +1007,112 @@ def _resolve_control(criteria, timeout = None, retry_interval = None):
     return ctrl
 
 
+#=========================================================================
+def _criteria_key(criteria):
+    "Return a key for a memo of a list of criteria dictionaries"
+    return tuple(
+        tuple(sorted([(name, repr(value))
+            for name, value in criterion.items()]))
+        for criterion in criteria)
+
+
+class ResolutionMemo(object):
+    """The windows that lists of criteria have resolved to
+
+    A remembered window is only used again if it still looks like the
+    window that was found - the handle is still a window of the same class
+    in the same process (handles can be reused) and it is still visible
+    and enabled if the criteria ask for that. Otherwise the criteria have
+    to be resolved again.
+
+    hits, misses (not remembered) and stale (remembered but no longer
+    valid) count the lookups.
+    """
+
+    def __init__(self):
+        # criteria key -> (wrappers, [(class name, process id), ...])
+        self.windows = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    def get(self, criteria):
+        """Return the wrappers that criteria resolved to or None if they
+        are not remembered or no longer valid"""
+        key = _criteria_key(criteria)
+        if key not in self.windows:
+            self.misses += 1
+            return None
+
+        ctrls, identities = self.windows[key]
+        for ctrl, identity, criterion in zip(ctrls, identities, criteria):
+            if not self._still_valid(ctrl.handle, identity, criterion):
+                del self.windows[key]
+                self.stale += 1
+                return None
+
+        self.hits += 1
+        return ctrls
+
+    def set(self, criteria, ctrls):
+        "Remember the wrappers that criteria resolved to"
+        identities = [
+            (handleprops.classname(ctrl.handle),
+                handleprops.processid(ctrl.handle))
+            for ctrl in ctrls]
+        self.windows[_criteria_key(criteria)] = (ctrls, identities)
+
+    @staticmethod
+    def _still_valid(handle, identity, criterion):
+        "Return whether the window handle is still the one that was found"
+        if not handleprops.iswindow(handle):
+            return False
+        if (handleprops.classname(handle),
+            handleprops.processid(handle)) != identity:
+            return False
+        if criterion.get('visible_only', True) and \
+            not handleprops.isvisible(handle):
+            return False
+        if criterion.get('enabled_only', False) and \
+            not handleprops.isenabled(handle):
+            return False
+        return True
+
+    def clear(self):
+        "Forget all the windows"
+        self.windows.clear()
+
+    def stats(self):
+        "Return a dictionary of the counts of the lookups"
+        return {
+            'hits' : self.hits,
+            'misses' : self.misses,
+            'stale' : self.stale,
+            'size' : len(self.windows),
+        }
+
+
 #=========================================================================
 class Application(object):
     "Represents an application"
 
-    def __init__(self, datafilename = None):
-        "Set the attributes"
+    def __init__(self, datafilename = None, record = False):
+        """Set the attributes
+
+        If the file datafilename exists the windows are found from its
+        application data. Otherwise, with record, the windows that are
+        found are recorded in it (see the appdata module) - each record
+        asks the windows for their class, ID, rectangle, text and number
+        of controls so it is only done when asked for.
+        """
         self.process = None
         self.xmlpath = ''
 
-        self.match_history = []
-        self.use_history = False
-
-        # load the match history if a file was specifed
-        # and it exists
-        if datafilename and os.path.exists(datafilename):
-            datafile = open(datafilename, "rb")
-            self.match_history = pickle.load(datafile)
-            datafile.close()
-            self.use_history = True
+        self.app_data = appdata.AppDataStore(datafilename)
+        self.use_history = self.app_data.exists()
+        self.record = bool(
+            record and self.app_data.filename and not self.use_history)
 
     def __start(*args, **kwargs):
         "Convenience static method that calls start"
@@ -959,43 +1247,82 @@ class Application(object):
     Connect_ = connect_
 
 
-    def top_window_(self):
-        "Return the current top window of the application"
+    def top_window_(self, timeout = None, retry_interval = None, stable_for = 0):
+        """Return the current top window of the application
+
+        Waits until the process has a top level window (at most timeout
+        seconds, default ``Timings.window_find_timeout``).
+
+        :param retry_interval: how long to wait between each look for the
+            window. Defaults to backing off from ``Timings.window_find_retry``
+        :param stable_for: the number of seconds that the same window must
+            stay the top window - e.g. so that a splash screen that is
+            closed at once is not returned. Defaults to 0.
+        """
         if not self.process:
             raise AppNotConnected("Please use start_ or connect_ before "
                 "trying anything else")
 
-        time.sleep(Timings.window_find_timeout)
         # very simple
-        windows = findwindows.find_windows(process = self.process)
+        handle = self._wait_for_window(
+            timeout, retry_interval, stable_for, process = self.process)
 
-        if not windows:
+        if not handle:
             raise RuntimeError("No windows for that process could be found")
 
         criteria = {}
-        criteria['handle'] = windows[0]
+        criteria['handle'] = handle
 
         return WindowSpecification(criteria)
 
-    def active_(self):
-        "Return the active window of the application"
+    def active_(self, timeout = None, retry_interval = None, stable_for = 0):
+        """Return the active window of the application
+
+        Waits until the process has an active window - the parameters are
+        the same as for ``top_window_``.
+        """
         if not self.process:
             raise AppNotConnected("Please use start_ or connect_ before "
                 "trying anything else")
 
-        time.sleep(Timings.window_find_timeout)
         # very simple
-        windows = findwindows.find_windows(
+        handle = self._wait_for_window(
+            timeout, retry_interval, stable_for,
             process = self.process, active_only = True)
 
-        if not windows:
+        if not handle:
             raise RuntimeError("No Windows of that application are active")
 
         criteria = {}
-        criteria['handle'] = windows[0]
+        criteria['handle'] = handle
 
         return WindowSpecification(criteria)
 
+    def _wait_for_window(self, timeout, retry_interval, stable_for, **kwargs):
+        """Return the handle of the first window found by kwargs once it
+        has been the first window for stable_for seconds
+
+        If the timeout expires the first window at that time is returned
+        (or None if there are no windows).
+        """
+        if timeout is None:
+            timeout = Timings.window_find_timeout
+        if retry_interval is None:
+            retry_interval = _find_backoff()
+
+        def FirstWindow():
+            "Return the handle of the first window or None"
+            windows = findwindows.find_windows(**kwargs)
+            if windows:
+                return windows[0]
+            return None
+
+        try:
+            return WaitUntilStable(
+                timeout, retry_interval, FirstWindow, stable_for)
+        except TimeoutError as e:
+            return e.function_value
+
 
     def windows_(self, **kwargs):
         """Return list of wrapped windows of the top level windows of
@@ -1031,12 +1358,14 @@ class Application(object):
 
         if not self.process:
             win_spec = WindowSpecification(kwargs)
+            win_spec.app = self
             self.process = win_spec.WrapperObject().ProcessID()
         # add the restriction for this particular process
         else:
             kwargs['process'] = self.process
 
             win_spec = WindowSpecification(kwargs)
+            win_spec.app = self
 
         return win_spec
     Window_ = window_
@@ -1060,15 +1389,30 @@ class Application(object):
         # delegate all functionality to item access
         return self[key]
 
+    def RecordMatch(self, criteria, ctrls):
+        """Record the windows that criteria resolved to in the application
+        data (only if the Application records - see __init__)
+
+        The record is kept with the place in the script that resolved
+        criteria (see appdata.script_position).
+        """
+        if self.record:
+            self.app_data.append(
+                criteria, ctrls, appdata.script_position())
+
     def WriteAppData(self, filename):
-        "Should not be used - part of application data implementation"
-        f = open(filename, "wb")
-        pickle.dump(self.match_history, f)
-        f.close()
-
-    def GetMatchHistoryItem(self, index):
-        "Should not be used - part of application data implementation"
-        return self.match_history[index]
+        """Write the application data to filename
+
+        The records are already appended to the data file as they are made
+        so this is only needed for a copy in another file.
+        """
+        if filename != self.app_data.filename:
+            self.app_data.save(filename)
+
+    def GetMatchHistoryItem(self, criteria, occurrence = 0, position = None):
+        """Return the application data recorded for the occurrence'th time
+        that criteria were resolved at position in the script"""
+        return self.app_data.lookup(criteria, occurrence, position)
 
 
     def Kill_(self):
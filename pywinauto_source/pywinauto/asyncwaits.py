@@ -0,0 +1,224 @@
+# GUI Application automation and testing library
+# Copyright (C) 2006 Mark Mc Mahon
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public License
+# as published by the Free Software Foundation; either version 2.1
+# of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the
+#    Free Software Foundation, Inc.,
+#    59 Temple Place,
+#    Suite 330,
+#    Boston, MA 02111-1307 USA
+
+"""Waits of pywinauto that can be awaited with asyncio (Python 3.5+)
+
+The waits of WindowSpecification (Wait, WaitNot, Exists) block the
+calling thread in time.sleep() between their retries. The coroutines of
+this module sleep with asyncio.sleep() instead, so many waits can run at
+once on one event loop::
+
+    dlg, progress = app.Dialog, app.Progress
+    await asyncio.gather(
+        dlg.wait_async("ready"),
+        progress.wait_not_async("visible", timeout = 60))
+
+Each wait can be cancelled like any other task, and asyncio.wait_for()
+gives a wait its own timeout.
+
+Each check for the windows is still a short call that is not awaited -
+only the time between the checks is given back to the event loop.
+
+This module is imported by WindowSpecification.wait_async() etc. when
+they are first called (so the rest of pywinauto still works with Python
+versions that do not have asyncio).
+"""
+
+from __future__ import absolute_import
+
+import asyncio
+import operator
+
+from . import controls
+from . import findbestmatch
+from . import findwindows
+from . import application
+from .timings import Timings, TimeoutError, WaitScheduler
+
+
+#=========================================================================
+async def WaitUntilAsync(
+    timeout,
+    retry_interval,
+    func,
+    value = True,
+    op = operator.eq,
+    *args):
+
+    """Wait until ``op(function(*args), value)`` is True or until timeout
+       expires - timings.WaitUntil() that awaits between retries
+
+    Returns the return value of the function
+    If the operation times out then the return value of the the function
+    is in the 'function_value' attribute of the raised exception.
+    """
+    scheduler = WaitScheduler(timeout, retry_interval)
+
+    func_val = func(*args)
+    # while the function hasn't returned what we are waiting for
+    while not op(func_val, value):
+
+        # if we have to wait some more
+        interval = scheduler.next_interval()
+        if interval is None:
+            err = TimeoutError("timed out")
+            err.function_value = func_val
+            raise err
+
+        await asyncio.sleep(interval)
+        func_val = func(*args)
+
+    return func_val
+
+
+#=========================================================================
+async def WaitUntilPassesAsync(
+    timeout,
+    retry_interval,
+    func,
+    exceptions = (Exception),
+    *args):
+
+    """Wait until ``func(*args)`` does not raise one of the exceptions in
+       exceptions - timings.WaitUntilPasses() that awaits between retries
+
+    Returns the return value of the function
+    If the operation times out then the original exception raised is in
+    the 'original_exception' attribute of the raised exception.
+    """
+    scheduler = WaitScheduler(timeout, retry_interval)
+
+    # keep trying until the timeout is passed
+    while True:
+        try:
+            return func(*args)
+
+        # An exception was raised - so wait and try again
+        except exceptions as e:
+            interval = scheduler.next_interval()
+            if interval is None:
+                # Raise a TimeoutError - and put the original exception
+                # inside it
+                err = TimeoutError()
+                err.original_exception = e
+                raise err
+
+        await asyncio.sleep(interval)
+
+
+#=========================================================================
+async def resolve_async(criteria, timeout = None, retry_interval = None):
+    """Find a control using criteria - application._resolve_control()
+    that awaits between retries
+
+    * **criteria** - a list that contains 1 or 2 dictionaries
+
+         1st element is search criteria for the dialog
+
+         2nd element is the search criteria for a control of the dialog
+
+    * **timeout** -  maximum length of time to try to find the controls
+      (default Timings.window_find_timeout)
+    * **retry_interval** - how long to wait between each retry (seconds
+      or a timings.Backoff - default application._find_backoff())
+    """
+    if timeout is None:
+        timeout = Timings.window_find_timeout
+    if retry_interval is None:
+        retry_interval = application._find_backoff()
+
+    try:
+        return await WaitUntilPassesAsync(
+            timeout,
+            retry_interval,
+            application._get_ctrl,
+            (findwindows.WindowNotFoundError,
+            findbestmatch.MatchError,
+            controls.InvalidWindowHandle),
+            criteria)
+
+    except TimeoutError as e:
+        raise e.original_exception
+
+
+#=========================================================================
+async def exists_async(spec, timeout = None, retry_interval = None):
+    "WindowSpecification.Exists() that awaits between retries"
+    if timeout is None:
+        timeout = Timings.exists_timeout
+    if retry_interval is None:
+        retry_interval = Timings.exists_retry
+
+    try:
+        await resolve_async(
+            application._exists_criteria(spec.criteria),
+            timeout,
+            retry_interval)
+
+        return True
+    except (
+        findwindows.WindowNotFoundError,
+        findbestmatch.MatchError,
+        controls.InvalidWindowHandle):
+        return False
+
+
+async def wait_async(spec, wait_for, timeout = None, retry_interval = None):
+    "WindowSpecification.Wait() that awaits between retries"
+    if timeout is None:
+        timeout = Timings.exists_timeout
+    if retry_interval is None:
+        retry_interval = application._find_backoff()
+
+    ctrls = await resolve_async(
+        application._wait_criteria(spec.criteria, wait_for),
+        timeout,
+        retry_interval)
+
+    spec.actions.log('Window "' + ctrls[-1].WindowText() +
+        '" appeared to be ' + str(wait_for))
+    return ctrls[-1]
+
+
+async def wait_not_async(
+    spec, wait_for_not, timeout = None, retry_interval = None):
+    "WindowSpecification.WaitNot() that awaits between retries"
+    if timeout is None:
+        timeout = Timings.window_find_timeout
+    if retry_interval is None:
+        retry_interval = application._find_backoff()
+
+    try:
+        await WaitUntilAsync(
+            timeout,
+            retry_interval,
+            application._window_is_not,
+            True,
+            operator.eq,
+            application._exists_criteria(spec.criteria),
+            wait_for_not.lower())
+    except TimeoutError as e:
+        raise RuntimeError(
+            "Timed out while waiting for window (%s - '%s') "
+            "to not be in '%s' state"% (
+                e.function_value[-1].Class(),
+                e.function_value[-1].WindowText(),
+                "', '".join( wait_for_not.split() ) )
+            )
@@ -24,16 +24,20 @@ from __future__ import absolute_import
 
 __revision__ = "$Revision: 679 $"
 
+import os
 import sys
 import re
+import json
+import time
 import difflib
+import heapq
+import hashlib
 import traceback
+import threading
+import collections
 
 from . import fuzzydict
-#import ctypes
-#import ldistance
-#levenshtein_distance = ctypes.cdll.levenshtein.levenshtein_distance
-#levenshtein_distance = ldistance.distance
+from . import similarity
 from .actionlogger import ActionLogger
 
 # need to use sets.Set for python 2.3 compatability
@@ -46,21 +50,185 @@ except NameError:
 
 find_best_control_match_cutoff = .6
 
+# UniqueDict.FindBestMatches only builds a candidate index for dictionaries
+# with at least this many keys (None disables the index)
+candidate_index_threshold = 100
+
+# how many of the closest matches a MatchError suggests
+match_error_suggestions = 5
+
 #====================================================================
 class MatchError(IndexError):
-    "A suitable match could not be found"
-    def __init__(self, items = None, tofind = ''):
+    """A suitable match could not be found
+
+    suggestions is a list of (text, ratio) of the closest matches - the
+    message lists those rather than all the items when it is given."""
+    def __init__(self, items = None, tofind = '', suggestions = None):
         "Init the parent with the message"
         self.tofind = tofind
         self.items = items
         if self.items is None:
             self.items = []
 
-        IndexError.__init__(self,
-            "Could not find '%s' in '%s'"% (tofind, self.items))
+        self.suggestions = suggestions
+        if self.suggestions is None:
+            self.suggestions = []
+
+        if self.suggestions:
+            message = "Could not find '%s' - the closest matches are %s" % (
+                tofind,
+                ", ".join(["'%s' (%.2f)" % (text, ratio)
+                    for text, ratio in self.suggestions]))
+        else:
+            message = "Could not find '%s' in '%s'"% (tofind, self.items)
+
+        IndexError.__init__(self, message)
 
 
-_cache = {}
+#====================================================================
+class RatioCache(object):
+    """Cache of the match ratios between two texts
+
+    Once more than maxsize ratios are stored the least recently used ones
+    are dropped (a maxsize of None means no limit). The cache can be used
+    from several threads at once.
+    """
+    def __init__(self, maxsize = 100000):
+        "Create an empty cache"
+        self.maxsize = maxsize
+
+        self._ratios = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        "Return the ratio stored for key (None if it is not in the cache)"
+        with self._lock:
+            try:
+                ratio = self._ratios.pop(key)
+            except KeyError:
+                self.misses += 1
+                return None
+
+            # add it back so that it is now the most recently used
+            self._ratios[key] = ratio
+            self.hits += 1
+            return ratio
+
+    def set(self, key, ratio):
+        "Store the ratio for key - dropping old ratios if the cache is full"
+        with self._lock:
+            self._ratios.pop(key, None)
+            self._ratios[key] = ratio
+
+            if self.maxsize is not None:
+                while len(self._ratios) > self.maxsize:
+                    self._ratios.popitem(last = False)
+                    self.evictions += 1
+
+    def clear(self):
+        "Remove all the ratios and reset the counters"
+        with self._lock:
+            self._ratios.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self):
+        "Return a dictionary with the size and hit/miss/eviction counters"
+        with self._lock:
+            return {
+                'size' : len(self._ratios),
+                'maxsize' : self.maxsize,
+                'hits' : self.hits,
+                'misses' : self.misses,
+                'evictions' : self.evictions,
+            }
+
+    def __len__(self):
+        "Return the number of ratios in the cache"
+        with self._lock:
+            return len(self._ratios)
+
+    def __contains__(self, key):
+        "Return True if there is a ratio stored for key"
+        with self._lock:
+            return key in self._ratios
+
+
+_cache = RatioCache()
+
+def set_ratio_cache(cache):
+    """Use cache for storing match ratios and return the previous cache
+
+    cache can be any object with the get(), set() and clear() methods
+    of RatioCache."""
+    global _cache
+    previous = _cache
+    _cache = cache
+    return previous
+
+
+def _ratio_key(text, other_text, ratio_offset = None):
+    """Return the cache key for the ratio between the two texts
+
+    The same key is returned for both orders of the texts so only one
+    lookup is needed. ratio_offset is part of the key as the ratios
+    from UniqueDict.FindBestMatches are scaled by it (None is used for
+    the unscaled ratios of _get_match_ratios)."""
+    if text <= other_text:
+        return (ratio_offset, text, other_text)
+    return (ratio_offset, other_text, text)
+
+
+# the scorer used for the match ratios (see set_scorer())
+_scorer = similarity.DifflibScorer()
+
+def set_scorer(scorer):
+    """Use scorer to calculate the match ratios and return the previous one
+
+    scorer is one of the scorers from the similarity module, the name
+    of one of them ('difflib', 'levenshtein' or 'jarowinkler') or any
+    object with the same ratios() method. The default difflib scorer
+    skips texts whose quick upper bounds are below the cutoff, the other
+    scorers compare the search text against all the texts at once."""
+    global _scorer
+    previous = _scorer
+    _scorer = similarity.get_scorer(scorer)
+
+    # the cached ratios are from the previous scorer
+    _cache.clear()
+    return previous
+
+
+def _batch_ratios(texts, search_text, ratio_offset = None):
+    """Return the ratio of each of texts against search_text
+
+    The ratios that are not already in the cache are calculated by the
+    current scorer in one call - and scaled by ratio_offset if given."""
+    ratios = [_cache.get(_ratio_key(text, search_text, ratio_offset))
+        for text in texts]
+
+    missing = [pos for pos, ratio in enumerate(ratios) if ratio is None]
+    if missing:
+        scale = 1
+        if ratio_offset is not None:
+            scale = ratio_offset
+
+        new_ratios = _scorer.ratios(
+            search_text, [texts[pos] for pos in missing])
+
+        for pos, ratio in zip(missing, new_ratios):
+            ratios[pos] = ratio * scale
+            _cache.set(
+                _ratio_key(texts[pos], search_text, ratio_offset),
+                ratios[pos])
+
+    return ratios
+
 
 # given a list of texts return the match score for each
 # and the best score and text with best score
@@ -76,32 +244,25 @@ def _get_match_ratios(texts, match_against):
     best_ratio = 0
     best_text = ''
 
-    global cache
+    # scorers other than difflib score all the texts at once
+    if not isinstance(_scorer, similarity.DifflibScorer):
+        texts = list(texts)
+        ratios = dict(zip(texts, _batch_ratios(texts, match_against)))
 
     for text in texts:
 
-        if 0:
-            pass
-
-        if (text, match_against) in _cache:
-            ratios[text] = _cache[(text, match_against)]
-
-        elif(match_against, text) in _cache:
-            ratios[text] = _cache[(match_against, text)]
+        if text not in ratios:
+            key = _ratio_key(text, match_against)
+            ratios[text] = _cache.get(key)
 
-        else:
-            # set up the SequenceMatcher with other text
-            ratio_calc.set_seq2(text)
-
-            # try using the levenshtein distance instead
-            #lev_dist = levenshtein_distance(unicode(match_against), unicode(text))
-            #ratio = 1 - lev_dist / 10.0
-            #ratios[text] = ratio
+            if ratios[text] is None:
+                # set up the SequenceMatcher with other text
+                ratio_calc.set_seq2(text)
 
-            # calculate ratio and store it
-            ratios[text] = ratio_calc.ratio()
+                # calculate ratio and store it
+                ratios[text] = ratio_calc.ratio()
 
-            _cache[(match_against, text)] = ratios[text]
+                _cache.set(key, ratios[text])
 
         # if this is the best so far then update best stats
         if ratios[text] > best_ratio:
@@ -137,7 +298,11 @@ def find_best_match(search_text, item_texts, items, limit_ratio = .5):
         _get_match_ratios(text_item_map.keys(), search_text)
 
     if best_ratio < limit_ratio:
-        raise MatchError(items = text_item_map.keys(), tofind = search_text)
+        raise MatchError(
+            items = text_item_map.keys(),
+            tofind = search_text,
+            suggestions = text_item_map.FindTopMatches(
+                search_text, match_error_suggestions))
 
     return text_item_map[best_text]
 
@@ -193,13 +358,224 @@ def IsAboveOrToLeft(ref_control, other_ctrl):
 
 #====================================================================
 distance_cuttoff = 999
-def GetNonTextControlName(ctrl, controls):
+
+def _label_info(ctrl):
+    """Return (text, rectangle, is Static) of a control that can be a label
+    of other controls - or None if it cannot"""
+    if not (ctrl.IsVisible() and ctrl.WindowText() and ctrl.can_be_label):
+        return None
+
+    return (
+        ctrl.WindowText(),
+        ctrl.Rectangle(),
+        ctrl.FriendlyClassName() == "Static")
+
+
+def _label_distance(text_r, ctrl_r):
+    """Return how far the label rectangle text_r is from the control
+    rectangle ctrl_r - or None if the label is not above or to the left"""
+
+    # skip controls where text win is to the right of ctrl
+    if text_r.left >= ctrl_r.right:
+        return None
+
+    # skip controls where text win is below ctrl
+    if text_r.top >= ctrl_r.bottom:
+        return None
+
+    # calculate the distance between the controls
+    # at first I just calculated the distance from the top
+    # left corner of one control to the top left corner of
+    # the other control but this was not best, so as a text
+    # control should either be above or to the left of the
+    # control I get the distance between the top left of the
+    # non text control against the
+    #    Top-Right of the text control (text control to the left)
+    #    Bottom-Left of the text control (text control above)
+    # then I get the min of these two
+
+    # We do not actually need to calculate the difference
+    # here as we only need a comparative number. As long as
+    # we find the closest one the actual distance is not all
+    # that important to us.
+    distance = abs(text_r.left - ctrl_r.left) + \
+        abs(text_r.bottom - ctrl_r.top)
+    distance2 = abs(text_r.right - ctrl_r.left) + \
+        abs(text_r.top - ctrl_r.top)
+
+    return min(distance, distance2)
+
+
+class _LabelIndex(object):
+    """Grid of the controls that can be labels for the other controls
+
+    Built once for all the controls of a dialog so that the closest label
+    of a control can be found without measuring the distance to every
+    label. The distance to a label is measured to its bottom-left and
+    top-right corners - so a label is in the grid cells of both of them.
+    """
+
+    # width and height of the grid cells
+    cell_size = 50
+
+    def __init__(self, controls, label_infos = None):
+        """Find the labels in controls and put them in the grid
+
+        label_infos is a dictionary of control -> _label_info(control)
+        for when that is already known."""
+        # the index of each control (the first one for duplicates
+        # like controls.index())
+        self.positions = {}
+        for pos, ctrl in enumerate(controls):
+            self.positions.setdefault(ctrl, pos)
+
+        # (text, rectangle, control) of each label in the order
+        # of the controls
+        self.labels = []
+
+        # (rectangle, static_only, label control, distance) of the last
+        # closest_label() - the label control is None if none was found
+        self.last_closest = None
+
+        # the grid of all the labels and the grid of the Static labels
+        # (UpDown controls only use those) - each as a dictionary
+        # of cell -> label numbers and the bounds of the cells used
+        self.grids = {False : {}, True : {}}
+        self.bounds = {False : None, True : None}
+
+        for ctrl in controls:
+            if label_infos is None:
+                info = _label_info(ctrl)
+            else:
+                info = label_infos[ctrl]
+
+            if info is None:
+                continue
+
+            text, text_r, is_static = info
+
+            label = len(self.labels)
+            self.labels.append((text, text_r, ctrl))
+
+            static_only_grids = [False]
+            if is_static:
+                static_only_grids.append(True)
+
+            for point in ((text_r.left, text_r.bottom),
+                          (text_r.right, text_r.top)):
+                cell = self._cell(*point)
+                for static_only in static_only_grids:
+                    self._add(static_only, cell, label)
+
+    def _cell(self, x, y):
+        "Return the grid cell of the point"
+        return (x // self.cell_size, y // self.cell_size)
+
+    def _add(self, static_only, cell, label):
+        "Add the label to the cell of a grid"
+        cell_labels = self.grids[static_only].setdefault(cell, [])
+        if label not in cell_labels[-1:]:
+            cell_labels.append(label)
+
+        bounds = self.bounds[static_only]
+        if bounds is None:
+            bounds = (cell[0], cell[1], cell[0], cell[1])
+        self.bounds[static_only] = (
+            min(bounds[0], cell[0]), min(bounds[1], cell[1]),
+            max(bounds[2], cell[0]), max(bounds[3], cell[1]))
+
+    def _ring_cells(self, center, ring, bounds):
+        "Return the cells ring cells away from center that are in bounds"
+        if not ring:
+            return [center]
+
+        min_x, min_y, max_x, max_y = bounds
+        center_x, center_y = center
+
+        cells = []
+        xs = range(max(center_x - ring, min_x), min(center_x + ring, max_x) + 1)
+        for y in (center_y - ring, center_y + ring):
+            if min_y <= y <= max_y:
+                cells.extend([(x, y) for x in xs])
+
+        ys = range(
+            max(center_y - ring + 1, min_y), min(center_y + ring - 1, max_y) + 1)
+        for x in (center_x - ring, center_x + ring):
+            if min_x <= x <= max_x:
+                cells.extend([(x, y) for y in ys])
+
+        return cells
+
+    def closest_label(self, ctrl_r, static_only = False):
+        """Return the text of the closest label above or to the left of
+        the rectangle ctrl_r
+
+        Returns None if there is no label closer than distance_cuttoff.
+        If labels are the same distance away the first one wins."""
+        self.last_closest = (ctrl_r, static_only, None, distance_cuttoff)
+
+        grid = self.grids[static_only]
+        bounds = self.bounds[static_only]
+        if not grid:
+            return None
+
+        center = self._cell(ctrl_r.left, ctrl_r.top)
+
+        closest = distance_cuttoff
+        best_label = None
+
+        # the rings before first_ring and after last_ring have no
+        # cells inside the bounds of the grid
+        first_ring = max(
+            bounds[0] - center[0], bounds[1] - center[1],
+            center[0] - bounds[2], center[1] - bounds[3], 0)
+        last_ring = max(
+            center[0] - bounds[0], center[1] - bounds[1],
+            bounds[2] - center[0], bounds[3] - center[1])
+
+        # look at the cells in rings around the cell of the control
+        # until even the closest point of the ring is further away
+        # than the closest label found
+        ring = first_ring
+        while ring <= last_ring and (ring - 1) * self.cell_size < closest:
+
+            for cell in self._ring_cells(center, ring, bounds):
+                for label in grid.get(cell, ()):
+                    distance = _label_distance(self.labels[label][1], ctrl_r)
+                    if distance is None:
+                        continue
+
+                    # if this distance was closer then the last one
+                    if distance < closest or (distance == closest and \
+                        best_label is not None and label < best_label):
+                        closest = distance
+                        best_label = label
+
+            ring += 1
+
+        if best_label is None:
+            return None
+
+        text, text_r, label_ctrl = self.labels[best_label]
+        self.last_closest = (ctrl_r, static_only, label_ctrl, closest)
+        return text
+
+
+def GetNonTextControlName(ctrl, controls, label_index = None):
     """return the name for this control by finding the closest
-    text control above and to its left"""
+    text control above and to its left
+
+    label_index is the _LabelIndex of controls - pass it in when naming
+    several controls of the same dialog so that it is only built once."""
+
+    if label_index is None:
+        label_index = _LabelIndex(controls)
 
     names = []
 
-    ctrl_index = controls.index(ctrl)
+    ctrl_index = label_index.positions.get(ctrl)
+    if ctrl_index is None:
+        ctrl_index = controls.index(ctrl)
 
     if ctrl_index != 0:
         prev_ctrl = controls[ctrl_index-1]
@@ -212,75 +588,15 @@ def GetNonTextControlName(ctrl, controls):
                 prev_ctrl.WindowText() +
                     ctrl.FriendlyClassName())
 
-    # get the visible text controls so that we can get
-    # the closest text if the control has no text
-    text_ctrls = [ctrl_ for ctrl_ in controls
-        if ctrl_.IsVisible() and ctrl_.WindowText() and ctrl_.can_be_label]
+    # find the closest of the visible text controls
+    # UpDown control should use Static text only because edit box text is often useless
+    label = label_index.closest_label(
+        ctrl.Rectangle(),
+        static_only = ctrl.FriendlyClassName() == "UpDown")
 
     best_name = ''
-    closest = distance_cuttoff
-    # now for each of the visible text controls
-    for text_ctrl in text_ctrls:
-
-        # get aliases to the control rectangles
-        text_r = text_ctrl.Rectangle()
-        ctrl_r = ctrl.Rectangle()
-
-        # skip controls where text win is to the right of ctrl
-        if text_r.left >= ctrl_r.right:
-            continue
-
-        # skip controls where text win is below ctrl
-        if text_r.top >= ctrl_r.bottom:
-            continue
-
-        # calculate the distance between the controls
-        # at first I just calculated the distance from the top let
-        # corner of one control to the top left corner of the other control
-        # but this was not best, so as a text control should either be above
-        # or to the left of the control I get the distance between
-        # the top left of the non text control against the
-        #    Top-Right of the text control (text control to the left)
-        #    Bottom-Left of the text control (text control above)
-        # then I get the min of these two
-
-
-        # We do not actually need to calculate the difference here as we
-        # only need a comparative number. As long as we find the closest one
-        # the actual distance is not all that important to us.
-        # this reduced the unit tests run on my by about 1 second
-        # (from 61 ->60 s)
-
-        # (x^2 + y^2)^.5
-        #distance = (
-        #    (text_r.left - ctrl_r.left) ** 2 +  #  (x^2 + y^2)
-        #    (text_r.bottom - ctrl_r.top) ** 2) \
-        #    ** .5  # ^.5
-
-        #distance2 = (
-        #    (text_r.right - ctrl_r.left) ** 2 +  #  (x^2 + y^2)
-        #    (text_r.top - ctrl_r.top) ** 2) \
-        #    ** .5  # ^.5
-
-        distance = abs(text_r.left - ctrl_r.left) + abs(text_r.bottom - ctrl_r.top)
-        distance2 = abs(text_r.right - ctrl_r.left) + abs(text_r.top - ctrl_r.top)
-
-        distance = min(distance, distance2)
-        
-        # UpDown control should use Static text only because edit box text is often useless
-        if ctrl.FriendlyClassName() == "UpDown":
-            if text_ctrl.FriendlyClassName() == "Static": # vvryabov's TODO: use search in all text controls for all non-text ones (like Dijkstra algorithm vs Floyd one)
-                if distance < closest:
-                    closest = distance
-                    best_name = text_ctrl.WindowText() + ctrl.FriendlyClassName()
-
-        # if this distance was closer then the last one
-        elif distance < closest:
-            closest = distance
-            #if text_ctrl.WindowText() == '':
-            #    best_name = ctrl.FriendlyClassName() + ' '.join(text_ctrl.Texts()[1:2])
-            #else:
-            best_name = text_ctrl.WindowText() + ctrl.FriendlyClassName()
+    if label is not None:
+        best_name = label + ctrl.FriendlyClassName()
 
     names.append(best_name)
 
@@ -288,8 +604,10 @@ def GetNonTextControlName(ctrl, controls):
 
 
 #====================================================================
-def get_control_names(control, allcontrols):
-    "Returns a list of names for this control"
+def get_control_names(control, allcontrols, label_index = None):
+    """Returns a list of names for this control
+
+    label_index is passed on to GetNonTextControlName"""
     names = []
 
     # if it has a reference control - then use that
@@ -313,7 +631,8 @@ def get_control_names(control, allcontrols):
             ActionLogger().log('Warning! Cannot get control.Texts()') #\nTraceback:\n' + traceback.format_exc())
 
         # so find the text of the nearest text visible control
-        non_text_names = GetNonTextControlName(control, allcontrols)
+        non_text_names = GetNonTextControlName(
+            control, allcontrols, label_index)
 
         # and if one was found - add it
         if non_text_names:
@@ -321,7 +640,8 @@ def get_control_names(control, allcontrols):
     # it didn't have visible text
     else:
         # so find the text of the nearest text visible control
-        non_text_names = GetNonTextControlName(control, allcontrols)
+        non_text_names = GetNonTextControlName(
+            control, allcontrols, label_index)
 
         # and if one was found - add it
         if non_text_names:
@@ -331,34 +651,325 @@ def get_control_names(control, allcontrols):
     return set(names)
 
 
+#====================================================================
+def _char_counts(text):
+    "Return a dictionary of how many times each character is in text"
+    counts = {}
+    for char in text:
+        counts[char] = counts.get(char, 0) + 1
+    return counts
+
+
+#====================================================================
+class _CandidateIndex(object):
+    """Inverted index from characters to the texts that contain them
+
+    SequenceMatcher.ratio() can never be higher than quick_ratio() which
+    only depends on how many characters the two strings have in common.
+    The index gives that number for every text in one pass over the
+    characters of the search text - so texts that cannot reach the
+    cutoff are never handed to the SequenceMatcher.
+
+    (q-grams longer than 1 character cannot be used for this as the
+    SequenceMatcher also counts matching blocks of a single character)
+    """
+    def __init__(self, texts):
+        "Index the texts - positions are the order of the texts"
+        self.texts = texts
+        self.postings = {}
+        for pos, text in enumerate(texts):
+            for char, count in _char_counts(text).items():
+                try:
+                    self.postings[char].append((pos, count))
+                except KeyError:
+                    self.postings[char] = [(pos, count)]
+
+        # the last search (the variants of a search often look for
+        # the same text in the same index)
+        self._last_search = None
+
+    def common_counts(self, search_text):
+        """Return a dictionary of position -> number of characters
+        in common with search_text (texts with nothing in common are
+        not included)"""
+        common = {}
+        for char, count in _char_counts(search_text).items():
+            for pos, text_count in self.postings.get(char, ()):
+                common[pos] = common.get(pos, 0) + min(count, text_count)
+        return common
+
+    def candidates(self, search_text, cutoff):
+        """Return the set of positions of the texts that could match
+        search_text
+
+        These are the texts whose quick_ratio() against search_text is
+        not lower than cutoff - and the texts with no characters in common
+        with it, as their ratio of 0 is what is returned when nothing
+        reaches the cutoff."""
+        if self._last_search is not None and \
+            self._last_search[:2] == (search_text, cutoff):
+            return self._last_search[2]
+
+        search_len = len(search_text)
+        common = self.common_counts(search_text)
+
+        positions = set()
+        for pos, text in enumerate(self.texts):
+            if pos not in common:
+                positions.add(pos)
+            elif 2.0 * common[pos] / (len(text) + search_len) >= cutoff:
+                positions.add(pos)
+
+        self._last_search = (search_text, cutoff, positions)
+        return positions
+
+
+# the ways that FindBestMatches can compare the texts as
+# (clean, ignore_case) - in the order find_best_control_matches prefers them
+_match_variants = ((False, False), (False, True), (True, False), (True, True))
+
+def _variant_texts(text):
+    """Return the text for each of the _match_variants
+
+    A variant that is the same as an earlier one is the same object, which
+    lets a SequenceMatcher skip re-indexing it."""
+    lower = text.lower()
+    if lower == text:
+        lower = text
+
+    clean = _clean_non_chars(text)
+    if clean == text:
+        clean = text
+
+    clean_lower = clean.lower()
+    if clean_lower == clean:
+        clean_lower = clean
+    elif clean_lower == lower:
+        clean_lower = lower
+
+    return (text, lower, clean, clean_lower)
+
+
+def _ratio_offset(clean, ignore_case):
+    "Return how much the ratios for this variant are scaled down"
+    ratio_offset = 1
+    if clean:
+        ratio_offset *= .9
+
+    if ignore_case:
+        ratio_offset *= .9
+    return ratio_offset
+
+
+def _variant_ratio(ratio_calc, text, search_text, ratio_offset):
+    """Return the scaled ratio of text against search_text
+
+    ratio_calc must be a SequenceMatcher with search_text as its
+    first sequence."""
+
+    # check if this item is in the cache - if yes, then retrieve it
+    key = _ratio_key(text, search_text, ratio_offset)
+    ratio = _cache.get(key)
+
+    # not in the cache - calculate it and add it to the cache
+    if ratio is None:
+        # set up the SequenceMatcher with other text
+        ratio_calc.set_seq2(text)
+
+        # if a very quick check reveals that this is not going
+        # to match then
+        ratio = ratio_calc.real_quick_ratio() * ratio_offset
+
+        if ratio  >=  find_best_control_match_cutoff:
+            ratio = ratio_calc.quick_ratio() * ratio_offset
+
+            if ratio >= find_best_control_match_cutoff:
+                ratio = ratio_calc.ratio() * ratio_offset
+
+        # save the match we got and store it in the cache
+        _cache.set(key, ratio)
+
+    return ratio
+
+
+def _bounded_ratio(ratio_calc, text, search_text, ratio_offset, floor):
+    """Return the scaled ratio of text against search_text - or None if
+    it is not above floor
+
+    The real_quick_ratio and quick_ratio are upper bounds of the ratio
+    so the ratio is only calculated if they are above floor. Cached
+    ratios below find_best_control_match_cutoff can be one of those
+    bounds (see _variant_ratio) and are used the same way."""
+
+    key = _ratio_key(text, search_text, ratio_offset)
+    ratio = _cache.get(key)
+
+    if ratio is None or ratio < find_best_control_match_cutoff:
+        if ratio is not None and ratio <= floor:
+            return None
+
+        ratio_calc.set_seq2(text)
+        if ratio_calc.real_quick_ratio() * ratio_offset <= floor:
+            return None
+
+        if ratio_calc.quick_ratio() * ratio_offset <= floor:
+            return None
+
+        ratio = ratio_calc.ratio() * ratio_offset
+
+        # only cache ratios that _variant_ratio would have calculated
+        # in full
+        if ratio >= find_best_control_match_cutoff:
+            _cache.set(key, ratio)
+
+    if ratio <= floor:
+        return None
+    return ratio
+
+
 #====================================================================
 class UniqueDict(dict):
     "A dictionary subclass that handles making it's keys unique"
+
+    def __init__(self, *args, **kwargs):
+        "Create the dictionary - any items are added through __setitem__"
+        dict.__init__(self)
+
+        # the _match_variants texts of each key
+        self._variants = {}
+
+        # candidate indexes for each of the _match_variants
+        self._candidate_indexes = None
+
+        # the first number that might be free to add to each duplicated
+        # text (all the lower ones are used)
+        self._next_suffixes = {}
+
+        for text, item in dict(*args, **kwargs).items():
+            self[text] = item
+
     def __setitem__(self, text, item):
         "Set an item of the dictionary"
 
         # this text is already in the map
         # so we need to make it unique
         if text in self:
-            # find next unique text after text1
+            # find next unique text after text1 - other keys may
+            # already end in the next number so it still has to be checked
             unique_text = text
-            counter = 2
+            counter = self._next_suffixes.get(text, 2)
             while unique_text in self:
                 unique_text = text + str(counter)
                 counter += 1
+            self._next_suffixes[text] = counter
 
             # now we also need to make sure the original item
             # is under text0 and text1 also!
             if text + '0' not in self:
-                dict.__setitem__(self, text+'0', self[text])
-                dict.__setitem__(self, text+'1', self[text])
+                self._set_item(text+'0', self[text])
+                self._set_item(text+'1', self[text])
 
             # now that we don't need original 'text' anymore
             # replace it with the uniq text
             text = unique_text
 
         # add our current item
+        self._set_item(text, item)
+
+    def __delitem__(self, text):
+        "Delete an item of the dictionary"
+        dict.__delitem__(self, text)
+        self._forget(text)
+
+    def update(self, *args, **kwargs):
+        "Add the items (through __setitem__ so the keys are made unique)"
+        for text, item in dict(*args, **kwargs).items():
+            self[text] = item
+
+    def setdefault(self, text, default = None):
+        "Return the item for text - adding default for it if needed"
+        if text not in self:
+            self[text] = default
+        return self[text]
+
+    def pop(self, text, *default):
+        "Remove the item for text and return it"
+        had_text = text in self
+        item = dict.pop(self, text, *default)
+        if had_text:
+            self._forget(text)
+        return item
+
+    def popitem(self):
+        "Remove and return an item"
+        text, item = dict.popitem(self)
+        self._forget(text)
+        return text, item
+
+    def clear(self):
+        "Remove all the items"
+        dict.clear(self)
+        self._variants = {}
+        self._candidate_indexes = None
+        self._next_suffixes = {}
+
+    def _forget(self, text):
+        "Remove the variants of a key that has been removed"
+        self._candidate_indexes = None
+
+        # the removed key may have been one of the numbered ones
+        self._next_suffixes.clear()
+        del self._variants[text]
+
+    def _set_item(self, text, item):
+        "Add the item and the variants of its text"
+        # the keys are changing so any index is out of date
+        self._candidate_indexes = None
+
         dict.__setitem__(self, text, item)
+        self._variants[text] = _variant_texts(text)
+
+    def _candidates(self, search_text, variant):
+        """Return the set of key positions worth comparing with search_text
+        for the variant - or None if all of them should be compared"""
+
+        # for big dictionaries only look at the keys that could reach
+        # the cutoff (a cached ratio is never above the quick_ratio of
+        # the texts either - so the best matches do not change)
+        if candidate_index_threshold is None or \
+            len(self) < candidate_index_threshold or \
+            not search_text or find_best_control_match_cutoff <= 0:
+            return None
+
+        if self._candidate_indexes is None:
+            self._candidate_indexes = {}
+
+        if variant not in self._candidate_indexes:
+            texts = [self._variants[text][variant] for text in self]
+
+            # variants often have the same texts (e.g. when no key has
+            # any non word characters) - so share the index
+            for index in self._candidate_indexes.values():
+                if index.texts == texts:
+                    break
+            else:
+                index = _CandidateIndex(texts)
+
+            self._candidate_indexes[variant] = index
+
+        return self._candidate_indexes[variant].candidates(
+            search_text, find_best_control_match_cutoff)
+
+    def _scorer_ratios(self, search_text, variant, ratio_offset):
+        """Return the ratios of all the keys for the variant in key order
+        - or None if they are scored one at a time with difflib"""
+        if isinstance(_scorer, similarity.DifflibScorer):
+            return None
+
+        return _batch_ratios(
+            [self._variants[text][variant] for text in self],
+            search_text,
+            ratio_offset)
 
 
     def FindBestMatches(
@@ -382,73 +993,361 @@ class UniqueDict(dict):
 
         ratio_calc.set_seq1(search_text)
 
-        ratios = {}
         best_ratio = 0
         best_texts = []
 
-        ratio_offset = 1
-        if clean:
-            ratio_offset *= .9
+        ratio_offset = _ratio_offset(clean, ignore_case)
 
-        if ignore_case:
-            ratio_offset *= .9
+        variant = _match_variants.index((clean, ignore_case))
 
-        for text_ in self:
+        candidates = None
+        ratios = self._scorer_ratios(search_text, variant, ratio_offset)
+        if ratios is None:
+            candidates = self._candidates(search_text, variant)
 
-            # make a copy of the text as we need the original later
-            text = text_
+        for pos, text_ in enumerate(self):
 
-            if clean:
-                text = _clean_non_chars(text)
+            if candidates is not None and pos not in candidates:
+                continue
 
-            if ignore_case:
-                text = text.lower()
+            if ratios is not None:
+                ratio = ratios[pos]
+            else:
+                ratio = _variant_ratio(
+                    ratio_calc,
+                    self._variants[text_][variant],
+                    search_text,
+                    ratio_offset)
 
-            # check if this item is in the cache - if yes, then retrieve it
-            if (text, search_text) in _cache:
-                ratios[text_] = _cache[(text, search_text)]
+            # if this is the best so far then update best stats
+            if ratio > best_ratio and \
+                ratio >= find_best_control_match_cutoff:
 
-            elif(search_text, text) in _cache:
-                ratios[text_] = _cache[(search_text, text)]
+                best_ratio = ratio
+                best_texts = [text_]
 
-            # not in the cache - calculate it and add it to the cache
-            else:
-                # set up the SequenceMatcher with other text
-                ratio_calc.set_seq2(text)
+            elif ratio == best_ratio:
+                best_texts.append(text_)
 
-                # if a very quick check reveals that this is not going
-                # to match then
-                ratio = ratio_calc.real_quick_ratio() * ratio_offset
+        #best_ratio *= ratio_offset
 
-                if ratio  >=  find_best_control_match_cutoff:
-                    ratio = ratio_calc.quick_ratio() * ratio_offset
+        return best_ratio, best_texts
 
-                    if ratio >= find_best_control_match_cutoff:
-                        ratio = ratio_calc.ratio() * ratio_offset
+    def FindBestVariantMatches(self, search_text):
+        """Return the best matches for search_text over all the variants
 
-                # save the match we got and store it in the cache
-                ratios[text_] = ratio
-                _cache[(text, search_text)] = ratio
+        This gives the same result as calling FindBestMatches() for each
+        combination of clean and ignore_case and keeping the best one
+        (the plain comparison wins ties, then ignore_case, then clean) -
+        but it only goes through the keys once.
+        """
+        return self.FindBestVariantMatchesMany([search_text])[0]
 
-            # try using the levenshtein distance instead
-            #lev_dist = levenshtein_distance(unicode(search_text), unicode(text))
-            #ratio = 1 - lev_dist / 10.0
-            #ratios[text_] = ratio
-            #print "%5s" %("%0.2f"% ratio), search_text, `text`
+    def FindBestVariantMatchesMany(self, search_texts):
+        """Return FindBestVariantMatches() of each of search_texts
 
-            # if this is the best so far then update best stats
-            if ratios[text_] > best_ratio and \
-                ratios[text_] >= find_best_control_match_cutoff:
+        Returns a list of (best_ratio, best_texts) in the order of
+        search_texts. All the search texts are scored in the same pass
+        over the keys.
+        """
 
-                best_ratio = ratios[text_]
-                best_texts = [text_]
+        # the search text, ratio offset, scorer ratios and candidates
+        # of each variant of each search text
+        searches = []
+        ratio_calcs = {}
+        for search_text in search_texts:
+            variant_searches = []
+            for variant, (variant_search_text, ratio_offset, ratios) in \
+                enumerate(self._variant_search(search_text)):
+
+                candidates = None
+                if ratios is None:
+                    candidates = self._candidates(variant_search_text, variant)
+
+                # one SequenceMatcher for each different search text
+                if variant_search_text not in ratio_calcs:
+                    ratio_calc = difflib.SequenceMatcher()
+                    ratio_calc.set_seq1(variant_search_text)
+                    ratio_calcs[variant_search_text] = ratio_calc
+
+                variant_searches.append((
+                    variant_search_text, ratio_offset, ratios, candidates))
+
+            searches.append(variant_searches)
+
+        # [best_ratio, best_texts] for each variant of each search text
+        bests = [[[0, []] for variant in _match_variants]
+            for search_text in search_texts]
+
+        for pos, text_ in enumerate(self):
+            texts = self._variants[text_]
+
+            for variant_searches, variant_bests in zip(searches, bests):
+                for variant, (variant_search_text, ratio_offset, ratios,
+                    candidates) in enumerate(variant_searches):
+
+                    if candidates is not None and pos not in candidates:
+                        continue
+
+                    if ratios is not None:
+                        ratio = ratios[pos]
+                    else:
+                        ratio = _variant_ratio(
+                            ratio_calcs[variant_search_text],
+                            texts[variant],
+                            variant_search_text,
+                            ratio_offset)
+
+                    # if this is the best so far then update best stats
+                    best = variant_bests[variant]
+                    if ratio > best[0] and \
+                        ratio >= find_best_control_match_cutoff:
+
+                        best[0] = ratio
+                        best[1] = [text_]
+
+                    elif ratio == best[0]:
+                        best[1].append(text_)
+
+        results = []
+        for variant_bests in bests:
+            # later variants have to be strictly better to be used
+            best_ratio, best_texts = variant_bests[0]
+            for variant_ratio, variant_texts in variant_bests[1:]:
+                if variant_ratio > best_ratio:
+                    best_ratio = variant_ratio
+                    best_texts = variant_texts
+
+            results.append((best_ratio, best_texts))
+
+        return results
+
+    def _variant_search(self, search_text):
+        """Return the search text, ratio offset and scorer ratios (or None)
+        for each of the _match_variants"""
+        searches = []
+        for variant, (clean, ignore_case) in enumerate(_match_variants):
+            variant_search_text = search_text
+            if ignore_case:
+                variant_search_text = search_text.lower()
 
-            elif ratios[text_] == best_ratio:
-                best_texts.append(text_)
+            ratio_offset = _ratio_offset(clean, ignore_case)
+            searches.append((
+                variant_search_text,
+                ratio_offset,
+                self._scorer_ratios(
+                    variant_search_text, variant, ratio_offset)))
 
-        #best_ratio *= ratio_offset
+        return searches
 
-        return best_ratio, best_texts
+    def FindTopMatches(self, search_text, k):
+        """Return the k keys that match search_text best
+
+        Returns a list of (text, ratio) with the best match first. The
+        ratio of a key is the best ratio of its variants (as used by
+        FindBestVariantMatches) and find_best_control_match_cutoff is
+        not applied. Keys with the same ratio are in key order.
+
+        A variant is only scored as far as is needed to know that it
+        cannot get its key into the top k.
+        """
+        if k <= 0:
+            return []
+
+        searches = self._variant_search(search_text)
+
+        ratio_calcs = {}
+        for variant_search_text, ratio_offset, ratios in searches:
+            if variant_search_text not in ratio_calcs:
+                ratio_calcs[variant_search_text] = difflib.SequenceMatcher()
+                ratio_calcs[variant_search_text].set_seq1(variant_search_text)
+
+        # heap of (ratio, -position, text) - the worst of the top k first
+        top = []
+
+        for pos, text_ in enumerate(self):
+            texts = self._variants[text_]
+
+            # what a key has to beat to get into the top k
+            floor = -1
+            if len(top) >= k:
+                floor = top[0][0]
+
+            best_ratio = None
+            for variant, (variant_search_text, ratio_offset, ratios) in \
+                enumerate(searches):
+
+                if ratios is not None:
+                    ratio = ratios[pos]
+                    if ratio <= floor:
+                        ratio = None
+                else:
+                    ratio = _bounded_ratio(
+                        ratio_calcs[variant_search_text],
+                        texts[variant],
+                        variant_search_text,
+                        ratio_offset,
+                        floor)
+
+                if ratio is not None:
+                    best_ratio = ratio
+                    floor = ratio
+
+            if best_ratio is None:
+                continue
+
+            if len(top) < k:
+                heapq.heappush(top, (best_ratio, -pos, text_))
+            else:
+                heapq.heapreplace(top, (best_ratio, -pos, text_))
+
+        top.sort(reverse = True)
+        return [(text_, ratio) for ratio, neg_pos, text_ in top]
+
+
+#====================================================================
+class NameMapCache(object):
+    """Cache on disk of the names that build_unique_dict gives the
+    controls of dialogs
+
+    Each dialog is stored in its own file in directory under a fingerprint
+    of the class, control ID, texts, rectangle and visibility of each of
+    its controls and whether it has a title and can be a label - so a dialog that has changed gets a new entry rather than
+    the old names. Entries older than max_age seconds are expired and only
+    the newest max_entries are kept.
+    """
+
+    # change this when the names given to controls change
+    version = 2
+
+    def __init__(self, directory, max_age = 7 * 24 * 60 * 60, max_entries = 500):
+        "Use directory to store the entries (it is created if needed)"
+        self.directory = directory
+        self.max_age = max_age
+        self.max_entries = max_entries
+
+        self.hits = 0
+        self.misses = 0
+
+    def fingerprint(self, controls):
+        "Return the fingerprint of the structure of the controls"
+        structure = [self.version, distance_cuttoff]
+        for ctrl in controls:
+            rect = ctrl.Rectangle()
+            class_name = ctrl.FriendlyClassName()
+            text = ctrl.WindowText()
+
+            # only the second text is used for the names - and only when
+            # get_control_names uses it (it can be all the items of a
+            # list so it is not fetched otherwise)
+            second_text = None
+            if not text and ctrl.has_title and class_name != 'TreeView':
+                try:
+                    second_text = ctrl.Texts()[1:2]
+                except Exception:
+                    pass
+
+            structure.append([
+                class_name,
+                ctrl.ControlID(),
+                text,
+                [rect.left, rect.top, rect.right, rect.bottom],
+                bool(ctrl.IsVisible()),
+                bool(ctrl.has_title),
+                bool(ctrl.can_be_label),
+                second_text])
+
+        return hashlib.sha1(
+            json.dumps(structure).encode('utf-8')).hexdigest()
+
+    def _path(self, fingerprint):
+        "Return the file name of the entry for fingerprint"
+        return os.path.join(self.directory, fingerprint + '.json')
+
+    def get(self, fingerprint):
+        """Return the (name, control index) list stored for fingerprint
+        - or None if there is no entry or it has expired"""
+        path = self._path(fingerprint)
+        try:
+            if time.time() - os.path.getmtime(path) > self.max_age:
+                os.remove(path)
+                raise ValueError("expired")
+
+            with open(path, 'rb') as entry:
+                names = json.loads(entry.read().decode('utf-8'))
+
+        except (IOError, OSError, ValueError):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return [(name, index) for name, index in names]
+
+    def set(self, fingerprint, names):
+        "Store the (name, control index) list names for fingerprint"
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+
+        # write to a temporary file first so that a half written entry
+        # is never read
+        path = self._path(fingerprint)
+        temp_path = "%s.%d.tmp" % (path, os.getpid())
+        with open(temp_path, 'wb') as entry:
+            entry.write(json.dumps(names).encode('utf-8'))
+
+        if os.path.exists(path):
+            os.remove(path)
+        os.rename(temp_path, path)
+
+        self.expire()
+
+    def expire(self):
+        "Remove the expired entries and the oldest ones over max_entries"
+        entries = []
+        for file_name in os.listdir(self.directory):
+            if not file_name.endswith('.json'):
+                continue
+
+            path = os.path.join(self.directory, file_name)
+            try:
+                entries.append((os.path.getmtime(path), path))
+            except OSError:
+                pass
+
+        entries.sort(reverse = True)
+        for pos, (modified, path) in enumerate(entries):
+            if pos >= self.max_entries or \
+                time.time() - modified > self.max_age:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def clear(self):
+        "Remove all the entries and reset the counters"
+        if os.path.isdir(self.directory):
+            for file_name in os.listdir(self.directory):
+                if file_name.endswith('.json'):
+                    os.remove(os.path.join(self.directory, file_name))
+
+        self.hits = 0
+        self.misses = 0
+
+
+# the NameMapCache used by build_unique_dict (None means no cache)
+_name_map_cache = None
+
+def set_name_map_cache(cache):
+    """Use cache to store the names of the controls of dialogs on disk
+    and return the previous cache (None switches it off)
+
+    cache is a NameMapCache or the name of the directory for one."""
+    global _name_map_cache
+    previous = _name_map_cache
+    if isinstance(cache, fuzzydict._string_types):
+        cache = NameMapCache(cache)
+    _name_map_cache = cache
+    return previous
 
 
 #====================================================================
@@ -457,14 +1356,54 @@ def build_unique_dict(controls):
 
     Separated out to a different function so that we can get
     the control identifiers for printing.
+
+    If a NameMapCache has been set (see set_name_map_cache()) and it has
+    the names of a dialog with the same structure they are used as they
+    are.
     """
+    fingerprint = None
+    if _name_map_cache is not None:
+        fingerprint = _name_map_cache.fingerprint(controls)
+        names = _name_map_cache.get(fingerprint)
+
+        if names is not None:
+            name_control_map = UniqueDict()
+            try:
+                for name, index in names:
+                    name_control_map._set_item(name, controls[index])
+                return name_control_map
+            except (IndexError, TypeError):
+                # not an entry that could have been stored for these
+                # controls - so find the names again
+                pass
+
+    name_control_map = _build_unique_dict(controls)
+
+    if fingerprint is not None:
+        # the first index of each control (like controls.index())
+        positions = {}
+        for pos, ctrl in enumerate(controls):
+            positions.setdefault(ctrl, pos)
+
+        _name_map_cache.set(
+            fingerprint,
+            [(name, positions[ctrl])
+                for name, ctrl in name_control_map.items()])
+
+    return name_control_map
+
+
+def _build_unique_dict(controls):
+    "Work out the names of all the controls for build_unique_dict"
     name_control_map = UniqueDict()
 
+    # the labels are the same for all the controls
+    label_index = _LabelIndex(controls)
 
     # collect all the possible names for all controls
     # and build a list of them
     for ctrl in controls:
-        ctrl_names = get_control_names(ctrl, controls)
+        ctrl_names = get_control_names(ctrl, controls, label_index)
 
         # for each of the names
         for name in ctrl_names:
@@ -472,6 +1411,174 @@ def build_unique_dict(controls):
     return name_control_map
 
 
+#====================================================================
+class ControlNameMap(object):
+    """The names of a list of controls that is kept up to date as
+    controls are added and removed
+
+    name_control_map is the same as build_unique_dict(controls) but adding
+    or removing a control only finds the names of the controls that are
+    affected by it:
+
+    * the added control itself
+    * the control after it (its name can come from the control before it)
+    * the controls that the added label is at least as close to or that
+      the removed label was the closest label of
+
+    The properties of the controls are assumed not to change while they
+    are in the map - remove and add a control again if it has.
+    """
+
+    def __init__(self, controls = ()):
+        "Find the names of controls"
+        self.controls = list(controls)
+
+        # _label_info() of each control
+        self._label_infos = {}
+
+        # names of each control
+        self._names = {}
+
+        # _LabelIndex.last_closest of each control that looked for a label
+        self._closest = {}
+
+        self._name_control_map = None
+
+        for ctrl in self.controls:
+            self._label_infos[ctrl] = _label_info(ctrl)
+        self._find_names(self.controls)
+
+    def add(self, ctrl, index = None):
+        "Add ctrl before index (or at the end if index is None)"
+        if ctrl in self._names:
+            raise ValueError("%r is already in the map" % (ctrl, ))
+
+        if index is None:
+            index = len(self.controls)
+        index = min(max(index, 0), len(self.controls))
+        self.controls.insert(index, ctrl)
+
+        info = _label_info(ctrl)
+        self._label_infos[ctrl] = info
+
+        affected = [ctrl]
+        if index + 1 < len(self.controls):
+            affected.append(self.controls[index + 1])
+
+        if info is not None:
+            text, text_r, is_static = info
+            for other, (ctrl_r, static_only, label_ctrl, closest) in \
+                self._closest.items():
+
+                if static_only and not is_static:
+                    continue
+
+                distance = _label_distance(text_r, ctrl_r)
+                if distance is not None and distance <= closest:
+                    affected.append(other)
+
+        self._find_names(affected)
+
+    def remove(self, ctrl):
+        "Remove ctrl from the map"
+        index = self.controls.index(ctrl)
+        del self.controls[index]
+
+        del self._label_infos[ctrl]
+        del self._names[ctrl]
+        self._closest.pop(ctrl, None)
+
+        affected = []
+        if index < len(self.controls):
+            affected.append(self.controls[index])
+
+        for other, (ctrl_r, static_only, label_ctrl, closest) in \
+            self._closest.items():
+            if label_ctrl is ctrl:
+                affected.append(other)
+
+        self._find_names(affected)
+
+    def _find_names(self, affected):
+        "Find the names of the affected controls again"
+        if affected:
+            label_index = _LabelIndex(self.controls, self._label_infos)
+
+            for ctrl in affected:
+                label_index.last_closest = None
+                self._names[ctrl] = get_control_names(
+                    ctrl, self.controls, label_index)
+
+                if label_index.last_closest is None:
+                    self._closest.pop(ctrl, None)
+                else:
+                    self._closest[ctrl] = label_index.last_closest
+
+        # the numbered names depend on the order that all the names
+        # are added in - so the map is made again from the known names
+        self._name_control_map = None
+
+    @property
+    def name_control_map(self):
+        "The UniqueDict of name -> control"
+        if self._name_control_map is None:
+            name_control_map = UniqueDict()
+            for ctrl in self.controls:
+                for name in self._names[ctrl]:
+                    name_control_map[name] = ctrl
+            self._name_control_map = name_control_map
+
+        return self._name_control_map
+
+
+#====================================================================
+def find_best_control_matches_many(search_texts, controls):
+    """Return find_best_control_matches() of each of search_texts
+
+    Returns a dictionary of search text -> list of the best matching
+    controls. The names of the controls are only worked out once and
+    all of search_texts are scored in one pass over them. Raises a
+    MatchError for the first of search_texts that has no match.
+    """
+    name_control_map = build_unique_dict(controls)
+
+    if sys.version[0] != '3':
+        search_texts = [unicode(search_text) for search_text in search_texts]
+
+    results = name_control_map.FindBestVariantMatchesMany(search_texts)
+
+    matches = {}
+    for search_text, (best_ratio, best_texts) in zip(search_texts, results):
+        if best_ratio < find_best_control_match_cutoff:
+            raise MatchError(
+                items = name_control_map.keys(),
+                tofind = search_text,
+                suggestions = name_control_map.FindTopMatches(
+                    search_text, match_error_suggestions))
+
+        matches[search_text] = [
+            name_control_map[best_text] for best_text in best_texts]
+
+    return matches
+
+
+#====================================================================
+def find_top_matches(search_text, controls, k = 5):
+    """Return the k names of the controls that match search_text best
+
+    Returns a list of (name, control, ratio) with the best match first -
+    see UniqueDict.FindTopMatches(). Unlike find_best_control_matches()
+    nothing is left out for being below find_best_control_match_cutoff.
+    """
+    name_control_map = build_unique_dict(controls)
+
+    if sys.version[0] != '3':
+        search_text = unicode(search_text)
+
+    return [(name, name_control_map[name], ratio)
+        for name, ratio in name_control_map.FindTopMatches(search_text, k)]
+
+
 #====================================================================
 def find_best_control_matches(search_text, controls):
     """Returns the control that is the the best match to search_text
@@ -503,33 +1610,15 @@ def find_best_control_matches(search_text, controls):
     else:
         search_text = unicode(search_text)
 
-    best_ratio, best_texts = name_control_map.FindBestMatches(search_text)
-
-    best_ratio_ci, best_texts_ci = \
-        name_control_map.FindBestMatches(search_text, ignore_case = True)
-
-    best_ratio_clean, best_texts_clean = \
-        name_control_map.FindBestMatches(search_text, clean = True)
-
-    best_ratio_clean_ci, best_texts_clean_ci = \
-        name_control_map.FindBestMatches(
-            search_text, clean = True, ignore_case = True)
-
-
-    if best_ratio_ci > best_ratio:
-        best_ratio = best_ratio_ci
-        best_texts = best_texts_ci
-
-    if best_ratio_clean > best_ratio:
-        best_ratio = best_ratio_clean
-        best_texts = best_texts_clean
-
-    if best_ratio_clean_ci > best_ratio:
-        best_ratio = best_ratio_clean_ci
-        best_texts = best_texts_clean_ci
+    best_ratio, best_texts = \
+        name_control_map.FindBestVariantMatches(search_text)
 
     if best_ratio < find_best_control_match_cutoff:
-        raise MatchError(items = name_control_map.keys(), tofind = search_text)
+        raise MatchError(
+            items = name_control_map.keys(),
+            tofind = search_text,
+            suggestions = name_control_map.FindTopMatches(
+                search_text, match_error_suggestions))
 
     return [name_control_map[best_text] for best_text in best_texts]
 
@@ -570,3 +1659,710 @@ def find_best_control_matches(search_text, controls):
 #        _get_match_ratios(name_control_map.keys(), search_text)
 #
 #    return match_ratios, best_ratio, best_text,
+
+
+if __name__ == '__main__':
+    import random
+    import shutil
+    import tempfile
+    import unittest
+
+    class _Rect(object):
+        "Stand in for a control rectangle"
+        def __init__(self, left, top, right, bottom):
+            self.left, self.top = left, top
+            self.right, self.bottom = right, bottom
+
+    class _Control(object):
+        "Stand in for a control with the properties used to name it"
+        def __init__(self, class_name, text, rect, visible = True):
+            self.class_name = class_name
+            self.text = text
+            self.rect = rect
+            self.visible = visible
+            self.can_be_label = class_name in ('Static', 'Button', 'GroupBox')
+            self.has_title = class_name not in (
+                'Edit', 'ComboBox', 'UpDown', 'ListView')
+
+        def FriendlyClassName(self):
+            return self.class_name
+
+        def WindowText(self):
+            return self.text
+
+        def IsVisible(self):
+            return self.visible
+
+        def Rectangle(self):
+            return self.rect
+
+        def Texts(self):
+            return [self.text]
+
+        def ControlID(self):
+            return id(self) % 1000
+
+    def _random_control(rand):
+        "Return a control with random properties"
+        left = rand.randint(0, 600)
+        top = rand.randint(0, 400)
+        return _Control(
+            rand.choice(
+                ['Static', 'Edit', 'Button', 'UpDown', 'ComboBox', 'TreeView']),
+            rand.choice(['', '', 'Name', 'Age', 'OK', 'Name2']),
+            _Rect(left, top,
+                left + rand.randint(1, 150), top + rand.randint(1, 30)),
+            rand.random() > .1)
+
+    def _brute_force_non_text_names(ctrl, controls):
+        "GetNonTextControlName measuring the distance to every label"
+        names = []
+
+        ctrl_index = controls.index(ctrl)
+        if ctrl_index != 0:
+            prev_ctrl = controls[ctrl_index-1]
+
+            if prev_ctrl.FriendlyClassName() == "Static" and \
+                prev_ctrl.IsVisible() and prev_ctrl.WindowText() and \
+                IsAboveOrToLeft(ctrl, prev_ctrl):
+
+                names.append(
+                    prev_ctrl.WindowText() +
+                        ctrl.FriendlyClassName())
+
+        text_ctrls = [ctrl_ for ctrl_ in controls
+            if ctrl_.IsVisible() and ctrl_.WindowText() and ctrl_.can_be_label]
+
+        best_name = ''
+        closest = distance_cuttoff
+        for text_ctrl in text_ctrls:
+            text_r = text_ctrl.Rectangle()
+            ctrl_r = ctrl.Rectangle()
+
+            if text_r.left >= ctrl_r.right:
+                continue
+
+            if text_r.top >= ctrl_r.bottom:
+                continue
+
+            distance = abs(text_r.left - ctrl_r.left) + \
+                abs(text_r.bottom - ctrl_r.top)
+            distance2 = abs(text_r.right - ctrl_r.left) + \
+                abs(text_r.top - ctrl_r.top)
+            distance = min(distance, distance2)
+
+            if ctrl.FriendlyClassName() == "UpDown":
+                if text_ctrl.FriendlyClassName() == "Static":
+                    if distance < closest:
+                        closest = distance
+                        best_name = \
+                            text_ctrl.WindowText() + ctrl.FriendlyClassName()
+
+            elif distance < closest:
+                closest = distance
+                best_name = text_ctrl.WindowText() + ctrl.FriendlyClassName()
+
+        names.append(best_name)
+        return names
+
+    class LabelIndexTestCase(unittest.TestCase):
+        "Compare the label grid with measuring the distance to every label"
+
+        def layout(self, rand):
+            """Return controls on a coarse grid (so that labels are often
+            the same distance away) around the origin"""
+            controls = []
+            for i in range(rand.randint(1, 40)):
+                left = rand.randint(-30, 30) * 10
+                top = rand.randint(-20, 20) * 10
+                controls.append(_Control(
+                    rand.choice(['Static', 'Static', 'Button', 'GroupBox',
+                        'Edit', 'UpDown', 'ComboBox']),
+                    rand.choice(['', 'Name', 'Age', 'OK', 'Name:']),
+                    _Rect(left, top,
+                        left + rand.randint(1, 10) * 10,
+                        top + rand.randint(1, 3) * 10),
+                    rand.random() > .1))
+            return controls
+
+        def brute_force_names(self, controls):
+            "Return build_unique_dict(controls) without the label grid"
+            global GetNonTextControlName
+            get_non_text_control_name = GetNonTextControlName
+            GetNonTextControlName = \
+                lambda ctrl, controls, label_index = None: \
+                    _brute_force_non_text_names(ctrl, controls)
+            try:
+                return _build_unique_dict(controls)
+            finally:
+                GetNonTextControlName = get_non_text_control_name
+
+        def testRandomLayouts(self):
+            "The grid finds the same labels for random layouts"
+            rand = random.Random(0)
+            for run in range(200):
+                controls = self.layout(rand)
+                label_index = _LabelIndex(controls)
+                for ctrl in controls:
+                    expected = _brute_force_non_text_names(ctrl, controls)
+                    self.assertEqual(
+                        GetNonTextControlName(ctrl, controls), expected)
+                    self.assertEqual(
+                        GetNonTextControlName(ctrl, controls, label_index),
+                        expected)
+
+                self.assertEqual(
+                    dict(build_unique_dict(controls)),
+                    dict(self.brute_force_names(controls)))
+
+        def testEqualDistances(self):
+            "The first label wins when labels are the same distance away"
+            edit = _Control('Edit', '', _Rect(-100, -100, 0, -80))
+            up_down = _Control('UpDown', '', _Rect(-100, -100, -90, -80))
+            above = _Control('Static', 'Above', _Rect(-100, -130, -50, -110))
+            controls = [
+                edit,
+                up_down,
+                above,
+                _Control('Button', 'Left', _Rect(-170, -100, -110, -80)),
+                _Control('Static', 'Last', _Rect(-160, -90, -110, -70)),
+            ]
+            for ctrl in (edit, up_down):
+                self.assertEqual(
+                    GetNonTextControlName(ctrl, controls),
+                    _brute_force_non_text_names(ctrl, controls))
+
+            self.assertEqual(
+                GetNonTextControlName(edit, controls), ['AboveEdit'])
+
+            # the button is as close - but UpDown controls only use Statics
+            above.visible = False
+            self.assertEqual(
+                GetNonTextControlName(edit, controls), ['LeftEdit'])
+            self.assertEqual(
+                GetNonTextControlName(up_down, controls), ['LastUpDown'])
+
+    class ControlNameMapTestCase(unittest.TestCase):
+        "Compare ControlNameMap with build_unique_dict"
+
+        def assertSameNames(self, name_map):
+            self.assertEqual(
+                dict(name_map.name_control_map),
+                dict(build_unique_dict(name_map.controls)))
+
+        def testRandomAddRemove(self):
+            "Add and remove random controls and compare every change"
+            rand = random.Random(0)
+            for run in range(40):
+                name_map = ControlNameMap(
+                    [_random_control(rand) for i in range(rand.randint(0, 20))])
+                self.assertSameNames(name_map)
+
+                for change in range(30):
+                    if name_map.controls and rand.random() < .4:
+                        name_map.remove(rand.choice(name_map.controls))
+                    else:
+                        name_map.add(
+                            _random_control(rand),
+                            rand.randint(0, len(name_map.controls)))
+                    self.assertSameNames(name_map)
+
+        def testAddExisting(self):
+            "Adding a control that is already in the map fails"
+            ctrl = _Control('Edit', '', _Rect(0, 0, 10, 10))
+            name_map = ControlNameMap([ctrl])
+            self.assertRaises(ValueError, name_map.add, ctrl)
+
+    class RatioCacheTestCase(unittest.TestCase):
+        "Test the least recently used cache of the match ratios"
+
+        def testEvictionOrder(self):
+            "The least recently used ratios are dropped first"
+            cache = RatioCache(maxsize = 3)
+            for key in 'abc':
+                cache.set(key, ord(key))
+
+            # 'a' is now used more recently than 'b'
+            self.assertEqual(cache.get('a'), ord('a'))
+            cache.set('d', ord('d'))
+            self.assertFalse('b' in cache)
+            self.assertEqual(sorted(cache._ratios), ['a', 'c', 'd'])
+
+            # setting a ratio again also makes it the most recently used
+            cache.set('c', 0)
+            cache.set('e', ord('e'))
+            cache.set('f', ord('f'))
+            self.assertEqual(list(cache._ratios), ['c', 'e', 'f'])
+            self.assertEqual(len(cache), 3)
+
+            unlimited = RatioCache(maxsize = None)
+            for key in range(1000):
+                unlimited.set(key, key)
+            self.assertEqual(len(unlimited), 1000)
+            self.assertEqual(unlimited.evictions, 0)
+
+        def testCounters(self):
+            "The hits, misses and evictions are counted until clear()"
+            cache = RatioCache(maxsize = 2)
+            self.assertEqual(cache.get('a'), None)
+            cache.set('a', .5)
+            cache.set('b', 0)
+            self.assertEqual(cache.get('a'), .5)
+            self.assertEqual(cache.get('b'), 0)
+            cache.set('c', 1)
+            cache.set('d', 1)
+            self.assertEqual(cache.get('a'), None)
+
+            self.assertEqual(cache.stats(), {
+                'size' : 2, 'maxsize' : 2,
+                'hits' : 2, 'misses' : 2, 'evictions' : 2})
+
+            cache.clear()
+            self.assertEqual(cache.stats(), {
+                'size' : 0, 'maxsize' : 2,
+                'hits' : 0, 'misses' : 0, 'evictions' : 0})
+
+        def testThreads(self):
+            "The cache stays in its bounds when used from several threads"
+            cache = RatioCache(maxsize = 50)
+
+            def use(thread):
+                for key in range(500):
+                    cache.set((thread, key), key)
+                    cache.get((thread, key // 2))
+                    (thread, key) in cache
+                    self.assertTrue(len(cache) <= 50)
+
+            threads = [threading.Thread(target = use, args = (thread, ))
+                for thread in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            stats = cache.stats()
+            self.assertEqual(stats['size'], 50)
+            self.assertEqual(stats['evictions'], 4 * 500 - 50)
+            self.assertEqual(stats['hits'] + stats['misses'], 4 * 500)
+
+        def testSetScorer(self):
+            "Changing the scorer drops the ratios of the previous one"
+            cache = RatioCache()
+            previous_cache = set_ratio_cache(cache)
+            try:
+                unique_dict = UniqueDict({'Save' : 1, 'Cancel' : 2})
+                unique_dict.FindBestMatches('Sav')
+                self.assertTrue(len(cache) > 0)
+
+                previous_scorer = set_scorer('jarowinkler')
+                try:
+                    self.assertEqual(cache.stats(), {
+                        'size' : 0, 'maxsize' : cache.maxsize,
+                        'hits' : 0, 'misses' : 0, 'evictions' : 0})
+
+                    unique_dict.FindBestMatches('Sav')
+                    self.assertEqual(cache.misses, len(unique_dict))
+                finally:
+                    set_scorer(previous_scorer)
+                self.assertEqual(len(cache), 0)
+            finally:
+                set_ratio_cache(previous_cache)
+
+    class UniqueDictTestCase(unittest.TestCase):
+        "Test making the keys of a UniqueDict unique"
+
+        def testNumbering(self):
+            "Duplicated texts are numbered 0, 1, 2, ..."
+            unique_dict = UniqueDict()
+            unique_dict['Edit5'] = 'other'
+            for item in range(5):
+                unique_dict['Edit'] = item
+
+            self.assertEqual(unique_dict, {
+                'Edit' : 0, 'Edit0' : 0, 'Edit1' : 0, 'Edit2' : 1,
+                'Edit3' : 2, 'Edit4' : 3, 'Edit5' : 'other', 'Edit6' : 4})
+
+        def testDictMethods(self):
+            "The variants are kept for the keys changed by any dict method"
+            unique_dict = UniqueDict({'OK' : 1})
+            unique_dict.update({'Cancel' : 2}, Help = 3)
+            unique_dict.update([('OK', 4)])
+            self.assertEqual(unique_dict.setdefault('Apply', 5), 5)
+            self.assertEqual(unique_dict.setdefault('Apply', 6), 5)
+            self.assertEqual(unique_dict.pop('Help'), 3)
+            self.assertEqual(unique_dict.pop('Help', None), None)
+            self.assertRaises(KeyError, unique_dict.pop, 'Help')
+            text, item = unique_dict.popitem()
+            self.assertTrue(text not in unique_dict)
+            self.assertEqual(sorted(unique_dict._variants), sorted(unique_dict))
+            for text in unique_dict:
+                self.assertEqual(unique_dict._variants[text], _variant_texts(text))
+
+            unique_dict.clear()
+            self.assertEqual(unique_dict._variants, {})
+            unique_dict['OK'] = 7
+            self.assertEqual(unique_dict.FindBestMatches('OK'), (1.0, ['OK']))
+
+        def testRandomTexts(self):
+            "Give the same keys as looking for a free number from 2 each time"
+            rand = random.Random(0)
+            for run in range(50):
+                unique_dict = UniqueDict()
+                expected = {}
+                for item in range(rand.randint(0, 100)):
+                    text = rand.choice(['Edit', 'Edit2', 'Edit3', 'Edit22'])
+
+                    if rand.random() < .1 and expected:
+                        text = rand.choice(sorted(expected))
+                        del unique_dict[text]
+                        del expected[text]
+                        continue
+
+                    unique_dict[text] = item
+
+                    if text in expected:
+                        unique_text = text
+                        counter = 2
+                        while unique_text in expected:
+                            unique_text = text + str(counter)
+                            counter += 1
+
+                        if text + '0' not in expected:
+                            expected[text + '0'] = expected[text]
+                            expected[text + '1'] = expected[text]
+                        text = unique_text
+
+                    expected[text] = item
+
+                    self.assertEqual(unique_dict, expected)
+
+    class VariantMatchesTestCase(unittest.TestCase):
+        "Compare FindBestVariantMatches with a FindBestMatches per variant"
+
+        def four_calls(self, unique_dict, search_text):
+            "Keep the best of FindBestMatches for each variant"
+            best_ratio, best_texts = unique_dict.FindBestMatches(search_text)
+
+            for clean, ignore_case in _match_variants[1:]:
+                ratio, texts = unique_dict.FindBestMatches(
+                    search_text, clean, ignore_case)
+                if ratio > best_ratio:
+                    best_ratio = ratio
+                    best_texts = texts
+
+            return best_ratio, best_texts
+
+        def testRandomKeys(self):
+            "Give the same best matches as the four separate calls"
+            rand = random.Random(0)
+            words = ['Save', 'SAVE', 'sa-ve', 'OK', 'ok', 'Cancel', 'Name:',
+                'Edit', '&Row']
+            for run in range(40):
+                unique_dict = UniqueDict()
+                for i in range(rand.choice([rand.randint(0, 30), 120])):
+                    unique_dict[''.join(rand.sample(words, 2))] = i
+
+                search_texts = [''.join(rand.sample(words, 2))
+                    for i in range(10)] + ['', 'Save', 'save', 'Save']
+
+                expected = [self.four_calls(unique_dict, search_text)
+                    for search_text in search_texts]
+                for search_text, best in zip(search_texts, expected):
+                    self.assertEqual(
+                        unique_dict.FindBestVariantMatches(search_text), best)
+                self.assertEqual(
+                    unique_dict.FindBestVariantMatchesMany(search_texts),
+                    expected)
+
+        def testTiedVariants(self):
+            "The earlier variant wins when two variants tie"
+            unique_dict = UniqueDict({'SAVE' : 1, 'Sa-ve' : 2})
+
+            # ignore_case finds 'SAVE' and clean finds 'Sa-ve' - both .9
+            self.assertEqual(
+                unique_dict.FindBestMatches('Save', ignore_case = True),
+                (.9, ['SAVE']))
+            self.assertEqual(
+                unique_dict.FindBestMatches('Save', clean = True),
+                (.9, ['Sa-ve']))
+
+            for best in (
+                self.four_calls(unique_dict, 'Save'),
+                unique_dict.FindBestVariantMatches('Save'),
+                unique_dict.FindBestVariantMatchesMany(['Save'])[0]):
+                self.assertEqual(best, (.9, ['SAVE']))
+
+            # the plain comparison wins a tie with ignore_case
+            unique_dict = UniqueDict({'ABCDEFGHIJ' : 1, 'abcdefghix' : 2})
+            self.assertEqual(
+                unique_dict.FindBestMatches('abcdefghij', ignore_case = True),
+                (.9, ['ABCDEFGHIJ']))
+            for best in (
+                self.four_calls(unique_dict, 'abcdefghij'),
+                unique_dict.FindBestVariantMatches('abcdefghij')):
+                self.assertEqual(best, (.9, ['abcdefghix']))
+
+    class CandidateIndexTestCase(unittest.TestCase):
+        "Compare the candidate index with going through all the keys"
+
+        def unique_dict(self, rand):
+            "Return a UniqueDict with random keys and keys near the cutoff"
+            unique_dict = UniqueDict()
+            for i in range(150):
+                unique_dict[''.join(
+                    rand.choice('abcdeABC -&') for c in range(
+                        rand.randint(1, 8)))] = i
+
+            # a ratio of exactly the cutoff, all the characters in common
+            # but a low ratio, a quick_ratio just under the cutoff and
+            # texts that tie
+            for text in ('abcxy', 'edcba', 'abxyz', 'ABCDE', 'a-bcde',
+                'abcde', 'qzz', 'zzq'):
+                unique_dict[text] = text
+            return unique_dict
+
+        def matches(self, unique_dict, threshold, search_text):
+            "Return all the best matches with the candidate_index_threshold"
+            global candidate_index_threshold
+            old_threshold = candidate_index_threshold
+            candidate_index_threshold = threshold
+            try:
+                return [unique_dict.FindBestMatches(search_text, *variant)
+                    for variant in _match_variants] + \
+                    [unique_dict.FindBestVariantMatches(search_text)]
+            finally:
+                candidate_index_threshold = old_threshold
+
+        def testSameMatches(self):
+            "The index gives the same best matches as all the keys"
+            rand = random.Random(0)
+            for run in range(10):
+                unique_dict = self.unique_dict(rand)
+                self.assertTrue(len(unique_dict) > candidate_index_threshold)
+
+                search_texts = ['abcde', 'zz', 'ABC', 'a', 'xyz', 'e d c'] + [
+                    ''.join(rand.choice('abcdeABC -&') for c in range(
+                        rand.randint(1, 8))) for i in range(20)]
+                for search_text in search_texts:
+                    linear = self.matches(unique_dict, None, search_text)
+                    self.assertEqual(unique_dict._candidate_indexes, None)
+                    indexed = self.matches(unique_dict, 100, search_text)
+                    self.assertEqual(
+                        sorted(unique_dict._candidate_indexes),
+                        list(range(len(_match_variants))))
+                    self.assertEqual(indexed, linear)
+
+                    # a change to the keys drops the indexes
+                    unique_dict['zz'] = run
+                    self.assertEqual(unique_dict._candidate_indexes, None)
+
+        def testNearCutoff(self):
+            "Texts at the cutoff are found - and ties are all kept"
+            unique_dict = self.unique_dict(random.Random(1))
+            for search_text, ratio, texts in (
+                ('abcxz', .8, ['abcxy', 'abxyz']),
+                ('zz', .8, ['qzz', 'zzq'])):
+                best_ratio, best_texts = self.matches(
+                    unique_dict, 100, search_text)[0]
+                self.assertEqual(
+                    (best_ratio, sorted(best_texts)), (ratio, texts))
+
+            unique_dict = UniqueDict(
+                ('text%d' % i, i) for i in range(100))
+            unique_dict['abcxy'] = 'cutoff'
+            for threshold in (None, 100):
+                self.assertEqual(
+                    self.matches(unique_dict, threshold, 'abcde')[0],
+                    (.6, ['abcxy']))
+
+    class NameMapCacheTestCase(unittest.TestCase):
+        "Test storing the names of controls on disk"
+
+        def setUp(self):
+            self.directory = tempfile.mkdtemp()
+            self.cache = NameMapCache(self.directory)
+            self.previous = set_name_map_cache(self.cache)
+
+        def tearDown(self):
+            set_name_map_cache(self.previous)
+            shutil.rmtree(self.directory)
+
+        def controls(self):
+            "Return the same 40 controls each time"
+            rand = random.Random(0)
+            controls = [_random_control(rand) for i in range(40)]
+            for pos, ctrl in enumerate(controls):
+                ctrl.ControlID = lambda pos = pos: pos
+            return controls
+
+        def testHit(self):
+            "The stored names are used for a dialog with the same structure"
+            names = dict(build_unique_dict(self.controls()))
+
+            controls = self.controls()
+            global get_control_names
+            find_names = get_control_names
+            get_control_names = None
+            try:
+                name_control_map = build_unique_dict(controls)
+            finally:
+                get_control_names = find_names
+
+            self.assertEqual(self.cache.hits, 1)
+            self.assertEqual(
+                dict(name_control_map), dict(_build_unique_dict(controls)))
+            self.assertEqual(len(name_control_map), len(names))
+
+        def testChanged(self):
+            "A dialog that has changed does not use the old names"
+            build_unique_dict(self.controls())
+
+            controls = self.controls()
+            controls[3].text = 'Changed'
+            self.assertEqual(
+                dict(build_unique_dict(controls)),
+                dict(_build_unique_dict(controls)))
+            self.assertEqual(self.cache.hits, 0)
+
+            # or the second text or what the names are made from
+            controls = self.controls()
+            texts_pos = [pos for pos, ctrl in enumerate(controls)
+                if not ctrl.text and ctrl.has_title and
+                    ctrl.class_name != 'TreeView'][0]
+            controls[texts_pos].Texts = lambda: ['', 'Changed']
+            controls[7].can_be_label = not controls[7].can_be_label
+            controls[9].has_title = not controls[9].has_title
+            fingerprint = self.cache.fingerprint(self.controls())
+            for pos in (texts_pos, 7, 9):
+                changed = self.controls()
+                changed[pos] = controls[pos]
+                self.assertNotEqual(
+                    self.cache.fingerprint(changed), fingerprint)
+
+        def testTextsOnlyWhenUsed(self):
+            "Texts() is only fetched for the controls it names"
+            def no_texts():
+                raise AssertionError("Texts() fetched")
+
+            controls = self.controls()
+            for ctrl in controls:
+                if ctrl.text or not ctrl.has_title or \
+                    ctrl.class_name == 'TreeView':
+                    ctrl.Texts = no_texts
+                else:
+                    ctrl.Texts = lambda: ['', 'Item']
+            fingerprint = self.cache.fingerprint(controls)
+
+            # and only the second text is used
+            for ctrl in controls:
+                if ctrl.Texts is not no_texts:
+                    ctrl.Texts = lambda: ['', 'Item', 'Other', 'Items']
+            self.assertEqual(self.cache.fingerprint(controls), fingerprint)
+
+        def testExpired(self):
+            "Old entries are not used and the oldest are removed"
+            build_unique_dict(self.controls())
+            self.cache.max_age = -1
+            build_unique_dict(self.controls())
+            self.assertEqual(self.cache.hits, 0)
+
+            self.cache.max_entries = 1
+            self.cache.max_age = 60
+            build_unique_dict(self.controls()[1:])
+            build_unique_dict(self.controls()[2:])
+            self.assertEqual(len(os.listdir(self.directory)), 1)
+
+    class FindManyTestCase(unittest.TestCase):
+        "Compare finding many search texts at once with one at a time"
+
+        def testRandomControls(self):
+            "find_best_control_matches_many gives the same controls"
+            rand = random.Random(0)
+            for run in range(20):
+                controls = [_random_control(rand) for i in range(30)]
+                names = list(build_unique_dict(controls).keys())
+                search_texts = rand.sample(names, 5) + ['Name', 'ok', 'Edit']
+
+                expected = {}
+                for search_text in search_texts:
+                    try:
+                        expected[search_text] = find_best_control_matches(
+                            search_text, controls)
+                    except MatchError:
+                        pass
+
+                if len(expected) == len(set(search_texts)):
+                    self.assertEqual(
+                        find_best_control_matches_many(
+                            search_texts, controls),
+                        expected)
+                else:
+                    self.assertRaises(
+                        MatchError,
+                        find_best_control_matches_many,
+                        search_texts, controls)
+
+    class FindTopMatchesTestCase(unittest.TestCase):
+        "Compare FindTopMatches with scoring every key in full"
+
+        def ranked(self, unique_dict, search_text):
+            "Return (text, ratio) of all the keys - best first"
+            ranked = []
+            for pos, text in enumerate(unique_dict):
+                ratios = []
+                for variant, (clean, ignore_case) in \
+                    enumerate(_match_variants):
+                    variant_search_text = search_text
+                    if ignore_case:
+                        variant_search_text = search_text.lower()
+                    ratios.append(difflib.SequenceMatcher(
+                        None,
+                        variant_search_text,
+                        _variant_texts(text)[variant]).ratio() *
+                        _ratio_offset(clean, ignore_case))
+                ranked.append((-max(ratios), pos, text))
+            ranked.sort()
+            return [(text, -ratio) for ratio, pos, text in ranked]
+
+        def testRandomKeys(self):
+            "The top k are the first k of all the keys ranked"
+            rand = random.Random(0)
+            words = ['Save', 'save', 'OK', 'Cancel', 'Name:', 'Edit', 'Row']
+            for run in range(30):
+                unique_dict = UniqueDict()
+                for i in range(rand.randint(0, 60)):
+                    unique_dict[''.join(rand.sample(words, 2))] = i
+
+                search_text = ''.join(rand.sample(words, rand.randint(1, 2)))
+                ranked = self.ranked(unique_dict, search_text)
+
+                # leaves the bounds of some of the ratios in the cache
+                if run % 2:
+                    unique_dict.FindBestVariantMatches(search_text)
+
+                for k in (1, 3, 10):
+                    self.assertEqual(
+                        unique_dict.FindTopMatches(search_text, k),
+                        ranked[:k])
+
+        def testMatchErrorSuggestions(self):
+            "A MatchError lists the closest matches"
+            controls = [
+                _Control('Button', 'Save', _Rect(0, 0, 50, 20)),
+                _Control('Button', 'Cancel', _Rect(60, 0, 110, 20))]
+            try:
+                find_best_control_matches('Sav', controls[1:])
+            except MatchError as error:
+                self.assertEqual(
+                    [text for text, ratio in error.suggestions],
+                    [name for name, ctrl, ratio in
+                        find_top_matches('Sav', controls[1:],
+                            match_error_suggestions)])
+            else:
+                self.fail("MatchError was not raised")
+
+            self.assertEqual(
+                find_top_matches('Save', controls, 1),
+                [('Save', controls[0], 1.0)])
+
+    unittest.main()
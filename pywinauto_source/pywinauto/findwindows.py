@@ -124,10 +124,8 @@ def find_windows(class_name = None,
         # find the top level windows
         windows = enum_windows()
 
-        # if we have been given a parent
-        if parent:
-            windows = [win for win in windows
-                if handleprops.parent(win) == parent]
+        # if we have been given a parent it is the first filter
+        # (see _plan_filters)
 
     # looking for child windows
     else:
@@ -143,10 +141,6 @@ def find_windows(class_name = None,
         if ctrl_index is not None:
             return [windows[ctrl_index]]
 
-    if control_id is not None and windows:
-        windows = [win for win in windows if
-            handleprops.controlid(win) == control_id]
-
     if active_only:
         gui_info = win32structures.GUITHREADINFO()
         gui_info.cbSize = ctypes.sizeof(gui_info)
@@ -162,33 +156,26 @@ def find_windows(class_name = None,
         else:
             windows = []
 
-    if class_name is not None and windows:
-        windows = [win for win in windows
-            if class_name == handleprops.classname(win)]
-
-    if class_name_re is not None and windows:
-        class_name_regex = re.compile(class_name_re)
-        windows = [win for win in windows
-            if class_name_regex.match(handleprops.classname(win))]
-
-    if process is not None and windows:
-        windows = [win for win in windows
-            if handleprops.processid(win) == process]
-
-    if title is not None and windows:
-        windows = [win for win in windows
-            if title == handleprops.text(win)]
-
-    elif title_re is not None and windows:
-        title_regex = re.compile(title_re)
-        windows = [win for win in windows
-            if title_regex.match(handleprops.text(win))]
-
-    if visible_only and windows:
-        windows = [win for win in windows if handleprops.isvisible(win)]
-
-    if enabled_only and windows:
-        windows = [win for win in windows if handleprops.isenabled(win)]
+    # check all the properties of each window in one pass - the cheap
+    # ones first and each one fetched only once
+    filters = _plan_filters(
+        parent = top_level_only and parent or None,
+        control_id = control_id,
+        process = process,
+        class_name = class_name,
+        class_name_re = class_name_re,
+        visible_only = visible_only,
+        enabled_only = enabled_only,
+        title = title,
+        title_re = title_re)
+
+    if filters and windows:
+        windows = [win for win in windows if _passes_filters(win, filters)]
+
+    # the predicate is run before best_match as finding the best match
+    # fetches all the properties that are used to name each window
+    if predicate_func is not None and windows:
+        windows = [win for win in windows if predicate_func(win)]
 
     if best_match is not None and windows:
         wrapped_wins = []
@@ -206,11 +193,129 @@ def find_windows(class_name = None,
         # convert window back to handle
         windows = [win.handle for win in windows]
 
-    if predicate_func is not None and windows:
-        windows = [win for win in windows if predicate_func(win)]
-
     return windows
 
+#=========================================================================
+# the compiled regular expressions of class_name_re and title_re
+_regex_cache = {}
+
+def _compile(pattern):
+    "Return the compiled regular expression of pattern"
+    try:
+        return _regex_cache[pattern]
+    except KeyError:
+        # a script uses only a few - but don't keep any number of them
+        if len(_regex_cache) >= 100:
+            _regex_cache.clear()
+
+        regex = _regex_cache[pattern] = re.compile(pattern)
+        return regex
+
+def _plan_filters(
+    parent = None,
+    control_id = None,
+    process = None,
+    class_name = None,
+    class_name_re = None,
+    visible_only = False,
+    enabled_only = False,
+    title = None,
+    title_re = None):
+    """Return the filters of find_windows as a list of (fetch, test)
+
+    fetch is the handleprops function that gets the property of a window
+    and test checks the value of the property. They are in order of cost
+    so that the cheap checks (calls in this process) rule out windows
+    before the text is fetched (a message to the process of the window).
+    """
+    filters = []
+
+    if parent:
+        filters.append((handleprops.parent, lambda value: value == parent))
+
+    if control_id is not None:
+        filters.append(
+            (handleprops.controlid, lambda value: value == control_id))
+
+    if process is not None:
+        filters.append((handleprops.processid, lambda value: value == process))
+
+    if class_name is not None:
+        filters.append(
+            (handleprops.classname, lambda value: value == class_name))
+
+    if class_name_re is not None:
+        class_name_regex = _compile(class_name_re)
+        filters.append((handleprops.classname,
+            lambda value: class_name_regex.match(value) is not None))
+
+    if visible_only:
+        filters.append((handleprops.isvisible, bool))
+
+    if enabled_only:
+        filters.append((handleprops.isenabled, bool))
+
+    if title is not None:
+        filters.append((handleprops.text, lambda value: value == title))
+
+    elif title_re is not None:
+        title_regex = _compile(title_re)
+        filters.append((handleprops.text,
+            lambda value: title_regex.match(value) is not None))
+
+    return filters
+
+def _passes_filters(handle, filters):
+    """Return True if the window passes all the filters
+
+    Each property is fetched at most once (class_name and class_name_re
+    both check the class)."""
+    fetched = {}
+    for fetch, test in filters:
+        try:
+            value = fetched[fetch]
+        except KeyError:
+            value = fetched[fetch] = fetch(handle)
+
+        if not test(value):
+            return False
+
+    return True
+
+#=========================================================================
+def find_best_windows(best_matches, **kwargs):
+    """Find the windows with titles similar to each of best_matches
+
+    Takes the same arguments as find_windows (other than best_match) and
+    returns a dictionary of each of best_matches -> list of handles. The
+    windows are only found and named once for all of best_matches.
+
+    Raises WindowNotFoundError if no windows match the other criteria
+    and findbestmatch.MatchError if one of best_matches does not match.
+    """
+    windows = find_windows(**kwargs)
+    if not windows:
+        raise WindowNotFoundError()
+
+    wrapped_wins = []
+    for win in windows:
+        try:
+            wrapped_wins.append(controls.WrapHandle(win))
+        except controls.InvalidWindowHandle:
+            # skip invalid handles - they have dissapeared
+            # since the list of windows was retrieved
+            pass
+
+    matches = findbestmatch.find_best_control_matches_many(
+        best_matches, wrapped_wins)
+
+    found = {}
+    for best_match in best_matches:
+        # convert window back to handle
+        found[best_match] = [win.handle for win in matches[best_match]]
+
+    return found
+
 #=========================================================================
 def enum_windows():
     "Return a list of handles of all the top level windows"
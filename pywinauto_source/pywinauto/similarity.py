@@ -0,0 +1,413 @@
+# GUI Application automation and testing library
+# Copyright (C) 2006 Mark Mc Mahon
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public License
+# as published by the Free Software Foundation; either version 2.1
+# of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the
+#    Free Software Foundation, Inc.,
+#    59 Temple Place,
+#    Suite 330,
+#    Boston, MA 02111-1307 USA
+
+"""Scorers for how similar two strings are
+
+A scorer returns the similarity of two texts as a ratio between 0 (nothing
+in common) and 1 (the same text). Every scorer has the methods
+
+* **ratio(search_text, text)** the ratio for one text
+* **ratios(search_text, texts)** a list of the ratios for each of texts -
+  scorers that can compare one text against many texts at once do it here
+
+The available scorers are
+
+* **DifflibScorer** the ratio of difflib.SequenceMatcher (the default)
+* **LevenshteinScorer** 1 - edit distance / length of the longer text, the
+  distances for all the texts are calculated together with numpy
+* **JaroWinklerScorer** the Jaro-Winkler similarity
+
+>>> scorer = get_scorer('levenshtein')
+>>> scorer.ratios('OKButton', ['OK', 'OKButton', 'CancelButton'])
+[0.25, 1.0, 0.5]
+"""
+from __future__ import unicode_literals
+from __future__ import division
+
+__revision__ = "$Revision$"
+
+import difflib
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+#====================================================================
+class DifflibScorer(object):
+    "Scores texts with difflib.SequenceMatcher"
+
+    name = 'difflib'
+
+    def ratio(self, search_text, text):
+        "Return the ratio of text against search_text"
+        return difflib.SequenceMatcher(None, search_text, text).ratio()
+
+    def ratios(self, search_text, texts):
+        "Return the ratio of each of texts against search_text"
+        ratio_calc = difflib.SequenceMatcher()
+        ratio_calc.set_seq1(search_text)
+
+        ratios = []
+        for text in texts:
+            ratio_calc.set_seq2(text)
+            ratios.append(ratio_calc.ratio())
+        return ratios
+
+
+#====================================================================
+class LevenshteinScorer(object):
+    """Scores texts by their edit (Levenshtein) distance
+
+    The ratio is 1 - distance / length of the longer text. ratios()
+    calculates the distances of all the texts with the same length in one
+    go, so it needs numpy.
+    """
+
+    name = 'levenshtein'
+
+    def __init__(self):
+        "Check that numpy is available"
+        if numpy is None:
+            raise ImportError(
+                "The levenshtein scorer needs numpy - please install it")
+
+    def ratio(self, search_text, text):
+        "Return the ratio of text against search_text"
+        return self.ratios(search_text, [text])[0]
+
+    def ratios(self, search_text, texts):
+        "Return the ratio of each of texts against search_text"
+        ratios = [0.0] * len(texts)
+
+        # texts with the same length can be stacked into one array
+        positions_by_length = {}
+        for pos, text in enumerate(texts):
+            positions_by_length.setdefault(len(text), []).append(pos)
+
+        search_codes = _char_codes(search_text)
+        for length, positions in positions_by_length.items():
+
+            # the distance to an empty text is the length of the other text
+            if not length or not search_text:
+                ratio = 0.0
+                if length == len(search_text):
+                    ratio = 1.0
+                for pos in positions:
+                    ratios[pos] = ratio
+                continue
+
+            text_codes = _char_codes(
+                "".join([texts[pos] for pos in positions])).reshape(
+                    len(positions), length)
+
+            distances = _edit_distances(search_codes, text_codes)
+
+            longest = max(length, len(search_text))
+            for pos, distance in zip(positions, distances.tolist()):
+                ratios[pos] = 1 - distance / longest
+
+        return ratios
+
+
+def _char_codes(text):
+    "Return an array of the code points of the characters in text"
+    return numpy.frombuffer(text.encode('utf-32-le'), dtype = numpy.uint32)
+
+
+def _edit_distances(search_codes, text_codes):
+    """Return the edit distances between search_codes and each row
+    of text_codes
+
+    The rows of the usual dynamic programming table are calculated for
+    all the texts at once. Insertions make each cell depend on the cell
+    to its left, which is a running minimum of (cell - column) along
+    the row."""
+    count, length = text_codes.shape
+    columns = numpy.arange(length + 1)
+
+    # distances from the empty prefix of search_text
+    row = numpy.tile(columns, (count, 1))
+    for i, code in enumerate(search_codes):
+        cells = numpy.empty_like(row)
+        cells[:, 0] = i + 1
+
+        # substitutions (or matches) and deletions
+        cells[:, 1:] = numpy.minimum(
+            row[:, :-1] + (text_codes != code),
+            row[:, 1:] + 1)
+
+        # insertions
+        row = numpy.minimum.accumulate(cells - columns, axis = 1) + columns
+
+    return row[:, length]
+
+
+#====================================================================
+class JaroWinklerScorer(object):
+    """Scores texts with the Jaro-Winkler similarity
+
+    Texts that start with the same characters (up to 4 of them) get a
+    higher ratio.
+    """
+
+    name = 'jarowinkler'
+
+    # how much each character of a common prefix adds
+    prefix_scale = .1
+
+    def ratio(self, search_text, text):
+        "Return the ratio of text against search_text"
+        jaro = _jaro(search_text, text)
+
+        prefix = 0
+        for char, other_char in zip(search_text[:4], text[:4]):
+            if char != other_char:
+                break
+            prefix += 1
+
+        return jaro + prefix * self.prefix_scale * (1 - jaro)
+
+    def ratios(self, search_text, texts):
+        "Return the ratio of each of texts against search_text"
+        return [self.ratio(search_text, text) for text in texts]
+
+
+def _jaro(text, other_text):
+    "Return the Jaro similarity of the two texts"
+    if text == other_text:
+        return 1.0
+
+    if not text or not other_text:
+        return 0.0
+
+    # characters only match if they are not too far apart
+    window = max(max(len(text), len(other_text)) // 2 - 1, 0)
+
+    other_matched = [False] * len(other_text)
+    matched_chars = []
+    for i, char in enumerate(text):
+        for j in range(max(0, i - window),
+                       min(i + window + 1, len(other_text))):
+            if not other_matched[j] and other_text[j] == char:
+                other_matched[j] = True
+                matched_chars.append(char)
+                break
+
+    matches = len(matched_chars)
+    if not matches:
+        return 0.0
+
+    other_matched_chars = [
+        char for char, matched in zip(other_text, other_matched) if matched]
+    transpositions = sum(
+        1 for char, other_char in zip(matched_chars, other_matched_chars)
+        if char != other_char) // 2
+
+    return (
+        matches / len(text) +
+        matches / len(other_text) +
+        (matches - transpositions) / matches) / 3
+
+
+#====================================================================
+scorers = {
+    DifflibScorer.name : DifflibScorer,
+    LevenshteinScorer.name : LevenshteinScorer,
+    JaroWinklerScorer.name : JaroWinklerScorer,
+}
+
+def get_scorer(scorer):
+    """Return a scorer
+
+    scorer is either the name of one of the scorers in this module
+    ('difflib', 'levenshtein' or 'jarowinkler') or a scorer object which
+    is returned as it is."""
+    if scorer in scorers:
+        return scorers[scorer]()
+
+    if not hasattr(scorer, 'ratios'):
+        raise ValueError("Unknown scorer: %s" % (scorer, ))
+
+    return scorer
+
+
+if __name__ == '__main__':
+    import random
+    import unittest
+
+    def _reference_levenshtein(text, other_text):
+        "1 - the edit distance of the texts / the length of the longer one"
+        previous = list(range(len(other_text) + 1))
+        for i, char in enumerate(text):
+            current = [i + 1]
+            for j, other_char in enumerate(other_text):
+                current.append(min(
+                    previous[j] + (char != other_char),
+                    previous[j + 1] + 1,
+                    current[j] + 1))
+            previous = current
+
+        longest = max(len(text), len(other_text))
+        if not longest:
+            return 1.0
+        return 1 - previous[-1] / longest
+
+    def _reference_jaro_winkler(text, other_text):
+        "The Jaro-Winkler similarity as it is usually written down"
+        if not text and not other_text:
+            return 1.0
+
+        window = max(max(len(text), len(other_text)) // 2 - 1, 0)
+        text_flags = [False] * len(text)
+        other_flags = [False] * len(other_text)
+
+        matches = 0
+        for i in range(len(text)):
+            start = max(0, i - window)
+            end = min(i + window + 1, len(other_text))
+            for j in range(start, end):
+                if not other_flags[j] and text[i] == other_text[j]:
+                    text_flags[i] = other_flags[j] = True
+                    matches += 1
+                    break
+
+        if not matches:
+            return 0.0
+
+        half_transpositions = 0
+        j = 0
+        for i in range(len(text)):
+            if text_flags[i]:
+                while not other_flags[j]:
+                    j += 1
+                if text[i] != other_text[j]:
+                    half_transpositions += 1
+                j += 1
+
+        jaro = (matches / len(text) + matches / len(other_text) +
+            (matches - half_transpositions // 2) / matches) / 3
+
+        prefix = 0
+        while prefix < min(4, len(text), len(other_text)) and \
+            text[prefix] == other_text[prefix]:
+            prefix += 1
+
+        return jaro + prefix * .1 * (1 - jaro)
+
+    # the empty text, texts in other scripts and texts with characters
+    # outside of the Basic Multilingual Plane
+    _texts = ['', 'a', 'OK', 'OKButton', 'CancelButton', 'Button',
+        'MARTHA', 'MARHTA', 'DIXON', 'DICKSONX', 'stra\xdfe', 'Stra\xdfe',
+        '\u0424\u0430\u0439\u043b', '\u0424\u0430\u0439\u043b\u044b',
+        '\u6587\u4ef6', '\U0001f600 OK', 'OK \U0001f600']
+
+    def _random_texts(rand, count):
+        "Return count random texts from a small alphabet"
+        return [''.join(rand.choice('ab\xe4\u6587\U0001f600')
+            for i in range(rand.randint(0, 6))) for text in range(count)]
+
+    class LevenshteinScorerTestCase(unittest.TestCase):
+        "Compare LevenshteinScorer with the edit distance of each pair"
+
+        def setUp(self):
+            if numpy is None:
+                self.skipTest("The levenshtein scorer needs numpy")
+            self.scorer = LevenshteinScorer()
+
+        def testKnownTexts(self):
+            "Give the ratios of the reference for all the pairs"
+            for search_text in _texts:
+                self.assertEqual(
+                    self.scorer.ratios(search_text, _texts),
+                    [_reference_levenshtein(search_text, text)
+                        for text in _texts])
+
+            self.assertEqual(self.scorer.ratio('', ''), 1.0)
+            self.assertEqual(self.scorer.ratio('', 'OK'), 0.0)
+            self.assertEqual(self.scorer.ratio('MARTHA', 'MARHTA'), 1 - 2 / 6)
+            self.assertEqual(self.scorer.ratios('OK', []), [])
+
+        def testRandomTexts(self):
+            "Texts of the same length are scored together correctly"
+            rand = random.Random(0)
+            for run in range(50):
+                search_text = _random_texts(rand, 1)[0]
+                texts = _random_texts(rand, 20)
+                self.assertEqual(
+                    self.scorer.ratios(search_text, texts),
+                    [_reference_levenshtein(search_text, text)
+                        for text in texts])
+
+    class JaroWinklerScorerTestCase(unittest.TestCase):
+        "Compare JaroWinklerScorer with the usual Jaro-Winkler similarity"
+
+        def setUp(self):
+            self.scorer = JaroWinklerScorer()
+
+        def assertRatios(self, search_text, texts):
+            ratios = self.scorer.ratios(search_text, texts)
+            self.assertEqual(len(ratios), len(texts))
+            for ratio, text in zip(ratios, texts):
+                self.assertAlmostEqual(
+                    ratio, _reference_jaro_winkler(search_text, text))
+
+        def testKnownTexts(self):
+            "Give the ratios of the reference for all the pairs"
+            for search_text in _texts:
+                self.assertRatios(search_text, _texts)
+
+            self.assertEqual(self.scorer.ratio('', ''), 1.0)
+            self.assertEqual(self.scorer.ratio('', 'OK'), 0.0)
+            self.assertAlmostEqual(
+                self.scorer.ratio('MARTHA', 'MARHTA'), .961, places = 3)
+            self.assertAlmostEqual(
+                self.scorer.ratio('DIXON', 'DICKSONX'), .813, places = 3)
+
+        def testRandomTexts(self):
+            "Give the ratios of the reference for random texts"
+            rand = random.Random(0)
+            for run in range(50):
+                self.assertRatios(
+                    _random_texts(rand, 1)[0], _random_texts(rand, 20))
+
+    class GetScorerTestCase(unittest.TestCase):
+        "Test getting the scorers by name"
+
+        def testNames(self):
+            "The names give the scorers - scorer objects are kept as they are"
+            self.assertTrue(isinstance(get_scorer('difflib'), DifflibScorer))
+            self.assertTrue(
+                isinstance(get_scorer('jarowinkler'), JaroWinklerScorer))
+            scorer = JaroWinklerScorer()
+            self.assertTrue(get_scorer(scorer) is scorer)
+            self.assertRaises(ValueError, get_scorer, 'soundex')
+
+        def testDifflib(self):
+            "The difflib scorer gives the ratios of SequenceMatcher"
+            scorer = get_scorer('difflib')
+            for search_text in _texts:
+                self.assertEqual(
+                    scorer.ratios(search_text, _texts),
+                    [difflib.SequenceMatcher(None, search_text, text).ratio()
+                        for text in _texts])
+
+    unittest.main()
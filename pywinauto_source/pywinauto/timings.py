@@ -33,6 +33,7 @@ The Following are the individual timing settings that can be adjusted:
 
 * window_find_timeout	(default 3)
 * window_find_retry (default .09)
+* window_find_max_retry (default .5)
 
 * app_start_timeout (default 10)
 * app_start_retry   (default .90)
@@ -83,8 +84,11 @@ The Following are the individual timing settings that can be adjusted:
 
 """
 
+import sys
 import time
+import random
 import operator
+import itertools
 
 
 __revision__ = "$Revision: 453 $"
@@ -96,6 +100,7 @@ class TimeConfig(object):
     __default_timing = {
         'window_find_timeout' : 5,
         'window_find_retry' : .09,
+        'window_find_max_retry' : .5,
 
         'app_start_timeout' : 10,
         'app_start_retry' : .90,
@@ -234,6 +239,143 @@ class TimeoutError(RuntimeError):
     pass
 
 
+#=========================================================================
+if hasattr(time, 'monotonic'):
+    default_clock = time.monotonic
+elif sys.platform in ('win32', 'cli'):
+    # on Windows time.clock() is the wall time since it was first called
+    default_clock = time.clock
+else:
+    default_clock = time.time
+
+default_sleep = time.sleep
+
+_random = random.Random()
+
+
+#=========================================================================
+class Backoff(object):
+    """Retry intervals that start short and grow
+
+    The first fast_probes retries are after min_interval. After that each
+    interval is factor times the one before (up to max_interval) changed
+    by a random fraction of up to jitter - so that many waits do not all
+    poll at the same moments.
+
+    e.g. ::
+
+     # try every .01 of a second twice and then back off to every second
+     WaitUntil(10, Backoff(.01, 1), self.IsVisible)
+    """
+
+    def __init__(
+        self,
+        min_interval,
+        max_interval,
+        factor = 2,
+        jitter = .1,
+        fast_probes = 2,
+        rand = None):
+
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.factor = factor
+        self.jitter = jitter
+        self.fast_probes = fast_probes
+        if rand is None:
+            rand = _random
+        self.rand = rand
+
+    def intervals(self):
+        "Yield the time to wait before each retry"
+        for probe in range(self.fast_probes):
+            yield self.min_interval
+
+        interval = self.min_interval
+        while True:
+            interval = min(interval * self.factor, self.max_interval)
+            if self.jitter:
+                jittered = interval * (
+                    1 + self.jitter * self.rand.uniform(-1, 1))
+                yield min(max(jittered, self.min_interval), self.max_interval)
+            else:
+                yield interval
+
+
+#=========================================================================
+class WaitScheduler(object):
+    """Keep the time of a wait and sleep until each retry
+
+     * **timeout**  how long to keep retrying
+     * **retry_interval**  the number of seconds to sleep between retries
+       or a Backoff
+     * **clock**  function that returns the time in seconds (defaults
+       to default_clock - a monotonic clock where there is one)
+     * **sleep**  function that waits a number of seconds (defaults to
+       default_sleep)
+
+    The clock and sleep can be replaced to test the timing of waits
+    without waiting.
+    """
+
+    def __init__(self, timeout, retry_interval, clock = None, sleep = None):
+        if clock is None:
+            clock = default_clock
+        if sleep is None:
+            sleep = default_sleep
+
+        self.timeout = timeout
+        self.clock = clock
+        self.sleep = sleep
+        if isinstance(retry_interval, Backoff):
+            self.intervals = retry_interval.intervals()
+        else:
+            self.intervals = itertools.repeat(retry_interval)
+
+        self.start = clock()
+
+    def time_left(self):
+        "Return how much of the timeout is left"
+        return self.timeout - (self.clock() - self.start)
+
+    def next_interval(self):
+        """Return how long to wait before the next retry
+
+        Returns None if the timeout has passed
+        """
+        time_left = self.time_left()
+        if time_left <= 0:
+            return None
+
+        # wait either the retry interval or else the amount of
+        # time until the timeout expires (whichever is less)
+        return min(next(self.intervals), time_left)
+
+    def wait(self):
+        """Sleep until the next retry
+
+        Returns False (without sleeping) if the timeout has passed
+        """
+        interval = self.next_interval()
+        if interval is None:
+            return False
+
+        self.sleep(interval)
+        return True
+
+
+#=========================================================================
+def _wait_scheduler(timeout, retry_interval, kwargs):
+    """Return the WaitScheduler of a wait that was passed the keyword
+    arguments kwargs (only clock and sleep can be passed)"""
+    clock = kwargs.pop('clock', None)
+    sleep = kwargs.pop('sleep', None)
+    if kwargs:
+        raise TypeError(
+            "unexpected keyword arguments: %s" % ", ".join(sorted(kwargs)))
+    return WaitScheduler(timeout, retry_interval, clock, sleep)
+
+
 #=========================================================================
 def WaitUntil(
     timeout, 
@@ -241,17 +383,21 @@ def WaitUntil(
     func, 
     value = True, 
     op = operator.eq,
-    *args):
+    *args,
+    **kwargs):
     
     """Wait until ``op(function(*args), value)`` is True or until timeout 
        expires
     
      * **timeout**  how long the function will try the function
-     * **retry_interval**  how long to wait between retries
+     * **retry_interval**  how long to wait between retries (seconds
+       or a Backoff)
      * **func** the function that will be executed
      * **value**  the value to be compared against (defaults to True)
      * **op** the comparison function (defaults to equality)\
      * **args** optional arguments to be passed to func when called
+     * **clock**, **sleep**  keyword arguments - the clock and sleep of
+       the wait (see WaitScheduler)
      
      Returns the return value of the function
      If the operation times out then the return value of the the function 
@@ -269,20 +415,14 @@ def WaitUntil(
      
     """
     
-    start = time.time()
+    scheduler = _wait_scheduler(timeout, retry_interval, kwargs)
 
     func_val = func(*args)
     # while the function hasn't returned what we are waiting for    
     while not op(func_val, value):
-            
-        # find out how much of the time is left
-        time_left = timeout - ( time.time() - start)
     
         # if we have to wait some more        
-        if time_left > 0:
-            # wait either the retry_interval or else the amount of
-            # time until the timeout expires (whichever is less)
-            time.sleep(min(retry_interval, time_left))
+        if scheduler.wait():
             func_val = func(*args)
         else:
             err = TimeoutError("timed out")
@@ -292,6 +432,60 @@ def WaitUntil(
     return func_val
 
 
+def WaitUntilStable(
+    timeout,
+    retry_interval,
+    func,
+    stable_for = 0,
+    *args,
+    **kwargs):
+
+    """Wait until ``func(*args)`` returns a true value that stays the same
+       for stable_for seconds or until timeout expires
+
+     * **timeout**  how long the function will try the function
+     * **retry_interval**  how long to wait between retries (seconds
+       or a Backoff)
+     * **func** the function that will be executed
+     * **stable_for**  how long the value must not change (defaults to 0 -
+       the first true value is returned)
+     * **args** optional arguments to be passed to func when called
+     * **clock**, **sleep**  keyword arguments - the clock and sleep of
+       the wait (see WaitScheduler)
+
+     Returns the return value of the function
+     If the operation times out then the last return value of the function
+     is in the 'function_value' attribute of the raised exception.
+
+     e.g. ::
+
+      # wait for a top window that is still the top window .5 of a second
+      # later (not a splash screen that is about to close)
+      handle = WaitUntilStable(10, .1, TopWindowHandle, .5)
+    """
+
+    scheduler = _wait_scheduler(timeout, retry_interval, kwargs)
+
+    func_val = func(*args)
+    since = scheduler.clock()
+
+    # while there is no value or it has not been the same for long enough
+    while not func_val or scheduler.clock() - since < stable_for:
+
+        # if we have to wait some more
+        if scheduler.wait():
+            new_val = func(*args)
+            if new_val != func_val:
+                func_val = new_val
+                since = scheduler.clock()
+        else:
+            err = TimeoutError("timed out")
+            err.function_value = func_val
+            raise err
+
+    return func_val
+
+
 #def WaitUntilNot(timeout, retry_interval, func, value = True)
 #    return WaitUntil(timeout, retry_interval, func, value = True)
     
@@ -301,16 +495,20 @@ def WaitUntilPasses(
     retry_interval, 
     func, 
     exceptions = (Exception),
-    *args):
+    *args,
+    **kwargs):
 
     """Wait until ``func(*args)`` does not raise one of the exceptions in 
        exceptions
     
      * **timeout**  how long the function will try the function
-     * **retry_interval**  how long to wait between retries
+     * **retry_interval**  how long to wait between retries (seconds
+       or a Backoff)
      * **func** the function that will be executed
      * **exceptions**  list of exceptions to test against (default: Exception)
      * **args** optional arguments to be passed to func when called
+     * **clock**, **sleep**  keyword arguments - the clock and sleep of
+       the wait (see WaitScheduler)
      
      Returns the return value of the function
      If the operation times out then the original exception raised is in
@@ -329,8 +527,7 @@ def WaitUntilPasses(
      
     """
     
-    start = time.time()
-    waited = 0
+    scheduler = _wait_scheduler(timeout, retry_interval, kwargs)
 
     # keep trying until the timeout is passed
     while True:
@@ -344,16 +541,8 @@ def WaitUntilPasses(
         # An exception was raised - so wait and try again
         except exceptions as e:
         
-            # find out how much of the time is left
-            time_left = timeout - ( time.time() - start)
-        
-            # if we have to wait some more        
-            if time_left > 0:
-                # wait either the retry_interval or else the amount of
-                # time until the timeout expires (whichever is less)
-                time.sleep(min(retry_interval, time_left))
-
-            else:
+            # wait some more unless the timeout has passed
+            if not scheduler.wait():
                 # Raise a TimeoutError - and put the original exception
                 # inside it
                 err = TimeoutError()